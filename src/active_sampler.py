@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+主动学习采样：只自动保存模型最没把握的画面
+
+原来每次锁定跳跃参数时只要有检测结果就保存，数据集里大多是模型早就会的简单样本。
+这里给每个候选帧按检测的不确定性打分（0-1），分数够高才写入，并在 scores/ 下写一个同名的
+JSON 记录分数和各项信号：
+    - 置信度：最没把握的检测框越接近置信度阈值，分数越高
+    - 小人数量不是1
+    - 方块数量异常：少于2个（至少要有当前方块和目标方块），或与最近候选帧的中位数相差较大
+    - 与上一帧（跟踪模式下为跟踪结果）不一致：按类别IoU匹配，匹配不上的框越多分数越高
+    - 落地失败：下一次锁定时小人脚底不在任何方块上，或者 miss_timeout 秒内没有再次锁定（游戏结束）
+各项信号按权重用 noisy-or 合并（任何一项很强，总分就高）。落地结果要等下一次锁定才知道，
+所以每个候选帧在队列中多停留一跳，决定之后才交给后台写入器。
+
+    python jump_engine.py --source dir:../datasets/auto/images --clock fast --active-learning
+    python jump_engine.py --active-learning --save-fraction 0.2
+"""
+
+import time
+from collections import deque
+
+import numpy as np
+
+from detection_postprocess import BLOCK, PERSON, select_targets
+from inference_backends import box_iou
+
+DEFAULT_WEIGHTS = {
+    'confidence': 0.6,
+    'person_count': 0.9,
+    'block_count': 0.5,
+    'disagreement': 0.7,
+    'landing': 0.9,
+}
+
+
+def boxes(rows):
+    return np.stack([rows['x1'], rows['y1'], rows['x2'], rows['y2']], axis=1).astype(np.float32)
+
+
+class UncertaintySampler:
+    """按检测不确定性给候选帧打分，只放行最有信息量的帧（落地结果确定后再决定）"""
+
+    def __init__(self, min_score=0.35, save_fraction=None, weights=None, window=200, warmup=20):
+        self.min_score = min_score              # 分数下限
+        self.save_fraction = save_fraction      # 只保存最近候选帧中分数最高的这一比例（None 不限制）
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.warmup = warmup                    # 候选帧少于该数量时只使用分数下限
+
+        self.scores = deque(maxlen=window)      # 最近候选帧的分数（决定比例阈值）
+        self.block_counts = deque(maxlen=window)
+        self.pending = None                     # 等待落地结果的候选帧
+
+        # 统计
+        self.candidates = 0
+        self.selected = 0
+        self.signals = {name: 0 for name in self.weights}   # 各信号成为最强信号的次数
+        self.landing_misses = 0
+
+    # === 打分 ===
+
+    def components(self, detections, previous, confidence_threshold):
+        """各项不确定性信号（0-1），不含落地结果"""
+        persons = int(np.count_nonzero(detections['cls'] == PERSON))
+        blocks = int(np.count_nonzero(detections['cls'] == BLOCK))
+
+        confidence = 0.0
+        if len(detections):
+            margin = (float(detections['conf'].min()) - confidence_threshold) / max(1.0 - confidence_threshold, 1e-6)
+            confidence = float(np.clip(1.0 - margin, 0.0, 1.0))
+
+        if blocks < 2:
+            block_count = 1.0
+        elif len(self.block_counts) >= 5:
+            deviation = abs(blocks - float(np.median(self.block_counts)))
+            block_count = float(np.clip((deviation - 1) / 2, 0.0, 1.0))
+        else:
+            block_count = 0.0
+        self.block_counts.append(blocks)
+
+        return {
+            'confidence': confidence,
+            'person_count': 0.0 if persons == 1 else 1.0,
+            'block_count': block_count,
+            'disagreement': self.disagreement(detections, previous),
+        }
+
+    @staticmethod
+    def disagreement(detections, previous):
+        """与上一帧检测结果的不一致程度：1 - 同类别最佳IoU之和 / 两边框数的较大值"""
+        if previous is None or (not len(detections) and not len(previous)):
+            return 0.0
+        total = max(len(detections), len(previous))
+        if not len(detections) or not len(previous):
+            return 1.0
+        iou = box_iou(boxes(detections), boxes(previous))
+        iou[detections['cls'][:, None] != previous['cls'][None, :]] = 0.0
+        return float(1.0 - iou.max(axis=1).sum() / total)
+
+    def combine(self, components):
+        """noisy-or：1 - Π(1 - 权重 × 信号)"""
+        remaining = 1.0
+        for name, value in components.items():
+            remaining *= 1.0 - self.weights[name] * value
+        return 1.0 - remaining
+
+    @staticmethod
+    def landed(detections):
+        """锁定时的画面中小人脚底是否落在某个方块的检测框内"""
+        person_index, _ = select_targets(detections)
+        if person_index is None:
+            return False
+        person = detections[person_index]
+        blocks = detections[detections['cls'] == BLOCK]
+        inside = ((blocks['x1'] <= person['cx']) & (person['cx'] <= blocks['x2']) &
+                  (blocks['y1'] <= person['cy']) & (person['cy'] <= blocks['y2']))
+        return bool(inside.any())
+
+    # === 候选帧 ===
+
+    @property
+    def threshold(self):
+        if self.save_fraction is None or len(self.scores) < self.warmup:
+            return self.min_score
+        return max(self.min_score, float(np.quantile(self.scores, 1.0 - self.save_fraction)))
+
+    def offer(self, frame, detections, previous, confidence_threshold, now=None):
+        """锁定时提交候选帧（调用方传入帧副本）；返回已确定要保存的 [(帧, 检测结果, 分数, 信号)]
+
+        这一帧同时是上一个候选帧的落地结果：小人脚底不在方块上说明上一跳没有落稳。
+        """
+        now = now if now is not None else time.perf_counter()
+        selected = []
+        if self.pending is not None:
+            selected = self.resolve(landing=0.0 if self.landed(detections) else 1.0)
+        components = self.components(detections, previous, confidence_threshold)
+        self.pending = (frame, detections, components, now)
+        return selected
+
+    def expire(self, timeout, now=None):
+        """候选帧等待超过 timeout 秒仍没有下一次锁定（游戏结束）时按落地失败处理"""
+        now = now if now is not None else time.perf_counter()
+        if self.pending is not None and now - self.pending[3] > timeout:
+            return self.resolve(landing=1.0)
+        return []
+
+    def flush(self):
+        """停止游戏时处理最后一个候选帧（落地结果未知）"""
+        if self.pending is None:
+            return []
+        return self.resolve(landing=None)
+
+    def resolve(self, landing):
+        frame, detections, components, _ = self.pending
+        self.pending = None
+        if landing is not None:
+            components['landing'] = landing
+            self.landing_misses += landing > 0
+        score = self.combine(components)
+        self.candidates += 1
+        threshold = self.threshold
+        self.scores.append(score)
+        if score < threshold:
+            return []
+
+        self.selected += 1
+        strongest = max(components, key=lambda name: self.weights[name] * components[name])
+        self.signals[strongest] += 1
+        sidecar = {
+            'score': round(score, 4),
+            'threshold': round(threshold, 4),
+            'signals': {name: round(value, 4) for name, value in components.items()},
+        }
+        return [(frame, detections, score, sidecar)]
+
+    # === 统计 ===
+
+    def summary(self):
+        ratio = self.selected / self.candidates if self.candidates else 0.0
+        mean = float(np.mean(self.scores)) if self.scores else 0.0
+        signals = ", ".join(f"{name}{count}" for name, count in self.signals.items() if count)
+        return (f"保存 {self.selected}/{self.candidates} 候选帧 ({ratio:.0%}) | 阈值 {self.threshold:.2f} "
+                f"平均分 {mean:.2f} | 落地失败 {self.landing_misses} | 主要信号: {signals or '无'}")
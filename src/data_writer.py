@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+训练数据的后台写入
+
+自动保存原来在游戏线程上、正要安排跳跃的时刻同步执行 cv2.imwrite 和标注文件写入，
+启动时还要 glob 整个图片目录来数数。这里换成一个有界队列 + 后台写入线程：
+    - 游戏线程只把 (帧, 标注行) 放进队列就返回，JPEG编码和写文件都在写入线程里完成
+    - 队列满时按策略处理：drop_newest 丢弃新数据、drop_oldest 丢弃最旧的待写数据、
+      block 阻塞等待（最多 block_timeout 秒，超时后丢弃）
+    - 先写到同目录下的临时文件再原子重命名，标注先于图片出现，其他程序看到的图片都有完整的标注
+    - 文件编号保存在数据目录的 counter.json 中，启动时只读这个文件；没有计数文件的旧目录只扫描一次
+    - 统计队列深度、丢弃数量和从提交到落盘的写入延迟
+编码格式、会话子目录和磁盘上限由 storage_policy.StoragePolicy 决定；
+给定 image_dedup.HashIndex 时，与已保存图片近重复的帧不写入；
+提交时附带的 sidecar（例如主动学习的分数和信号）写成 scores/<同名>.json。
+"""
+
+import json
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from image_dedup import dhash
+from storage_policy import StoragePolicy, atomic_write
+
+COUNTER_FILE = "counter.json"
+DROP_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+
+class TrainingDataWriter:
+    """有界队列 + 后台线程的图片/标注写入器"""
+
+    def __init__(self, data_root, capacity=16, policy="drop_oldest", block_timeout=0.05, storage=None,
+                 dedup=None, on_written=None):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"未知的丢弃策略: {policy}，可选: {', '.join(DROP_POLICIES)}")
+        self.data_root = Path(data_root)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        # 默认保持原来的行为：平铺目录、全分辨率、不限制磁盘
+        self.storage = storage or StoragePolicy(data_root, quality=95, max_side=None, budget_mb=None,
+                                                session_dirs=False)
+        self.images_dir, self.labels_dir = self.storage.prepare()
+        self.scores_dir = self.images_dir.parent / "scores"
+        self.dedup = dedup                    # 近重复索引（键为相对 data_root 的路径）
+        if dedup is not None:
+            self.storage.on_evicted = lambda entry: dedup.remove(entry['image'])
+        self.on_written = on_written          # 写入完成回调 (已保存图片数, 图片文件名)，在写入线程中调用
+
+        self.queue = queue.Queue(maxsize=capacity)
+        self.lock = threading.Lock()
+        self.next_index = self.load_counter()   # 只用于文件命名（丢弃、近重复和淘汰的编号不会复用）
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.duplicates = 0                   # 与已保存图片近重复、没有写入的帧
+        self.max_depth = 0
+        self.latencies = deque(maxlen=200)    # 从提交到落盘的耗时
+        self.write_times = deque(maxlen=200)  # 编码 + 写文件耗时
+
+        self.thread = threading.Thread(target=self.loop, name="training-data-writer", daemon=True)
+        self.thread.start()
+
+    # === 计数文件 ===
+
+    def load_counter(self):
+        counter_path = self.data_root / COUNTER_FILE
+        try:
+            return int(json.loads(counter_path.read_text(encoding='utf-8'))['next_index'])
+        except (OSError, ValueError, KeyError):
+            pass
+        # 旧数据目录没有计数文件：按写入记录计数（写入记录本身只在第一次建立时扫描目录）
+        count = len(self.storage.entries)
+        self.save_counter(count)
+        return count
+
+    def save_counter(self, next_index):
+        atomic_write(self.data_root / COUNTER_FILE, json.dumps({'next_index': next_index}).encode('utf-8'))
+
+    @property
+    def count(self):
+        """数据目录中已保存的图片数（含已有数据，不含被淘汰的）"""
+        return len(self.storage.entries)
+
+    # === 提交 ===
+
+    def submit(self, frame, label_lines, score=0.5, sidecar=None):
+        """提交一帧和它的YOLO标注行（调用方负责传入不会被覆盖的帧副本），返回是否进入队列
+
+        score 为这张图片的信息量（0-1，越高越值得保留），按信息量淘汰时使用；
+        sidecar 为可选的字典，与图片同名保存为 scores/*.json。
+        """
+        with self.lock:
+            index = self.next_index
+            self.next_index += 1
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        item = (index, f"auto_{index:05d}_{timestamp}", frame, label_lines, score, sidecar, time.perf_counter())
+
+        if self.policy == "block":
+            try:
+                self.queue.put(item, timeout=self.block_timeout)
+            except queue.Full:
+                self.dropped += 1
+                return False
+        elif self.policy == "drop_oldest":
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.queue.task_done()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+        else:
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+                return False
+
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    # === 写入线程 ===
+
+    def loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+            try:
+                self.write(*item)
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ 后台写入训练数据失败: {e}")
+            finally:
+                self.queue.task_done()
+
+    def write(self, index, stem, frame, label_lines, score, sidecar, submitted):
+        start = time.perf_counter()
+        if self.dedup is not None:
+            frame_hash = dhash(frame, self.dedup.hash_size)
+            if self.dedup.find(frame_hash) is not None:
+                self.duplicates += 1
+                return
+        data, suffix = self.storage.encode(frame)
+        # 标注先落盘，图片出现时标注一定已经完整
+        label_path = self.labels_dir / f"{stem}.txt"
+        image_path = self.images_dir / f"{stem}{suffix}"
+        sidecar_path = None
+        if sidecar is not None:
+            self.scores_dir.mkdir(exist_ok=True)
+            sidecar_path = self.scores_dir / f"{stem}.json"
+            atomic_write(sidecar_path, json.dumps(sidecar, ensure_ascii=False).encode('utf-8'))
+        atomic_write(label_path, "".join(label_lines).encode('utf-8'))
+        atomic_write(image_path, data)
+        self.save_counter(max(index + 1, self.next_index))
+        self.storage.record(image_path, label_path, len(data), score, sidecar_path)
+        if self.dedup is not None:
+            stat = image_path.stat()
+            self.dedup.add(self.dedup.key(image_path), frame_hash, stat.st_mtime_ns, stat.st_size)
+
+        finished = time.perf_counter()
+        self.write_times.append(finished - start)
+        self.latencies.append(finished - submitted)
+        self.written += 1
+        if self.on_written:
+            self.on_written(self.count, image_path.name)
+
+    def close(self, timeout=5.0):
+        """写完队列中剩余的数据后停止写入线程"""
+        deadline = time.perf_counter() + timeout
+        while self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                if time.perf_counter() > deadline:
+                    return
+        self.thread.join(timeout=max(deadline - time.perf_counter(), 0.1))
+
+    # === 统计 ===
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+    def summary(self):
+        latency = np.percentile(self.latencies, [50, 99]) * 1000 if self.latencies else (0.0, 0.0)
+        write_ms = np.mean(self.write_times) * 1000 if self.write_times else 0.0
+        return (f"后台写入 {self.written} | 队列 {self.depth}/{self.queue.maxsize} (最高 {self.max_depth}) | "
+                f"丢弃 {self.dropped} ({self.policy}) 近重复 {self.duplicates} 失败 {self.failed} | "
+                f"写入延迟 P50:{latency[0]:.0f}ms P99:{latency[1]:.0f}ms | 编码+写入 {write_ms:.1f}ms")
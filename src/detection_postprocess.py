@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+向量化的检测结果后处理
+
+逐个遍历 result.boxes 并分别读取 box.xyxy / box.cls / box.conf 时，每个框都会触发好几次
+张量到主机内存的拷贝。这里一次性把 boxes.data（x1, y1, x2, y2, conf, cls）拷到主机，
+在NumPy中完成置信度过滤、类别划分、中心点计算和目标选择，返回紧凑的结构化数组。
+"""
+
+import numpy as np
+
+PERSON = 0
+BLOCK = 1
+
+DETECTION_DTYPE = np.dtype([
+    ('cls', np.int8),
+    ('conf', np.float32),
+    ('x1', np.int32), ('y1', np.int32), ('x2', np.int32), ('y2', np.int32),
+    ('cx', np.int32), ('cy', np.int32),   # 小人为脚底中心，方块为平台中心
+])
+
+EMPTY = np.zeros(0, dtype=DETECTION_DTYPE)
+
+
+def extract_detections(result, conf_threshold):
+    """把一帧的检测结果转换为结构化数组，只保留置信度高于阈值的框"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return EMPTY
+
+    data = boxes.data.cpu().numpy()   # 唯一的一次主机拷贝
+    data = data[data[:, 4] > conf_threshold]
+    if len(data) == 0:
+        return EMPTY
+
+    xyxy = data[:, :4].astype(np.int32)
+    x1, y1, x2, y2 = xyxy.T
+    cls = data[:, 5].astype(np.int8)
+
+    detections = np.empty(len(data), dtype=DETECTION_DTYPE)
+    detections['cls'] = cls
+    detections['conf'] = data[:, 4]
+    detections['x1'], detections['y1'], detections['x2'], detections['y2'] = x1, y1, x2, y2
+    detections['cx'] = (x1 + x2) // 2
+    # 小人坐标：底部向上3px，模拟圆柱体正中心；方块坐标：上半部分中间（y1 + 高度/4），模拟平台中心
+    detections['cy'] = np.where(cls == PERSON, y2 - 3, y1 + (y2 - y1) // 4)
+    return detections
+
+
+def select_targets(detections):
+    """返回 (最佳小人下标, 目标方块下标)，不存在时为None
+
+    小人取置信度最高的一个；目标方块直接取最上面的一个（中心y最小），不考虑小人位置。
+    """
+    person_index = None
+    target_index = None
+
+    persons = np.flatnonzero(detections['cls'] == PERSON)
+    if len(persons):
+        person_index = int(persons[np.argmax(detections['conf'][persons])])
+
+    blocks = np.flatnonzero(detections['cls'] == BLOCK)
+    if len(blocks):
+        target_index = int(blocks[np.argmin(detections['cy'][blocks])])
+
+    return person_index, target_index
+
+
+def center(detection):
+    """结构化数组中一行的中心点"""
+    return int(detection['cx']), int(detection['cy'])
+
+
+def bbox(detection):
+    return int(detection['x1']), int(detection['y1']), int(detection['x2']), int(detection['y2'])
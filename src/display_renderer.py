@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tk画面显示
+
+原来每次刷新都要：默认插值缩放 → cvtColor → 新建 PIL.Image → 新建 ImageTk.PhotoImage →
+删除并重建画布图元。这里：
+    - 只保留一个 PhotoImage 和一个画布图元，画布尺寸变化时才重建，其余时候用 paste 原地更新
+    - 缩放使用 INTER_AREA 并写入预分配缓冲区，颜色转换交给 PIL 的 raw "BGR" 解码，不再单独 cvtColor
+    - 同一帧不重复绘制，显示帧率单独限制，与检测帧率无关
+    - 统计每帧在Tk主循环中花费的时间
+"""
+
+import time
+import tkinter as tk
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+from overlay_renderer import CanvasOverlay
+
+
+class FrameDisplay:
+    """在Tk画布上显示帧和检测叠加层"""
+
+    def __init__(self, canvas, max_fps=20):
+        self.canvas = canvas
+        self.max_fps = max_fps
+        self.overlay = CanvasOverlay(canvas)
+
+        self.photo = None
+        self.image_item = None
+        self.buffer = None
+        self.displayed_seq = 0
+        self.last_render = 0.0
+
+        # 统计
+        self.rendered = 0
+        self.skipped_unchanged = 0
+        self.skipped_rate = 0
+        self.render_time = 0.0
+        self.window_start = time.perf_counter()
+        self.window_rendered = 0
+        self.window_time = 0.0
+        self.fps = 0.0
+        self.ms_per_frame = 0.0
+
+    @property
+    def interval_ms(self):
+        """建议的刷新轮询间隔"""
+        return max(5, int(1000 / self.max_fps))
+
+    def render(self, frame, seq, overlay=None):
+        """绘制一帧，返回是否真正绘制了；seq为None时强制绘制（如测试截图）"""
+        now = time.perf_counter()
+        if seq is not None:
+            if seq == self.displayed_seq:
+                self.skipped_unchanged += 1
+                return False
+            if now - self.last_render < 1.0 / self.max_fps * 0.9:
+                self.skipped_rate += 1
+                return False
+        if not self.canvas.winfo_viewable():
+            return False
+
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+        if canvas_width <= 1 or canvas_height <= 1:
+            return False
+
+        # 保持原始比例
+        h, w = frame.shape[:2]
+        scale = min(canvas_width / w, canvas_height / h)
+        new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+
+        if self.buffer is None or self.buffer.shape[:2] != (new_h, new_w):
+            self.buffer = np.empty((new_h, new_w, 3), dtype=np.uint8)
+            self.photo = ImageTk.PhotoImage("RGB", (new_w, new_h))
+            if self.image_item is None:
+                self.image_item = self.canvas.create_image(0, 0, image=self.photo, anchor=tk.CENTER, tags="frame")
+            else:
+                self.canvas.itemconfigure(self.image_item, image=self.photo)
+        self.canvas.coords(self.image_item, canvas_width // 2, canvas_height // 2)
+
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        cv2.resize(frame, (new_w, new_h), dst=self.buffer, interpolation=interpolation)
+        self.photo.paste(Image.frombuffer("RGB", (new_w, new_h), self.buffer, "raw", "BGR", 0, 1))
+
+        # 在画布分辨率下绘制检测叠加层
+        if overlay is not None:
+            self.overlay.draw(overlay, scale, (canvas_width - new_w) // 2, (canvas_height - new_h) // 2)
+        else:
+            self.overlay.clear()
+
+        if seq is not None:
+            self.displayed_seq = seq
+        self.last_render = now
+        elapsed = time.perf_counter() - now
+        self.record(elapsed)
+        return True
+
+    def record(self, elapsed):
+        self.rendered += 1
+        self.render_time += elapsed
+        self.window_rendered += 1
+        self.window_time += elapsed
+        now = time.perf_counter()
+        if now - self.window_start >= 1.0:
+            self.fps = self.window_rendered / (now - self.window_start)
+            self.ms_per_frame = self.window_time / self.window_rendered * 1000
+            self.window_start = now
+            self.window_rendered = 0
+            self.window_time = 0.0
+
+    def summary(self):
+        return (f"显示 {self.fps:.1f} FPS (上限 {self.max_fps}) | Tk绘制 {self.ms_per_frame:.1f}ms/帧 | "
+                f"跳过 重复:{self.skipped_unchanged} 限速:{self.skipped_rate}")
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+可插拔的帧来源
+
+检测循环不再直接调用 mss.grab，而是从 FrameSource 读取帧：
+- MssFrameSource: 实时屏幕采集（零拷贝环形缓冲区）
+- ImageDirectoryFrameSource: 图片目录回放，例如 datasets/auto/images
+- VideoFrameSource: 视频文件回放
+- RecordedSessionFrameSource: 回放 SessionRecorder 录制的会话
+
+每个来源都可以配置时钟：realtime（按原始节奏）、fast（尽可能快）、stepped（手动单步）。
+"""
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import cv2
+
+from frame_capture import ZeroCopyCapturer
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+SESSION_MANIFEST = "session.jsonl"
+
+
+class RealtimeClock:
+    """按帧时间戳的真实节奏放帧"""
+
+    name = "realtime"
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.anchor = None
+
+    def wait(self, media_time):
+        """等待到该帧应当出现的时刻，落后时不等待"""
+        now = time.perf_counter()
+        if self.anchor is None:
+            self.anchor = now - media_time / self.speed
+            return
+        delay = self.anchor + media_time / self.speed - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def reset(self):
+        self.anchor = None
+
+
+class FastClock:
+    """不等待，尽可能快地放帧（用于吞吐量测试）"""
+
+    name = "fast"
+
+    def wait(self, media_time):
+        pass
+
+    def reset(self):
+        pass
+
+
+class SteppedClock:
+    """每调用一次 step() 放出一帧（用于逐帧调试和回归测试）"""
+
+    name = "stepped"
+
+    def __init__(self):
+        self.permits = threading.Semaphore(0)
+
+    def step(self, count=1):
+        for _ in range(count):
+            self.permits.release()
+
+    def wait(self, media_time):
+        self.permits.acquire()
+
+    def reset(self):
+        pass
+
+    def listen(self, stream=None):
+        """从标准输入单步放帧：回车放一帧，输入数字N放N帧（后台线程，输入结束时退出）"""
+        stream = stream or sys.stdin
+
+        def loop():
+            for line in stream:
+                text = line.strip()
+                self.step(int(text) if text.isdigit() else 1)
+
+        print("⏯ 单步时钟：回车放出一帧，输入数字N放出N帧")
+        threading.Thread(target=loop, name="stepped-clock-input", daemon=True).start()
+
+
+def make_clock(name, speed=1.0):
+    """根据名称创建时钟"""
+    if name == "realtime":
+        return RealtimeClock(speed)
+    if name == "fast":
+        return FastClock()
+    if name == "stepped":
+        return SteppedClock()
+    raise ValueError(f"未知的时钟类型: {name}")
+
+
+class FrameSource:
+    """帧来源基类
+
+    read() 返回 (frame, timestamp)，timestamp 为 time.perf_counter() 时间；
+    暂时没有可用帧时返回 None，来源耗尽后 exhausted 为 True。
+    """
+
+    is_live = False
+    detects = False   # read() 额外返回检测结果（推理已在工作进程中完成）
+
+    def __init__(self, clock=None):
+        self.clock = clock or RealtimeClock()
+        self.exhausted = False
+        self.frames_read = 0
+
+    def read(self):
+        raise NotImplementedError
+
+    def describe(self):
+        return self.__class__.__name__
+
+    def close(self):
+        pass
+
+
+class MssFrameSource(FrameSource):
+    """实时屏幕采集，realtime 时钟下按目标帧率节流"""
+
+    is_live = True
+
+    def __init__(self, sct, area=None, fps=20, clock=None, capturer=None):
+        super().__init__(clock)
+        self.capturer = capturer or ZeroCopyCapturer(sct)
+        self.area = area
+        self.fps = fps
+
+    def set_area(self, area):
+        self.area = area
+        self.clock.reset()
+        self.frames_read = 0
+
+    def read(self):
+        if not self.area:
+            return None
+        self.clock.wait(self.frames_read / self.fps)
+        frame = self.capturer.grab(self.area)
+        self.frames_read += 1
+        return frame, time.perf_counter()
+
+    def describe(self):
+        return f"屏幕采集 {self.area['width']}x{self.area['height']}" if self.area else "屏幕采集(未设置区域)"
+
+
+class ImageDirectoryFrameSource(FrameSource):
+    """按文件名顺序回放图片目录"""
+
+    def __init__(self, directory, fps=20, loop=False, clock=None):
+        super().__init__(clock)
+        self.directory = Path(directory)
+        self.files = sorted(p for p in self.directory.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+        if not self.files:
+            raise ValueError(f"目录中没有图片: {self.directory}")
+        self.fps = fps
+        self.loop = loop
+        self.index = 0
+
+    def read(self):
+        if self.index >= len(self.files):
+            if not self.loop:
+                self.exhausted = True
+                return None
+            self.index = 0
+        self.clock.wait(self.frames_read / self.fps)
+        frame = cv2.imread(str(self.files[self.index]))
+        self.index += 1
+        self.frames_read += 1
+        if frame is None:
+            return None
+        return frame, time.perf_counter()
+
+    def describe(self):
+        return f"图片目录 {self.directory} ({len(self.files)}张)"
+
+
+class VideoFrameSource(FrameSource):
+    """回放视频文件，时间戳取自视频本身"""
+
+    def __init__(self, path, loop=False, clock=None):
+        super().__init__(clock)
+        self.path = Path(path)
+        self.capture = cv2.VideoCapture(str(self.path))
+        if not self.capture.isOpened():
+            raise ValueError(f"无法打开视频: {self.path}")
+        self.loop = loop
+
+    def read(self):
+        # 每帧解码到新数组：发布出去的帧还在被显示、稳定判断和锁定时的保存使用，不能被下一帧覆盖
+        ok, frame = self.capture.read()
+        if not ok and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.clock.reset()
+            ok, frame = self.capture.read()
+        if not ok:
+            self.exhausted = True
+            return None
+        self.clock.wait(self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+        self.frames_read += 1
+        return frame, time.perf_counter()
+
+    def describe(self):
+        return f"视频 {self.path}"
+
+    def close(self):
+        self.capture.release()
+
+
+class RecordedSessionFrameSource(FrameSource):
+    """回放录制的会话，按录制时的帧间隔放帧"""
+
+    def __init__(self, directory, clock=None):
+        super().__init__(clock)
+        self.directory = Path(directory)
+        with open(self.directory / SESSION_MANIFEST, 'r', encoding='utf-8') as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        if not self.entries:
+            raise ValueError(f"会话为空: {self.directory}")
+        self.index = 0
+
+    def read(self):
+        if self.index >= len(self.entries):
+            self.exhausted = True
+            return None
+        entry = self.entries[self.index]
+        self.index += 1
+        self.clock.wait(entry['t'] - self.entries[0]['t'])
+        frame = cv2.imread(str(self.directory / entry['file']))
+        self.frames_read += 1
+        if frame is None:
+            return None
+        return frame, time.perf_counter()
+
+    def describe(self):
+        return f"录制会话 {self.directory} ({len(self.entries)}帧)"
+
+
+class SessionRecorder:
+    """把任意来源读到的帧录制成可回放的会话目录"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest = open(self.directory / SESSION_MANIFEST, 'a', encoding='utf-8')
+        self.count = 0
+
+    def write(self, frame, timestamp):
+        filename = f"{self.count:06d}.png"
+        cv2.imwrite(str(self.directory / filename), frame)
+        self.manifest.write(json.dumps({'file': filename, 't': timestamp}) + "\n")
+        self.count += 1
+
+    def close(self):
+        self.manifest.close()
+
+
+def open_frame_source(spec, clock="realtime", fps=20, loop=False, sct=None, speed=1.0):
+    """根据描述字符串创建帧来源
+
+    支持 screen、dir:路径、video:路径、session:路径，也可以直接给路径自动判断类型。
+    """
+    clock_obj = make_clock(clock, speed) if isinstance(clock, str) else clock
+    kind, _, target = spec.partition(":")
+    if not target or kind not in ("screen", "dir", "video", "session"):
+        kind, target = None, spec
+
+    if kind == "screen" or spec == "screen":
+        if sct is None:
+            import mss
+            sct = mss.mss()
+        return MssFrameSource(sct, fps=fps, clock=clock_obj)
+
+    path = Path(target)
+    if kind is None:
+        if (path / SESSION_MANIFEST).exists():
+            kind = "session"
+        elif path.is_dir():
+            kind = "dir"
+        else:
+            kind = "video"
+
+    if kind == "session":
+        return RecordedSessionFrameSource(path, clock=clock_obj)
+    if kind == "dir":
+        return ImageDirectoryFrameSource(path, fps=fps, loop=loop, clock=clock_obj)
+    return VideoFrameSource(path, loop=loop, clock=clock_obj)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+事件驱动的跳跃状态机
+
+一次跳跃周期依次经过：
+    SETTLING  - 等待镜头平移和落地动画结束（视觉稳定判断，或固定的稳定等待时间）
+    MEASURING - 等待一帧有效的检测结果，锁定距离和点按时长
+    LOCKED    - 参数已锁定，等待执行时刻（视觉模式下立即执行）
+    PRESSING  - 执行长按
+    VERIFYING - 确认画面开始运动（跳跃已生效），然后回到 SETTLING
+
+状态只由检测事件和定时器推进：游戏线程阻塞在检测通道上，超时时间就是当前状态的截止时刻，
+不再用 sleep 轮询。每个状态的停留时间和整个跳跃周期的时长都会被记录下来。
+"""
+
+import time
+from collections import deque
+
+IDLE = "IDLE"
+SETTLING = "SETTLING"
+MEASURING = "MEASURING"
+LOCKED = "LOCKED"
+PRESSING = "PRESSING"
+VERIFYING = "VERIFYING"
+
+PHASES = (SETTLING, MEASURING, LOCKED, PRESSING, VERIFYING)
+
+
+class JumpStateMachine:
+    """跳跃周期状态机
+
+    on_lock(detection, by_vision) 在进入 LOCKED 后调用，负责锁定参数；
+    on_press() 在 PRESSING 状态中同步执行长按；
+    on_state_change(old, new, machine) 可选，用于刷新界面。
+    """
+
+    def __init__(self, on_lock, on_press, settle_detector=None, on_state_change=None,
+                 clock=time.perf_counter):
+        self.on_lock = on_lock
+        self.on_press = on_press
+        self.on_state_change = on_state_change
+        self.settle = settle_detector
+        self.clock = clock
+
+        # 时序参数（由外部在每次事件前更新）
+        self.stable_wait = 2.0      # 固定模式下的稳定等待；视觉模式下为最长等待
+        self.jump_delay = 1.5       # 固定模式下锁定后的跳跃间隔
+        self.use_vision = True      # 是否使用视觉稳定判断
+        self.verify_timeout = 1.0   # 按压后等待画面运动的最长时间
+
+        self.state = IDLE
+        self.state_since = 0.0
+        self.deadline = None
+        self.lock_by_vision = False
+        self.last_press_time = None
+        self.press_end_time = 0.0
+        self.last_verified = None
+
+        self.durations = {phase: deque(maxlen=100) for phase in PHASES}
+        self.last_durations = {}
+        self.cycle_times = deque(maxlen=100)
+        self.unverified_jumps = 0
+
+    def configure(self, stable_wait=None, jump_delay=None, use_vision=None):
+        if stable_wait is not None:
+            self.stable_wait = stable_wait
+        if jump_delay is not None:
+            self.jump_delay = jump_delay
+        if use_vision is not None:
+            self.use_vision = use_vision
+
+    # === 状态切换 ===
+
+    def transition(self, new_state, now, deadline=None):
+        old_state = self.state
+        if old_state != IDLE:
+            elapsed = now - self.state_since
+            self.durations[old_state].append(elapsed)
+            self.last_durations[old_state] = elapsed
+        self.state = new_state
+        self.state_since = now
+        self.deadline = deadline
+        if self.on_state_change:
+            self.on_state_change(old_state, new_state, self)
+
+    def start(self, now=None):
+        """开始游戏：第一跳不需要等待画面稳定"""
+        now = now if now is not None else self.clock()
+        self.last_press_time = None
+        self.lock_by_vision = False
+        self.transition(MEASURING, now)
+
+    def stop(self, now=None):
+        now = now if now is not None else self.clock()
+        if self.state != IDLE:
+            self.transition(IDLE, now)
+
+    def time_until_deadline(self, now=None):
+        """距当前状态截止时刻的秒数；没有定时器时返回None"""
+        if self.deadline is None:
+            return None
+        now = now if now is not None else self.clock()
+        return max(0.0, self.deadline - now)
+
+    # === 事件 ===
+
+    def handle_detection(self, detection, timestamp, now=None):
+        """处理一帧检测结果，timestamp 为该帧的采集时间"""
+        now = now if now is not None else self.clock()
+
+        if self.state == SETTLING and self.use_vision and self.settle and self.settle.is_settled():
+            self.lock_by_vision = True
+            self.transition(MEASURING, now)
+
+        if self.state == MEASURING and detection['valid_detection']:
+            self.lock(detection, now)
+        elif self.state == VERIFYING and timestamp >= self.press_end_time:
+            if self.settle is None or self.settle.motion_seen:
+                self.finish_verify(now, verified=True)
+
+        # 视觉模式下锁定后立即到期
+        self.handle_timeout(self.clock())
+
+    def handle_timeout(self, now=None):
+        """检查当前状态的定时器是否到期"""
+        now = now if now is not None else self.clock()
+        if self.deadline is None or now < self.deadline:
+            return
+
+        if self.state == SETTLING:
+            self.lock_by_vision = False
+            self.transition(MEASURING, now)
+        elif self.state == LOCKED:
+            self.press(now)
+        elif self.state == VERIFYING:
+            self.finish_verify(now, verified=False)
+
+    # === 动作 ===
+
+    def lock(self, detection, now):
+        if self.lock_by_vision or self.last_press_time is None:
+            deadline = now
+        else:
+            deadline = max(now, self.last_press_time + self.stable_wait + self.jump_delay)
+        self.transition(LOCKED, now, deadline)
+        self.on_lock(detection, self.lock_by_vision)
+
+    def press(self, now):
+        self.transition(PRESSING, now)
+        if self.last_press_time is not None:
+            self.cycle_times.append(now - self.last_press_time)
+        self.last_press_time = now
+
+        self.on_press()
+
+        end = self.clock()
+        self.press_end_time = end
+        if self.settle:
+            self.settle.reset(end)
+        if self.state == PRESSING:  # 按压过程中可能已被停止
+            self.transition(VERIFYING, end, end + self.verify_timeout)
+
+    def finish_verify(self, now, verified):
+        self.last_verified = verified
+        if not verified:
+            self.unverified_jumps += 1
+            print("⚠️ 按压后画面没有运动，跳跃可能未生效")
+        self.lock_by_vision = False
+        self.transition(SETTLING, now, self.last_press_time + self.stable_wait)
+
+    # === 统计 ===
+
+    @property
+    def mean_cycle_time(self):
+        return sum(self.cycle_times) / len(self.cycle_times) if self.cycle_times else None
+
+    def summary(self):
+        """上一个跳跃周期各状态的耗时"""
+        parts = [f"{phase}:{self.last_durations[phase]:.2f}s"
+                 for phase in PHASES if phase in self.last_durations]
+        if self.cycle_times:
+            parts.append(f"周期:{self.cycle_times[-1]:.2f}s (平均 {self.mean_cycle_time:.2f}s)")
+        return " ".join(parts)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+感知哈希近重复索引
+
+连续自动保存的帧（auto_00xxx_*.jpg）和手动采集的 jump_jump_*.jpg 经常几乎一模一样，
+只会拖长训练时间。这里用 dHash + 多索引哈希 找近重复图片：
+    - dHash：灰度图缩小到 (N+1)×N，比较相邻像素得到 N×N 位哈希。跳一跳画面细节很少，
+      64位(8×8)哈希会把不同场景判成重复，默认使用256位(16×16)，汉明距离 ≤8 视为近重复
+    - 多索引哈希：哈希切成 距离+1 段，每段一张精确匹配表，查询只比较同段相同的候选，
+      十万张图片时每次查询不到1ms
+    - 索引按数据根目录保存为 dhash_index.tsv（相对路径、哈希、修改时间、大小），只追加写入；
+      再次扫描时只对新增或修改过的图片计算哈希，删除记录为墓碑行，墓碑过多时启动时压缩
+    - 自动保存在后台写入线程中查询，近重复的帧不写入；prepare_dataset 合并数据源时跳过近重复
+
+离线报告（统计 datasets/ 下每个数据集内部和跨数据集的近重复）:
+    python image_dedup.py report
+    python image_dedup.py report --datasets ../datasets --distance 6 --show 20
+"""
+
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from storage_policy import IMAGE_SUFFIXES, atomic_write
+
+HASH_SIZE = 16
+DEFAULT_DISTANCE = 8
+INDEX_FILE = "dhash_index.tsv"
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """差值哈希，返回 hash_size² 位的整数"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class MultiIndex:
+    """多索引哈希：把哈希切成 max_distance+1 段，每段一张精确匹配表
+
+    距离不超过 max_distance 的两个哈希至少有一段完全相同（抽屉原理），查询时只需比较
+    落在同一段桶里的候选。BK树在256位哈希上几乎剪不掉分支（十万张时每次查询约25ms），
+    这里约0.6ms。
+    """
+
+    def __init__(self, max_distance=DEFAULT_DISTANCE, bits=HASH_SIZE ** 2):
+        parts = max_distance + 1
+        self.bounds = [(bits * i // parts, bits * (i + 1) // parts) for i in range(parts)]
+        self.tables = [{} for _ in self.bounds]
+        self.values = {}
+
+    def chunks(self, value):
+        return [(value >> low) & ((1 << (high - low)) - 1) for low, high in self.bounds]
+
+    def add(self, value, key):
+        if key in self.values:
+            self.remove(key)
+        self.values[key] = value
+        for table, chunk in zip(self.tables, self.chunks(value)):
+            table.setdefault(chunk, set()).add(key)
+
+    def remove(self, key):
+        value = self.values.pop(key, None)
+        if value is None:
+            return
+        for table, chunk in zip(self.tables, self.chunks(value)):
+            bucket = table[chunk]
+            bucket.discard(key)
+            if not bucket:
+                del table[chunk]
+
+    def nearest(self, value, max_distance, exclude=None):
+        """距离不超过 max_distance 的最近键 (距离, 键)，没有时返回None；完全相同时提前返回"""
+        best = None
+        seen = set()
+        for table, chunk in zip(self.tables, self.chunks(value)):
+            for key in table.get(chunk, ()):
+                if key in seen or key == exclude:
+                    continue
+                seen.add(key)
+                distance = hamming(value, self.values[key])
+                if distance <= max_distance and (best is None or distance < best[0]):
+                    best = (distance, key)
+                    if distance == 0:
+                        return best
+        return best
+
+    def __len__(self):
+        return len(self.values)
+
+
+class HashIndex:
+    """持久化、增量更新的近重复索引（一个数据根目录一个索引文件，键为相对路径）"""
+
+    def __init__(self, root, max_distance=DEFAULT_DISTANCE, hash_size=HASH_SIZE, path=None):
+        self.root = Path(root)
+        self.path = Path(path) if path else self.root / INDEX_FILE
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+        self.header = f"# dhash {hash_size}\n"
+
+        self.entries = {}            # 键 -> (哈希, 修改时间ns, 大小)
+        self.lookup = MultiIndex(max_distance, hash_size ** 2)
+        self.pending = []            # 尚未追加到索引文件的行
+        self.hashed = 0              # 本次计算过哈希的图片数
+        self.cached = 0              # 直接使用索引中哈希的图片数
+        self.load()
+
+    # === 索引文件 ===
+
+    def load(self):
+        start = time.perf_counter()
+        lines = 0
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                if f.readline() == self.header:
+                    for line in f:
+                        parts = line.rstrip("\n").split("\t")
+                        lines += 1
+                        if len(parts) == 2:
+                            self.entries.pop(parts[0], None)   # 墓碑：图片已删除
+                        elif len(parts) == 4:
+                            self.entries[parts[0]] = (int(parts[1], 16), int(parts[2]), int(parts[3]))
+                else:
+                    lines = -1   # 哈希尺寸不同的旧索引，全部重新计算
+        for key, (value, _, _) in self.entries.items():
+            self.lookup.add(value, key)
+        if lines < 0 or lines > 2 * len(self.entries) + 1000:
+            self.compact()
+        self.load_seconds = time.perf_counter() - start
+
+    def compact(self):
+        """只保留有效记录重写索引文件"""
+        self.pending = []
+        data = self.header + "".join(self.format_entry(key, *entry) for key, entry in self.entries.items())
+        self.root.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.path, data.encode('utf-8'))
+
+    @staticmethod
+    def format_entry(key, value, mtime_ns, size):
+        return f"{key}\t{value:x}\t{mtime_ns}\t{size}\n"
+
+    def flush(self):
+        if not self.pending:
+            return
+        new_file = not self.path.exists()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if new_file:
+                f.write(self.header)
+            f.writelines(self.pending)
+        self.pending = []
+
+    # === 增删查 ===
+
+    def key(self, path):
+        return Path(path).relative_to(self.root).as_posix()
+
+    def add(self, key, value, mtime_ns=0, size=0, flush=True):
+        self.entries[key] = (value, mtime_ns, size)
+        self.lookup.add(value, key)
+        self.pending.append(self.format_entry(key, value, mtime_ns, size))
+        if flush:
+            self.flush()
+
+    def remove(self, key, flush=True):
+        if self.entries.pop(key, None) is not None:
+            self.lookup.remove(key)
+            self.pending.append(f"{key}\t-\n")
+            if flush:
+                self.flush()
+
+    def find(self, value, exclude=None):
+        """距离最近的近重复 (距离, 键)，没有时返回None"""
+        return self.lookup.nearest(value, self.max_distance, exclude)
+
+    def hash_file(self, path, flush=True):
+        """图片的哈希：修改时间和大小与索引一致时直接使用，否则读取图片重新计算并写入索引"""
+        path = Path(path)
+        key = self.key(path)
+        stat = path.stat()
+        entry = self.entries.get(key)
+        if entry is not None and entry[1:] == (stat.st_mtime_ns, stat.st_size):
+            self.cached += 1
+            return entry[0]
+        image = cv2.imread(str(path))
+        if image is None:
+            return None
+        value = dhash(image, self.hash_size)
+        self.hashed += 1
+        self.add(key, value, stat.st_mtime_ns, stat.st_size, flush=flush)
+        return value
+
+    def sync(self, image_paths):
+        """为一批图片建立或更新索引，删除已不存在的记录，返回 {路径: 哈希}"""
+        hashes = {}
+        for path in image_paths:
+            value = self.hash_file(path, flush=False)
+            if value is not None:
+                hashes[Path(path)] = value
+        present = {self.key(path) for path in hashes}
+        for key in [key for key in self.entries if key not in present and not (self.root / key).exists()]:
+            self.remove(key, flush=False)
+        self.flush()
+        return hashes
+
+    def __len__(self):
+        return len(self.entries)
+
+    def summary(self):
+        return (f"索引 {len(self)} 张 (载入 {self.load_seconds * 1000:.0f}ms) | 本次计算哈希 {self.hashed} "
+                f"复用 {self.cached} | 阈值 ≤{self.max_distance}/{self.hash_size ** 2}位")
+
+
+def list_images(images_dir):
+    return sorted(path for path in Path(images_dir).iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def find_duplicates(hashes, max_distance=DEFAULT_DISTANCE):
+    """按顺序遍历 [(键, 哈希)]，先出现的图片保留；返回 {重复的键: (距离, 保留的键)}"""
+    kept = MultiIndex(max_distance)
+    duplicates = {}
+    for key, value in hashes:
+        match = kept.nearest(value, max_distance)
+        if match is not None:
+            duplicates[key] = match
+        else:
+            kept.add(value, key)
+    return duplicates
+
+
+# === 离线报告 ===
+
+def report(datasets_dir, max_distance=DEFAULT_DISTANCE, show=10):
+    from rich.console import Console
+    from rich.table import Table
+    from rich import box
+
+    console = Console()
+    datasets = sorted(path for path in Path(datasets_dir).iterdir() if (path / "images").is_dir())
+    if not datasets:
+        console.print(f"❌ 没有找到数据集: {datasets_dir}/*/images")
+        return
+
+    table = Table(title=f"🔁 近重复图片报告（dHash {HASH_SIZE}×{HASH_SIZE}，距离 ≤{max_distance}）", box=box.ROUNDED)
+    for column in ("数据集", "图片", "新计算哈希", "数据集内近重复", "跨数据集近重复", "耗时"):
+        table.add_column(column)
+
+    combined = []
+    per_dataset = []
+    for dataset_dir in datasets:
+        start = time.perf_counter()
+        index = HashIndex(dataset_dir, max_distance=max_distance)
+        hashes = index.sync(list_images(dataset_dir / "images"))
+        items = [(f"{dataset_dir.name}/{path.name}", value) for path, value in hashes.items()]
+        duplicates = find_duplicates(items, max_distance)
+        combined.extend(items)
+        per_dataset.append((dataset_dir.name, len(items), index.hashed, len(duplicates), time.perf_counter() - start))
+
+    all_duplicates = find_duplicates(combined, max_distance)
+    for name, images, hashed, inner, seconds in per_dataset:
+        cross = sum(1 for key, (_, kept) in all_duplicates.items()
+                    if key.startswith(f"{name}/") and not kept.startswith(f"{name}/"))
+        table.add_row(name, str(images), str(hashed), f"{inner} ({inner / max(images, 1):.0%})",
+                      str(cross), f"{seconds:.2f}s")
+    console.print(table)
+
+    total = len(combined)
+    console.print(f"📊 合计 {total} 张图片，去重后保留 {total - len(all_duplicates)} 张 "
+                  f"（近重复 {len(all_duplicates)} 张, {len(all_duplicates) / max(total, 1):.0%}）")
+    for key, (distance, kept) in sorted(all_duplicates.items(), key=lambda item: item[1][0])[:show]:
+        console.print(f"   {key}  ≈  {kept}  (距离 {distance})")
+
+
+def main():
+    import argparse
+
+    project_root = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description="感知哈希近重复索引")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    report_parser = subparsers.add_parser("report", help="统计 datasets/*/images 的近重复图片（增量更新各数据集的索引）")
+    report_parser.add_argument("--datasets", default=str(project_root / "datasets"), help="包含 */images 的目录")
+    report_parser.add_argument("--distance", type=int, default=DEFAULT_DISTANCE, help="视为近重复的最大汉明距离")
+    report_parser.add_argument("--show", type=int, default=10, help="列出距离最小的近重复图片数")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        report(args.datasets, args.distance, args.show)
+
+
+if __name__ == "__main__":
+    main()
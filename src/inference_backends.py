@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CPU推理后端：PyTorch / ONNX Runtime / OpenVINO
+
+游戏主机都只有CPU，直接用 .pt 权重走 PyTorch 推理比较慢。这里把权重导出为 ONNX 或
+OpenVINO 格式（缓存在权重文件旁边，权重更新后自动重新导出），再交给 ultralytics 的
+AutoBackend 加载——返回的模型调用方式和结果格式与 .pt 模型完全相同。
+
+首次导出后会在数据集图片上与 PyTorch 输出做一致性检查，不一致时删除导出结果并回退到
+PyTorch（allow_parity_mismatch: true 时只警告）。ONNX Runtime / OpenVINO 在第一次推理时
+才加载，加载模型后先预热推理一次，运行时缺失也能在启动时回退。后端通过
+assets/config/inference.yaml 选择，对比各后端延迟：
+    python inference_backends.py compare --backends pytorch onnx openvino
+"""
+
+import argparse
+import shutil
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import yaml
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CONFIG_PATH = PROJECT_ROOT / "assets" / "config" / "inference.yaml"
+PARITY_IMAGE_DIRS = [PROJECT_ROOT / "datasets" / "auto" / "images",
+                     PROJECT_ROOT / "datasets" / "manual" / "images"]
+
+BACKEND_NAMES = ("pytorch", "onnx", "openvino")
+
+DEFAULT_CONFIG = {
+    'backend': "pytorch",
+    'weights': None,
+    'imgsz': 640,
+    'parity_check': True,
+    'allow_parity_mismatch': False,
+}
+
+
+def load_inference_config(path=CONFIG_PATH):
+    """读取推理配置，文件不存在时使用默认值"""
+    config = dict(DEFAULT_CONFIG)
+    path = Path(path)
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update(yaml.safe_load(f) or {})
+    if config['backend'] not in BACKEND_NAMES:
+        raise ValueError(f"未知的推理后端: {config['backend']}（可选: {', '.join(BACKEND_NAMES)}）")
+    return config
+
+
+def candidate_weights():
+    """按优先级列出可能的权重文件位置"""
+    paths = [
+        PROJECT_ROOT / "assets/models/epoch92.pt",        # 最新的Small模型 (优先)
+        PROJECT_ROOT / "assets/models/yolov8n_best.pt",   # YOLOv8 Nano最佳模型
+        PROJECT_ROOT / "models/epoch92.pt",               # 向后兼容路径
+        PROJECT_ROOT / "runs/train/weights/best.pt",      # 标准训练输出位置
+    ]
+    runs_dir = PROJECT_ROOT / "runs"
+    if runs_dir.exists():
+        for run_dir in sorted(runs_dir.glob("*")):
+            for model_file in ["best.pt", "last.pt"]:
+                model_path = run_dir / "weights" / model_file
+                if model_path not in paths:
+                    paths.append(model_path)
+    return paths
+
+
+def resolve_weights(weights=None):
+    """返回要使用的 .pt 权重路径；配置中指定的路径优先，找不到时返回None"""
+    if weights:
+        path = Path(weights)
+        if not path.is_absolute():
+            path = PROJECT_ROOT / path
+        return path if path.exists() else None
+    for path in candidate_weights():
+        if path.exists():
+            return path
+    return None
+
+
+def exported_path(weights, backend):
+    """导出文件的缓存位置（与ultralytics的导出命名一致）"""
+    weights = Path(weights)
+    if backend == "onnx":
+        return weights.with_suffix(".onnx")
+    if backend == "openvino":
+        return weights.parent / f"{weights.stem}_openvino_model"
+    return weights
+
+
+def export_weights(weights, backend, imgsz=640):
+    """导出为指定格式，已有且比权重新的导出结果直接复用；返回 (路径, 是否新导出)"""
+    from ultralytics import YOLO
+
+    weights = Path(weights)
+    target = exported_path(weights, backend)
+    if backend == "pytorch":
+        return target, False
+    if target.exists() and target.stat().st_mtime >= weights.stat().st_mtime:
+        return target, False
+
+    print(f"📦 导出 {weights.name} → {backend} ...")
+    output = YOLO(str(weights)).export(format=backend, imgsz=imgsz)
+    return Path(output), True
+
+
+def remove_export(path):
+    path = Path(path)
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def load_detector(weights, backend="pytorch", imgsz=640, parity_check=True, allow_parity_mismatch=False):
+    """加载指定后端的检测模型，返回可以像 YOLO 一样调用的模型
+
+    加载后先预热推理一次（推理运行时在第一次推理时才加载）。一致性检查不通过时删除导出结果
+    并抛出 RuntimeError（下次启动重新导出并检查），allow_parity_mismatch 为真时只警告。
+    """
+    from ultralytics import YOLO
+
+    path, fresh = export_weights(weights, backend, imgsz)
+    model = YOLO(str(path), task="detect")
+    model(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), verbose=False)
+
+    if fresh and parity_check:
+        report = check_parity(YOLO(str(weights)), model, parity_images())
+        print(f"🔍 一致性检查 [{backend}] {format_parity(report)}")
+        if not report['passed']:
+            if not allow_parity_mismatch:
+                remove_export(path)
+                raise RuntimeError(f"{backend} 输出与 PyTorch 不一致，已删除导出结果: {path}")
+            print(f"⚠️ {backend} 输出与 PyTorch 不一致，请检查导出结果: {path}")
+    return model
+
+
+def load_configured_detector(config=None):
+    """按配置加载模型，导出、加载、预热或一致性检查失败时回退到PyTorch；返回 (模型, 权重路径, 实际后端)"""
+    config = config or load_inference_config()
+    weights = resolve_weights(config['weights'])
+    if weights is None:
+        raise FileNotFoundError("未找到训练好的模型文件")
+
+    backend = config['backend']
+    try:
+        model = load_detector(weights, backend, config['imgsz'], config['parity_check'],
+                              config['allow_parity_mismatch'])
+    except Exception as e:
+        if backend == "pytorch":
+            raise
+        print(f"⚠️ {backend} 后端加载失败，回退到PyTorch: {e}")
+        backend = "pytorch"
+        model = load_detector(weights, backend)
+    return model, weights, backend
+
+
+# === 一致性检查 ===
+
+def parity_images(limit=8):
+    images = []
+    for directory in PARITY_IMAGE_DIRS:
+        if directory.exists():
+            images.extend(sorted(directory.glob("*.jpg"))[:limit - len(images)])
+        if len(images) >= limit:
+            break
+    return images
+
+
+def box_iou(a, b):
+    """两组 xyxy 框的IoU矩阵"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def host_boxes(result, conf=0.25):
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int)
+    data = boxes.data.cpu().numpy()
+    data = data[data[:, 4] >= conf]
+    return data[:, :4], data[:, 4], data[:, 5].astype(int)
+
+
+def check_parity(reference, candidate, images, conf=0.25, iou_threshold=0.9, conf_tolerance=0.05):
+    """逐图对比两个模型的检测框：同类别且IoU达标视为匹配，统计匹配率和置信度差"""
+    matched = 0
+    total = 0
+    max_conf_diff = 0.0
+    min_iou = 1.0
+    for image_path in images:
+        frame = cv2.imread(str(image_path))
+        if frame is None:
+            continue
+        ref_xyxy, ref_conf, ref_cls = host_boxes(reference(frame, verbose=False)[0], conf)
+        cand_xyxy, cand_conf, cand_cls = host_boxes(candidate(frame, verbose=False)[0], conf)
+        total += max(len(ref_xyxy), len(cand_xyxy))
+        if len(ref_xyxy) == 0 or len(cand_xyxy) == 0:
+            continue
+
+        iou = box_iou(ref_xyxy, cand_xyxy)
+        iou[ref_cls[:, None] != cand_cls[None, :]] = 0
+        for i in range(len(ref_xyxy)):
+            j = int(iou[i].argmax())
+            if iou[i, j] >= iou_threshold:
+                matched += 1
+                min_iou = min(min_iou, float(iou[i, j]))
+                max_conf_diff = max(max_conf_diff, abs(float(ref_conf[i] - cand_conf[j])))
+                iou[:, j] = 0
+
+    match_rate = matched / total if total else 1.0
+    return {
+        'images': len(images),
+        'boxes': total,
+        'match_rate': match_rate,
+        'min_iou': min_iou,
+        'max_conf_diff': max_conf_diff,
+        'passed': match_rate >= 0.95 and max_conf_diff <= conf_tolerance,
+    }
+
+
+def format_parity(report):
+    status = "✅ 通过" if report['passed'] else "❌ 未通过"
+    return (f"{status} - 图片:{report['images']} 检测框:{report['boxes']} 匹配率:{report['match_rate']:.1%} "
+            f"最小IoU:{report['min_iou']:.3f} 最大置信度差:{report['max_conf_diff']:.3f}")
+
+
+# === 后端延迟对比 ===
+
+def measure_latency(model, frames, warmup=3):
+    for frame in frames[:warmup]:
+        model(frame, verbose=False)
+    times = []
+    for frame in frames:
+        start = time.perf_counter()
+        model(frame, verbose=False)
+        times.append((time.perf_counter() - start) * 1000)
+    return np.asarray(times)
+
+
+def compare_backends(weights, backends, frames, imgsz=640):
+    """在同一批帧上测量各后端延迟，并与PyTorch做一致性检查"""
+    from ultralytics import YOLO
+
+    reference = YOLO(str(weights))
+    images = parity_images()
+    rows = []
+    for backend in backends:
+        try:
+            model = reference if backend == "pytorch" else load_detector(weights, backend, imgsz, parity_check=False)
+        except Exception as e:
+            rows.append({'backend': backend, 'error': str(e)})
+            continue
+        times = measure_latency(model, frames)
+        row = {
+            'backend': backend,
+            'mean_ms': float(times.mean()),
+            'p95_ms': float(np.percentile(times, 95)),
+            'fps': 1000.0 / float(times.mean()),
+        }
+        if backend != "pytorch":
+            row['parity'] = check_parity(reference, model, images)
+        rows.append(row)
+    return rows
+
+
+def main():
+    from rich.console import Console
+    from rich.table import Table
+    from rich import box
+
+    parser = argparse.ArgumentParser(description="推理后端导出与对比")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="导出权重并做一致性检查")
+    export.add_argument("--weights", default=None)
+    export.add_argument("--backend", default="onnx", choices=[b for b in BACKEND_NAMES if b != "pytorch"])
+    compare = subparsers.add_parser("compare", help="对比各后端的推理延迟")
+    compare.add_argument("--weights", default=None)
+    compare.add_argument("--backends", nargs="+", default=list(BACKEND_NAMES), choices=BACKEND_NAMES)
+    compare.add_argument("--images", default=str(PARITY_IMAGE_DIRS[0]))
+    compare.add_argument("--frames", type=int, default=50)
+    args = parser.parse_args()
+
+    console = Console()
+    config = load_inference_config()
+    weights = resolve_weights(args.weights or config['weights'])
+    if weights is None:
+        console.print("[red]❌ 未找到训练好的模型文件[/red]")
+        return
+
+    if args.command == "export":
+        try:
+            load_detector(weights, args.backend, config['imgsz'], parity_check=True,
+                          allow_parity_mismatch=config['allow_parity_mismatch'])
+        except RuntimeError as e:
+            console.print(f"[red]❌ {e}[/red]")
+            return
+        console.print(f"[green]✅ 已导出: {exported_path(weights, args.backend)}[/green]")
+        return
+
+    frames = [cv2.imread(str(p)) for p in sorted(Path(args.images).glob("*.jpg"))[:args.frames]]
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        console.print(f"[red]❌ 没有可用的测试图片: {args.images}[/red]")
+        return
+
+    rows = compare_backends(weights, args.backends, frames, config['imgsz'])
+    table = Table(title=f"推理后端对比 - {weights.name} ({len(frames)} 帧)", box=box.ROUNDED)
+    table.add_column("后端", style="cyan")
+    table.add_column("平均延迟", justify="right")
+    table.add_column("P95延迟", justify="right")
+    table.add_column("帧率", style="green", justify="right")
+    table.add_column("一致性", justify="left")
+    for row in rows:
+        if 'error' in row:
+            table.add_row(row['backend'], "-", "-", "-", f"[red]{row['error']}[/red]")
+            continue
+        parity = format_parity(row['parity']) if 'parity' in row else "基准"
+        table.add_row(row['backend'], f"{row['mean_ms']:.1f}ms", f"{row['p95_ms']:.1f}ms",
+                      f"{row['fps']:.1f} FPS", parity)
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
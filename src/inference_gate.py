@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+推理前的画面变化门控
+
+把帧缩小成灰度缩略图，与上一次真正推理时的缩略图逐像素比较，统计明显变化的像素数。
+用变化像素数而不是平均差，是因为小人移动只占画面很小一块，平均差会把它淹没。
+画面基本没变（等待画面稳定、等待跳跃间隔时）直接复用上一次的检测结果，跳过YOLO推理。
+调用方可以传入忽略区域（例如快速定位到的小人框），比较时不统计该区域和上次推理时的忽略区域。
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+
+class ChangeGate:
+    """基于缩略图差异的推理门控"""
+
+    def __init__(self, threshold=8, pixel_delta=16, thumb_size=(72, 128), max_reuse_seconds=2.0):
+        self.threshold = threshold                  # 允许变化的缩略图像素数，越小越敏感
+        self.pixel_delta = pixel_delta              # 灰度差超过该值才算变化（过滤压缩/缩放噪声）
+        self.thumb_size = thumb_size                # 缩略图尺寸 (宽, 高)
+        self.max_reuse_seconds = max_reuse_seconds  # 超过该时长强制重新推理
+        self.enabled = True
+
+        self.small = np.empty((thumb_size[1], thumb_size[0], 3), dtype=np.uint8)
+        self.current = np.empty((thumb_size[1], thumb_size[0]), dtype=np.uint8)
+        self.reference = np.empty_like(self.current)
+        self.diff = np.empty_like(self.current)
+        self.has_reference = False
+        self.cached_result = None
+        self.reference_time = 0.0
+        self.reference_ignore = None                # 上次推理时的忽略区域
+
+        self.hits = 0      # 复用上次结果的次数
+        self.misses = 0    # 实际推理的次数
+        self.last_difference = 0
+
+    def set_threshold(self, threshold):
+        self.threshold = threshold
+
+    def infer(self, frame, infer_fn, ignore=None):
+        """画面变化时调用 infer_fn() 推理，否则返回缓存的结果
+
+        ignore 为全图坐标的 (x1, y1, x2, y2)，该区域（以及上次推理时的忽略区域）的变化不计入。
+        """
+        cv2.resize(frame, self.thumb_size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.current)
+
+        now = time.perf_counter()
+        if self.enabled and self.has_reference and now - self.reference_time < self.max_reuse_seconds:
+            cv2.absdiff(self.current, self.reference, dst=self.diff)
+            cv2.threshold(self.diff, self.pixel_delta, 255, cv2.THRESH_BINARY, dst=self.diff)
+            if ignore is not None:
+                for box in (ignore, self.reference_ignore):
+                    self.mask_region(frame, box)
+            self.last_difference = cv2.countNonZero(self.diff)
+            if self.last_difference <= self.threshold:
+                self.hits += 1
+                return self.cached_result
+
+        result = infer_fn()
+        self.misses += 1
+        self.cached_result = result
+        self.current, self.reference = self.reference, self.current
+        self.has_reference = True
+        self.reference_time = now
+        self.reference_ignore = ignore
+        return result
+
+    def mask_region(self, frame, box, margin=1):
+        """把全图坐标的框换算到缩略图（外扩 margin 像素）并清零差异"""
+        if box is None:
+            return
+        scale_x = self.thumb_size[0] / frame.shape[1]
+        scale_y = self.thumb_size[1] / frame.shape[0]
+        x1, y1 = max(int(box[0] * scale_x) - margin, 0), max(int(box[1] * scale_y) - margin, 0)
+        x2, y2 = int(box[2] * scale_x) + margin + 1, int(box[3] * scale_y) + margin + 1
+        self.diff[y1:y2, x1:x2] = 0
+
+    def invalidate(self):
+        """强制下一帧重新推理（例如参数变化或刚执行完跳跃）"""
+        self.has_reference = False
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self):
+        return (f"推理复用 {self.hits}/{self.hits + self.misses} ({self.hit_rate:.0%}), "
+                f"最近变化像素 {self.last_difference} / 阈值 {self.threshold}")
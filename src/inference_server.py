@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地推理服务 + 客户端
+
+玩家程序、实时检测器V2和无界面引擎原来各自加载一份YOLO模型，同时打开几个就有几份模型常驻内存，
+每次启动也都要重新加载/预热。这里把模型放进一个常驻的本地守护进程：
+    - 监听 localhost TCP 端口或 Unix 套接字，不访问任何外部网络，完全离线可用
+    - 多个客户端（进程或线程）同一时刻提交的帧由 BatchInferenceServer 合并成一个批次推理
+    - 返回紧凑的检测数组（每个框6个float32: x1, y1, x2, y2, conf, cls），而不是完整的结果对象
+    - 统计每个请求的排队等待、所在批次大小和服务端耗时，定期输出
+
+InferenceClient 的调用方式与 YOLO 模型相同（client(frame) 返回带 boxes.data 的结果列表），
+可以直接交给 JumpEngine / extract_detections 使用:
+    python inference_server.py --weights ../models/epoch92.pt
+    python inference_server.py --address unix:/tmp/jump_jump.sock --max-batch 4
+    python jump_jump_ai_player.py --inference-server 127.0.0.1:8765
+    python inference_server.py --probe dir:../datasets/auto/images --clients 3 --frames 200
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+MAGIC = b"JJIS"
+OP_DETECT = 1
+OP_STATS = 2
+STATUS_OK = 0
+STATUS_ERROR = 1
+MIN_CONFIDENCE = 0.25   # 服务端只返回高于该置信度的框，客户端再按自己的阈值筛选
+
+# 请求头: 魔数, 操作, 高, 宽, 通道数, 最低置信度；之后是 高×宽×通道 字节的uint8画面
+REQUEST = struct.Struct("<4sBxxxIIIf")
+# 响应头: 魔数, 状态, 框数量(或负载字节数), 批次大小, 排队ms, 推理ms, 服务端总耗时ms；之后是负载
+REPLY = struct.Struct("<4sBxxxIIfff")
+BOX_FIELDS = 6
+
+
+def parse_address(text):
+    """"host:port"、"port" 或 "unix:/path" → (地址族, 地址)"""
+    if text.startswith("unix:"):
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError("当前平台不支持Unix套接字，请使用 127.0.0.1:端口")
+        return socket.AF_UNIX, text[len("unix:"):]
+    host, _, port = text.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def recv_exact(sock, size):
+    """读取恰好 size 字节，对端关闭时返回None"""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            return None
+        received += count
+    return buffer
+
+
+def host_boxes(result, min_confidence):
+    """结果对象 → N×6 float32 数组（一次主机拷贝）"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, BOX_FIELDS), dtype=np.float32)
+    data = boxes.data.cpu().numpy()
+    return np.ascontiguousarray(data[data[:, 4] > min_confidence], dtype=np.float32)
+
+
+# === 结果对象（与 extract_detections 兼容） ===
+
+class HostArray:
+    """提供 .cpu().numpy() 的主机数组，模拟张量接口"""
+
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class RemoteBoxes:
+    def __init__(self, data):
+        self.data = HostArray(data)
+
+    def __len__(self):
+        return len(self.data.array)
+
+
+class RemoteResult:
+    def __init__(self, data):
+        self.boxes = RemoteBoxes(data)
+
+
+# === 统计 ===
+
+class RequestMetrics:
+    """请求的排队等待、批次大小和耗时统计"""
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.queue_total = 0.0
+        self.batch_total = 0
+        self.latency_total = 0.0
+        self.max_latency = 0.0
+        self.recent = deque(maxlen=window)   # 最近的耗时，用于P95
+
+    def record(self, queue_ms, batch, latency_ms):
+        with self.lock:
+            self.count += 1
+            self.queue_total += queue_ms
+            self.batch_total += batch
+            self.latency_total += latency_ms
+            self.max_latency = max(self.max_latency, latency_ms)
+            self.recent.append(latency_ms)
+
+    def error(self):
+        with self.lock:
+            self.errors += 1
+
+    def snapshot(self):
+        with self.lock:
+            count = self.count or 1
+            p95 = float(np.percentile(self.recent, 95)) if self.recent else 0.0
+            return {
+                'requests': self.count,
+                'errors': self.errors,
+                'queue_ms': self.queue_total / count,
+                'batch': self.batch_total / count,
+                'latency_ms': self.latency_total / count,
+                'p95_ms': p95,
+                'max_ms': self.max_latency,
+            }
+
+    def summary(self):
+        s = self.snapshot()
+        return (f"请求 {s['requests']} (失败 {s['errors']}) | 排队 {s['queue_ms']:.1f}ms | "
+                f"批大小 {s['batch']:.2f} | 耗时 平均:{s['latency_ms']:.1f}ms P95:{s['p95_ms']:.1f}ms "
+                f"最大:{s['max_ms']:.1f}ms")
+
+
+# === 服务端 ===
+
+class RequestHandler(socketserver.BaseRequestHandler):
+    """每个客户端连接一个线程，连接内的请求依次处理"""
+
+    def setup(self):
+        if self.server.address_family != getattr(socket, "AF_UNIX", None):
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.owner.connected(+1)
+
+    def finish(self):
+        self.server.owner.connected(-1)
+
+    def handle(self):
+        owner = self.server.owner
+        while True:
+            header = recv_exact(self.request, REQUEST.size)
+            if header is None:
+                return
+            magic, op, height, width, channels, min_confidence = REQUEST.unpack(header)
+            if magic != MAGIC:
+                return   # 不是本协议的客户端，直接断开
+
+            if op == OP_STATS:
+                payload = json.dumps(owner.stats(), ensure_ascii=False).encode("utf-8")
+                self.request.sendall(REPLY.pack(MAGIC, STATUS_OK, len(payload), 0, 0, 0, 0) + payload)
+                continue
+
+            buffer = recv_exact(self.request, height * width * channels)
+            if buffer is None:
+                return
+            frame = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, channels)
+            try:
+                data, request = owner.detect(frame, min_confidence)
+            except Exception as e:
+                owner.metrics.error()
+                message = str(e).encode("utf-8")
+                self.request.sendall(REPLY.pack(MAGIC, STATUS_ERROR, len(message), 0, 0, 0, 0) + message)
+                continue
+            queue_ms = (request['started'] - request['submitted']) * 1000
+            infer_ms = (request['finished'] - request['started']) * 1000
+            latency_ms = (request['finished'] - request['submitted']) * 1000
+            owner.metrics.record(queue_ms, request['batch'], latency_ms)
+            self.request.sendall(REPLY.pack(MAGIC, STATUS_OK, len(data), request['batch'],
+                                            queue_ms, infer_ms, latency_ms) + data.tobytes())
+
+
+class TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:
+    UnixServer = None
+
+
+class InferenceServer:
+    """持有模型的本地推理服务"""
+
+    def __init__(self, model, address=DEFAULT_ADDRESS, max_batch=8, max_wait=0.004):
+        from multi_instance import BatchInferenceServer
+
+        self.address = address
+        self.batcher = BatchInferenceServer(model, max_batch=max_batch, max_wait=max_wait)
+        self.metrics = RequestMetrics()
+        self.clients = 0
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+        family, bind_address = parse_address(address)
+        if family == socket.AF_INET:
+            server_class = TCPServer
+        else:
+            server_class = UnixServer
+            if os.path.exists(bind_address):
+                os.unlink(bind_address)   # 上次异常退出留下的套接字文件
+        self.server = server_class(bind_address, RequestHandler)
+        self.server.owner = self
+        self.thread = None
+
+    def connected(self, delta):
+        with self.lock:
+            self.clients += delta
+
+    def detect(self, frame, min_confidence):
+        request = self.batcher.submit(frame)
+        return host_boxes(request['result'], min_confidence), request
+
+    def stats(self):
+        stats = self.metrics.snapshot()
+        stats.update(clients=self.clients, uptime=time.perf_counter() - self.started,
+                     batches=self.batcher.batches, batching=self.batcher.batching)
+        return stats
+
+    def summary(self):
+        return f"客户端 {self.clients} | {self.metrics.summary()} | {self.batcher.summary()}"
+
+    def start(self):
+        """在后台线程中开始服务（serve_forever 用于前台运行）"""
+        self.batcher.start()
+        self.thread = threading.Thread(target=self.server.serve_forever, name="inference-server", daemon=True)
+        self.thread.start()
+
+    def serve_forever(self):
+        self.batcher.start()
+        self.server.serve_forever()
+
+    def close(self):
+        if self.thread:
+            self.server.shutdown()
+        self.server.server_close()
+        self.batcher.stop()
+        family, bind_address = parse_address(self.address)
+        if family != socket.AF_INET and os.path.exists(bind_address):
+            os.unlink(bind_address)
+
+
+# === 客户端 ===
+
+class InferenceClient:
+    """像 YOLO 模型一样调用的推理服务客户端
+
+    每个线程使用自己的连接（引擎的检测线程和保存训练数据的线程可以同时请求，也能进入同一批次）。
+    连接断开时（例如服务重启）自动重连一次。
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, min_confidence=MIN_CONFIDENCE, timeout=10.0):
+        self.address = address
+        self.min_confidence = min_confidence
+        self.timeout = timeout
+        self.local = threading.local()
+        self.sockets = []
+        self.lock = threading.Lock()
+        self.metrics = RequestMetrics()    # 排队和批次大小来自服务端，耗时为客户端往返时间
+        self.connection()                  # 立即连接，服务未启动时在调用方报错
+
+    def connection(self):
+        sock = getattr(self.local, "sock", None)
+        if sock is None:
+            family, address = parse_address(self.address)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(address)
+            except OSError:
+                sock.close()
+                raise
+            if family == socket.AF_INET:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.local.sock = sock
+            with self.lock:
+                self.sockets.append(sock)
+        return sock
+
+    def drop_connection(self):
+        sock = getattr(self.local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self.local.sock = None
+
+    def request(self, op, header, payload=b""):
+        """发送一个请求并读取响应头和负载，连接断开时重连重试一次"""
+        for attempt in range(2):
+            try:
+                sock = self.connection()
+                sock.sendall(header)
+                if len(payload):
+                    sock.sendall(payload)
+                reply = recv_exact(sock, REPLY.size)
+                if reply is None:
+                    raise ConnectionError("推理服务关闭了连接")
+                magic, status, count, batch, queue_ms, infer_ms, server_ms = REPLY.unpack(reply)
+                size = count * BOX_FIELDS * 4 if (op == OP_DETECT and status == STATUS_OK) else count
+                body = recv_exact(sock, size) if size else b""
+                if body is None:
+                    raise ConnectionError("推理服务关闭了连接")
+                if status != STATUS_OK:
+                    raise RuntimeError(f"推理服务错误: {bytes(body).decode('utf-8', 'replace')}")
+                return count, batch, queue_ms, body
+            except (ConnectionError, socket.timeout, OSError) as e:
+                self.drop_connection()
+                if attempt:
+                    raise ConnectionError(f"无法连接推理服务 {self.address}: {e}") from e
+
+    def detect(self, frame):
+        """返回 N×6 float32 检测数组 (x1, y1, x2, y2, conf, cls)"""
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        start = time.perf_counter()
+        header = REQUEST.pack(MAGIC, OP_DETECT, height, width, channels, self.min_confidence)
+        count, batch, queue_ms, body = self.request(OP_DETECT, header, memoryview(frame).cast("B"))
+        data = np.frombuffer(body, dtype=np.float32).reshape(count, BOX_FIELDS) if count else \
+            np.zeros((0, BOX_FIELDS), dtype=np.float32)
+        self.metrics.record(queue_ms, batch, (time.perf_counter() - start) * 1000)
+        return data
+
+    def __call__(self, frames, verbose=False):
+        if isinstance(frames, (list, tuple)):
+            return [RemoteResult(self.detect(frame)) for frame in frames]
+        return [RemoteResult(self.detect(frames))]
+
+    def server_stats(self):
+        header = REQUEST.pack(MAGIC, OP_STATS, 0, 0, 0, 0.0)
+        count, batch, queue_ms, body = self.request(OP_STATS, header)
+        return json.loads(bytes(body).decode("utf-8"))
+
+    def summary(self):
+        return f"推理服务 {self.address} - {self.metrics.summary()}"
+
+    def close(self):
+        with self.lock:
+            for sock in self.sockets:
+                sock.close()
+            self.sockets.clear()
+        self.local = threading.local()
+
+
+# === 命令行 ===
+
+def probe(args):
+    """用帧来源向服务发送请求（多个客户端线程并发），输出排队、批次大小和往返耗时"""
+    from frame_source import open_frame_source
+
+    source = open_frame_source(args.probe, clock="fast", loop=True)
+    frames = []
+    while len(frames) < min(args.frames, 32):
+        packet = source.read()
+        if packet is None:
+            break
+        frames.append(packet[0].copy())
+    source.close()
+    if not frames:
+        print(f"❌ 帧来源没有画面: {args.probe}")
+        return
+
+    clients = [InferenceClient(args.address) for _ in range(args.clients)]
+    per_client = args.frames // args.clients
+
+    def run(client):
+        for index in range(per_client):
+            client.detect(frames[index % len(frames)])
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = per_client * args.clients
+    print(f"📈 {total} 个请求，{args.clients} 个客户端，用时 {elapsed:.2f}s ({total / elapsed:.1f} 请求/秒)")
+    for index, client in enumerate(clients):
+        print(f"   客户端{index + 1}: {client.metrics.summary()}")
+        client.close()
+    stats = InferenceClient(args.address).server_stats()
+    print(f"🧠 服务端: 请求 {stats['requests']} | 排队 {stats['queue_ms']:.1f}ms | 批大小 {stats['batch']:.2f} | "
+          f"耗时 平均:{stats['latency_ms']:.1f}ms P95:{stats['p95_ms']:.1f}ms")
+
+
+def main(argv=None):
+    from inference_backends import BACKEND_NAMES
+
+    parser = argparse.ArgumentParser(description="跳一跳终结者 - 本地推理服务")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS,
+                        help="监听地址: host:port（只建议127.0.0.1）或 unix:/path/to.sock")
+    parser.add_argument("--weights", default=None, help="模型权重，默认按 inference.yaml 和常见位置查找")
+    parser.add_argument("--backend", default=None, choices=BACKEND_NAMES,
+                        help="推理后端，默认使用 inference.yaml 中的配置")
+    parser.add_argument("--max-batch", type=int, default=8, help="单个批次的最大帧数")
+    parser.add_argument("--batch-wait", type=float, default=0.004,
+                        help="第一帧到达后等待其他客户端凑批的最长时间(秒)")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="统计输出间隔(秒)")
+    parser.add_argument("--probe", default=None, help="不启动服务，而是用该帧来源测试已运行的服务")
+    parser.add_argument("--clients", type=int, default=2, help="测试时的并发客户端数")
+    parser.add_argument("--frames", type=int, default=200, help="测试时发送的请求总数")
+    args = parser.parse_args(argv)
+
+    if args.probe:
+        probe(args)
+        return
+
+    from jump_engine import load_model
+    model, weights, backend = load_model(args.weights, args.backend)
+    print(f"✅ 成功加载模型: {weights} (推理后端: {backend})")
+
+    server = InferenceServer(model, args.address, max_batch=args.max_batch, max_wait=args.batch_wait)
+    server.start()
+    print(f"🚀 推理服务已启动: {args.address}（Ctrl+C 停止）")
+    try:
+        while True:
+            time.sleep(args.report_interval)
+            print(f"📈 {server.summary()}")
+    except KeyboardInterrupt:
+        print("\n⏹ 已停止")
+    finally:
+        server.close()
+        print(f"📈 {server.summary()}")
+
+
+if __name__ == "__main__":
+    main()
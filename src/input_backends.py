@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+鼠标输入注入后端
+
+perform_jump 只需要"在某点按下"和"抬起"两个操作。pyautogui 每次调用都会移动光标并做
+安全检查，开销和抖动都不小。这里提供统一的后端接口：
+    pyautogui - 原有实现
+    pynput    - 直接调用系统鼠标接口
+    xtest     - Linux X11 XTest 扩展（python-xlib，随 pynput 安装）
+    uinput    - Linux 内核虚拟输入设备（python-evdev，需要 /dev/uinput 写权限）
+    mock      - 只记录事件，不操作鼠标（回放和测试）
+
+基准测试（建议在 Xvfb 下运行，避免干扰桌面）：
+    xvfb-run python input_backends.py benchmark
+在测试位置放一个小窗口监听X事件，测量从调用到按下/抬起事件到达X服务器的延迟（不是调用
+返回的耗时：各后端调用返回时事件不一定已经送达）。uinput 在内核层注入，不经过 Xvfb，
+会点击真实桌面，只有加 --allow-uinput 才测试；它在 Xvfb 下的事件收不到，不参与排名。
+结果按延迟和抖动排序写入 assets/config/input_backend_ranking.json，
+游戏程序的 --input-backend auto 会选用排名最高且可用的后端。
+"""
+
+import argparse
+import json
+import select
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_RANKING_PATH = PROJECT_ROOT / "assets" / "config" / "input_backend_ranking.json"
+BENCHMARK_BACKENDS = ("pyautogui", "pynput", "xtest")   # 默认测试的后端（都经过当前X显示）
+
+
+class InputBackend:
+    """输入后端基类"""
+
+    name = "base"
+
+    def down(self, x, y):
+        """移动到(x, y)并按下左键"""
+        raise NotImplementedError
+
+    def up(self):
+        """抬起左键"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def describe(self):
+        return self.name
+
+
+class PyAutoGUIBackend(InputBackend):
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+        pyautogui.PAUSE = 0
+        self.pyautogui = pyautogui
+
+    def down(self, x, y):
+        self.pyautogui.mouseDown(x, y)
+
+    def up(self):
+        self.pyautogui.mouseUp()
+
+
+class PynputBackend(InputBackend):
+    name = "pynput"
+
+    def __init__(self):
+        import pynput.mouse
+        self.button = pynput.mouse.Button.left
+        self.controller = pynput.mouse.Controller()
+
+    def down(self, x, y):
+        self.controller.position = (x, y)
+        self.controller.press(self.button)
+
+    def up(self):
+        self.controller.release(self.button)
+
+
+class XTestBackend(InputBackend):
+    """X11 XTest 扩展，直接向X服务器注入事件"""
+
+    name = "xtest"
+
+    def __init__(self):
+        from Xlib import X, display
+        from Xlib.ext import xtest
+        self.X = X
+        self.xtest = xtest
+        self.display = display.Display()
+        if not self.display.has_extension("XTEST"):
+            raise RuntimeError("X服务器不支持XTEST扩展")
+
+    def down(self, x, y):
+        self.xtest.fake_input(self.display, self.X.MotionNotify, x=int(x), y=int(y))
+        self.xtest.fake_input(self.display, self.X.ButtonPress, 1)
+        self.display.sync()
+
+    def up(self):
+        self.xtest.fake_input(self.display, self.X.ButtonRelease, 1)
+        self.display.sync()
+
+    def close(self):
+        self.display.close()
+
+
+class UinputBackend(InputBackend):
+    """内核虚拟输入设备（绝对坐标），不依赖X11/Wayland"""
+
+    name = "uinput"
+
+    def __init__(self, screen_size=None):
+        from evdev import AbsInfo, UInput, ecodes
+        if screen_size is None:
+            import pyautogui
+            screen_size = pyautogui.size()
+        width, height = screen_size
+        self.ecodes = ecodes
+        capabilities = {
+            ecodes.EV_KEY: [ecodes.BTN_LEFT],
+            ecodes.EV_ABS: [
+                (ecodes.ABS_X, AbsInfo(0, 0, width - 1, 0, 0, 0)),
+                (ecodes.ABS_Y, AbsInfo(0, 0, height - 1, 0, 0, 0)),
+            ],
+        }
+        self.device = UInput(capabilities, name="jump-jump-ai")
+
+    def down(self, x, y):
+        self.device.write(self.ecodes.EV_ABS, self.ecodes.ABS_X, int(x))
+        self.device.write(self.ecodes.EV_ABS, self.ecodes.ABS_Y, int(y))
+        self.device.write(self.ecodes.EV_KEY, self.ecodes.BTN_LEFT, 1)
+        self.device.syn()
+
+    def up(self):
+        self.device.write(self.ecodes.EV_KEY, self.ecodes.BTN_LEFT, 0)
+        self.device.syn()
+
+    def close(self):
+        self.device.close()
+
+
+class MockBackend(InputBackend):
+    """记录事件的模拟后端"""
+
+    name = "mock"
+
+    def __init__(self):
+        self.events = []   # (类型, x, y, perf_counter时间)
+
+    def down(self, x, y):
+        self.events.append(("down", x, y, time.perf_counter()))
+
+    def up(self):
+        self.events.append(("up", None, None, time.perf_counter()))
+
+    def presses(self):
+        """配对的按压记录: [(x, y, 按压时长)]"""
+        result = []
+        pending = None
+        for kind, x, y, t in self.events:
+            if kind == "down":
+                pending = (x, y, t)
+            elif pending is not None:
+                result.append((pending[0], pending[1], t - pending[2]))
+                pending = None
+        return result
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGUIBackend,
+    "pynput": PynputBackend,
+    "xtest": XTestBackend,
+    "uinput": UinputBackend,
+    "mock": MockBackend,
+}
+
+
+def create_backend(name):
+    """按名称创建后端，依赖缺失或环境不支持时抛出异常"""
+    if name not in BACKENDS:
+        raise ValueError(f"未知的输入后端: {name}（可选: {', '.join(BACKENDS)}）")
+    return BACKENDS[name]()
+
+
+def load_ranking(path=DEFAULT_RANKING_PATH):
+    """读取基准测试排名（后端名称列表，最好的在前），文件不存在时返回空列表"""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [entry['backend'] for entry in json.load(f)['ranking']]
+
+
+def select_backend(name="auto", ranking_path=DEFAULT_RANKING_PATH):
+    """name 为 auto 时按基准测试排名选择第一个可用的后端，没有排名时使用 pyautogui"""
+    if name != "auto":
+        return create_backend(name)
+
+    for candidate in load_ranking(ranking_path) + ["pyautogui"]:
+        if candidate == "mock":
+            continue
+        try:
+            backend = create_backend(candidate)
+            print(f"🖱️ 输入后端: {candidate}")
+            return backend
+        except Exception as e:
+            print(f"⚠️ 输入后端 {candidate} 不可用: {e}")
+    raise RuntimeError("没有可用的输入后端")
+
+
+class XEventListener:
+    """在测试位置放一个无边框小窗口，记录按下/抬起事件到达X服务器（并转发给窗口）的时刻"""
+
+    def __init__(self, position, size=40):
+        from Xlib import X, display
+        self.X = X
+        self.display = display.Display()
+        screen = self.display.screen()
+        x, y = position
+        self.window = screen.root.create_window(
+            x - size // 2, y - size // 2, size, size, 0, screen.root_depth,
+            override_redirect=True, background_pixel=screen.black_pixel,
+            event_mask=X.ButtonPressMask | X.ButtonReleaseMask)
+        self.window.map()
+        self.display.sync()
+        time.sleep(0.1)   # 等窗口映射完成
+        self.drain()
+
+    def drain(self):
+        while self.display.pending_events():
+            self.display.next_event()
+
+    def wait(self, event_type, timeout=0.5):
+        """等待指定类型的事件，返回收到时的 perf_counter 时间，超时返回 None"""
+        deadline = time.perf_counter() + timeout
+        while True:
+            while self.display.pending_events():
+                if self.display.next_event().type == event_type:
+                    return time.perf_counter()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            select.select([self.display], [], [], remaining)
+
+    def close(self):
+        self.window.destroy()
+        self.display.close()
+
+
+def measure_backend(backend, listener, samples=200, position=(10, 10)):
+    """测量从调用到按下/抬起事件送达的延迟；事件丢失的样本不计入，返回 None 表示事件收不到"""
+    X = listener.X
+    down_times = []
+    up_times = []
+    lost = 0
+    for _ in range(samples):
+        listener.drain()
+        t0 = time.perf_counter()
+        backend.down(*position)
+        pressed = listener.wait(X.ButtonPress)
+        t1 = time.perf_counter()
+        backend.up()
+        released = listener.wait(X.ButtonRelease)
+        if pressed is None or released is None:
+            lost += 1
+            if lost >= 5 and not down_times:
+                return None
+            continue
+        down_times.append((pressed - t0) * 1000)
+        up_times.append((released - t1) * 1000)
+        time.sleep(0.002)
+    if not down_times:
+        return None
+
+    down = np.asarray(down_times)
+    up = np.asarray(up_times)
+    return {
+        'backend': backend.name,
+        'samples': len(down_times),
+        'lost': lost,
+        'down_mean_ms': float(down.mean()),
+        'down_std_ms': float(down.std()),
+        'up_mean_ms': float(up.mean()),
+        'up_std_ms': float(up.std()),
+        'up_p99_ms': float(np.percentile(up, 99)),
+        # 按压时长误差主要来自抬起操作的延迟和抖动
+        'score_ms': float(up.mean() + 3 * up.std()),
+    }
+
+
+def run_benchmark(names, samples, output, allow_uinput=False, position=(20, 20)):
+    try:
+        listener = XEventListener(position)
+    except Exception as e:
+        print(f"❌ 无法在当前X显示上监听事件（需要 python-xlib 和 DISPLAY，建议 xvfb-run）: {e}")
+        return None
+
+    results = []
+    try:
+        for name in names:
+            if name == "mock":
+                continue   # 不产生真实事件
+            if name == "uinput" and not allow_uinput:
+                print("⚠️ 跳过 uinput: 它在内核层注入，会点击真实桌面（确认后加 --allow-uinput）")
+                continue
+            try:
+                backend = create_backend(name)
+            except Exception as e:
+                print(f"⚠️ 跳过 {name}: {e}")
+                continue
+            try:
+                backend.down(*position)   # 预热
+                backend.up()
+                stats = measure_backend(backend, listener, samples, position)
+            finally:
+                backend.close()
+            if stats is None:
+                print(f"⚠️ {name} 的事件没有送达当前X显示（例如 uinput 在 Xvfb 下），不参与排名")
+                continue
+            results.append(stats)
+            print(f"{name:10s} 按下:{stats['down_mean_ms']:.3f}±{stats['down_std_ms']:.3f}ms "
+                  f"抬起:{stats['up_mean_ms']:.3f}±{stats['up_std_ms']:.3f}ms P99:{stats['up_p99_ms']:.3f}ms "
+                  f"丢失:{stats['lost']}")
+    finally:
+        listener.close()
+
+    ranking = sorted(results, key=lambda r: r['score_ms'])
+    if not ranking:
+        print("❌ 没有可用的输入后端")
+        return None
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'created': time.strftime("%Y-%m-%d %H:%M:%S"), 'ranking': ranking},
+                  f, ensure_ascii=False, indent=2)
+    print(f"🏆 最佳后端: {ranking[0]['backend']}，排名已写入 {output}")
+    return ranking
+
+
+def main():
+    parser = argparse.ArgumentParser(description="鼠标输入后端工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    bench = subparsers.add_parser("benchmark", help="测量各后端事件送达的延迟和抖动（建议在 xvfb-run 下运行）")
+    bench.add_argument("--backends", nargs="+", default=list(BENCHMARK_BACKENDS),
+                       choices=[name for name in BACKENDS if name != "mock"])
+    bench.add_argument("--allow-uinput", action="store_true",
+                       help="允许测试 uinput（内核层注入，不受 Xvfb 隔离，会点击真实桌面）")
+    bench.add_argument("--samples", type=int, default=200)
+    bench.add_argument("--output", default=str(DEFAULT_RANKING_PATH))
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        run_benchmark(args.backends, args.samples, args.output, args.allow_uinput)
+
+
+if __name__ == "__main__":
+    main()
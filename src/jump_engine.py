@@ -0,0 +1,987 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+跳一跳引擎核心（无界面）
+
+采集、推理、决策、鼠标输入和训练数据保存原来全部写在 Tk 的 JumpJumpAIPlayer 类里，
+没有界面就无法运行，也无法在没有界面开销的情况下测量引擎吞吐。这里把它们提取为可导入的
+JumpEngine：参数通过 ParamStore 快照读取，界面状态只写入 UIState 快照，引擎本身不依赖Tk。
+Tk 程序、实时检测器V2和独立运行版都只是它的薄客户端。
+
+直接运行即为无界面命令行入口，定期输出帧率、每分钟跳跃次数和CPU占用:
+    python jump_engine.py --region 600,150,400,700
+    python jump_engine.py --source session:recordings/run1 --clock fast --duration 60
+    python jump_engine.py --region 600,150,400,700 --detect-only --backend onnx
+    python jump_engine.py --source dir:../datasets/auto/images --clock fast --detect-only --track
+"""
+
+import math
+import stat
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from frame_source import SessionRecorder, open_frame_source
+from inference_gate import ChangeGate
+from scene_settle import SettleDetector
+from latest_channel import AgeStats, LatestChannel
+from press_timing import PressTimer
+from input_backends import BACKENDS, MockBackend, select_backend
+from inference_backends import BACKEND_NAMES, load_configured_detector, load_inference_config
+from detection_postprocess import BLOCK, bbox, center, extract_detections, select_targets
+from overlay_renderer import add_box, add_line, add_point, new_overlay
+from ui_state import UIState
+from param_store import ParamStore
+from data_writer import DROP_POLICIES, TrainingDataWriter
+from image_dedup import DEFAULT_DISTANCE, HashIndex
+from storage_policy import EVICTION_ORDERS, IMAGE_FORMATS, StoragePolicy
+from game_state_machine import JumpStateMachine, LOCKED, MEASURING, PRESSING, SETTLING
+
+DEFAULT_PARAMS = {
+    'jump_factor': 0.00404,          # 跳跃因子（距离乘数）- 验证最优值
+    'jump_delay': 1.5,               # 跳跃间隔秒数
+    'stable_wait': 2.0,              # 画面稳定等待时间
+    'confidence_threshold': 0.6,     # 置信度阈值
+    'vision_settle': True,           # 视觉判断画面稳定，稳定等待时间作为上限
+    'auto_save_enabled': True,       # 自动保存训练数据
+}
+
+# 类别颜色（BGR格式）
+CLASS_COLORS = {0: (255, 0, 0), 1: (0, 255, 0)}
+
+
+def load_model(weights=None, backend=None):
+    """加载检测模型，weights/backend 覆盖 assets/config/inference.yaml 中的配置；返回 (模型, 权重路径, 实际后端)"""
+    config = load_inference_config()
+    if weights:
+        config['weights'] = str(Path(weights).resolve())
+    if backend:
+        config['backend'] = backend
+    return load_configured_detector(config)
+
+
+def build_jump_overlay(frame, detections, person_index, target_index, distance):
+    """跳跃决策用的叠加层：小人、目标方块、其他方块和两者之间的连线"""
+    overlay = new_overlay(frame.shape[1], frame.shape[0])
+
+    if person_index is not None:
+        person = detections[person_index]
+        add_box(overlay, bbox(person), CLASS_COLORS[0], 3, f"小人: {person['conf']:.2f}")
+        # 小人计算中心点（底部向上3px）
+        add_point(overlay, center(person), 6, (255, 0, 0), "人心")
+
+    if target_index is not None:
+        target_block = detections[target_index]
+        add_box(overlay, bbox(target_block), (0, 255, 255), 4,  # 黄色边框
+                f"目标: {target_block['conf']:.2f}", (0, 255, 255))
+        # 方块计算中心点（3/4位置，平台中心）
+        add_point(overlay, center(target_block), 8, (0, 255, 255), "台心")
+
+    # 其他方块
+    for index in np.flatnonzero(detections['cls'] == BLOCK):
+        if index != target_index:
+            block = detections[index]
+            add_box(overlay, bbox(block), CLASS_COLORS[1], 2, f"方块: {block['conf']:.2f}")
+
+    if distance:
+        add_line(overlay, center(detections[person_index]), center(detections[target_index]),
+                 (255, 255, 0), 2, f"{distance:.0f}px")
+    return overlay
+
+
+class EngineStats:
+    """引擎吞吐统计：帧率、每分钟跳跃次数、进程CPU占用（100% = 占满一个核）"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.start_time = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.frames = 0
+        self.jumps = 0
+        self.window_time = self.start_time
+        self.window_cpu = self.start_cpu
+        self.window_frames = 0
+
+    def sample(self):
+        """返回上次采样以来的 (帧率, CPU%)，并开始新的采样窗口"""
+        now, cpu = time.perf_counter(), time.process_time()
+        elapsed = max(now - self.window_time, 1e-6)
+        fps = (self.frames - self.window_frames) / elapsed
+        cpu_percent = (cpu - self.window_cpu) / elapsed * 100
+        self.window_time, self.window_cpu, self.window_frames = now, cpu, self.frames
+        return fps, cpu_percent
+
+    def totals(self):
+        elapsed = max(time.perf_counter() - self.start_time, 1e-6)
+        return {
+            'elapsed': elapsed,
+            'frames': self.frames,
+            'fps': self.frames / elapsed,
+            'jumps': self.jumps,
+            'jumps_per_minute': self.jumps / elapsed * 60,
+            'cpu_percent': (time.process_time() - self.start_cpu) / elapsed * 100,
+        }
+
+
+class JumpEngine:
+    """跳一跳引擎：检测线程 + 游戏线程 + 跳跃周期状态机，不依赖任何界面"""
+
+    def __init__(self, model, frame_source, params=None, inference_gate=None, input_backend=None,
+                 press_timer=None, record_dir=None, max_detection_age=0.3, data_root="auto_generated_data",
+                 overlay_builder=build_jump_overlay, detect_only=False, name="引擎", tracker=None,
+                 player_locator=None, save_queue=16, save_policy="drop_oldest",
+                 storage_overrides=None, dedup_distance=DEFAULT_DISTANCE, sampler=None):
+        self.name = name                # 多实例运行时区分各个引擎
+        self.model = model
+        self.frame_source = frame_source
+        self.recorder = SessionRecorder(record_dir) if record_dir else None
+        self.detect_only = detect_only  # 只检测不游戏（实时检测器V2）
+
+        # 实时屏幕来源的采集器（回放来源没有）
+        self.capturer = getattr(frame_source, 'capturer', None)
+        self.capture_area = None
+        self.click_center_x = 0
+        self.click_center_y = 0
+        self.capture_report_interval = 200  # 每采集N帧输出一次采集统计
+
+        # 鼠标输入后端：回放时只记录按压，不操作鼠标
+        if input_backend is None:
+            input_backend = select_backend("auto") if frame_source.is_live else MockBackend()
+        self.input_backend = input_backend
+
+        # 长按计时器：专用线程 + 自旋等待，补偿注入开销
+        self.press_timer = press_timer or PressTimer()
+        self.press_report_interval = 10  # 每N次跳跃输出一次误差直方图
+
+        # 画面变化门控：画面没变时复用上一次检测结果，跳过YOLO推理
+        self.inference_gate = inference_gate or ChangeGate()
+        # 帧间跟踪：为None时每次推理都运行全图YOLO
+        self.tracker = tracker
+        # 小人快速定位（颜色分割），YOLO的小人检测作为定期校验和兜底
+        self.player_locator = player_locator
+        self.last_detections = None     # 上一帧的检测结果（主动学习比较前后帧是否一致）
+        self.overlay_builder = overlay_builder  # 为None时不生成叠加层（无界面运行）
+
+        # 参数快照和界面状态快照（客户端绑定自己的控件，无界面时没有消费者）
+        self.params = ParamStore(**dict(DEFAULT_PARAMS, **(params or {})))
+        self.ui = UIState()
+
+        # 最新画面和检测结果通道（新值覆盖旧值，附带序号和采集时间戳）
+        self.image_channel = LatestChannel()
+        self.detection_channel = LatestChannel()
+        self.max_detection_age = max_detection_age  # 决策时允许的最大帧龄(秒)，超过则拒绝
+        self.decision_age = AgeStats()
+        self.stats = EngineStats()
+
+        # 场景稳定检测：镜头平移和落地动画结束后立即锁定参数
+        self.settle_detector = SettleDetector()
+
+        # 跳跃周期状态机（SETTLING → MEASURING → LOCKED → PRESSING → VERIFYING）
+        self.state_machine = JumpStateMachine(on_lock=self.on_cycle_locked,
+                                              on_press=self.execute_locked_jump,
+                                              settle_detector=self.settle_detector,
+                                              on_state_change=self.on_jump_state_changed)
+
+        # 线程和游戏状态
+        self.running = False
+        self.is_playing = False
+        self.detection_thread = None
+        self.game_thread = None
+        self.jump_count = 0
+        self.play_start_time = 0
+        self.current_distance = 0
+
+        # 跳跃参数锁定
+        self.locked_distance = 0       # 锁定的距离
+        self.locked_factor = 0         # 锁定的因子
+        self.locked_duration = 0       # 锁定的点按时长
+
+        # 自动数据生成
+        self.data_root = Path(data_root)
+        self.data_save_count = 0        # 保存数据计数器
+        self.data_writer = None         # 后台写入器（setup_data_directories 中创建）
+        self.save_queue = save_queue
+        self.save_policy = save_policy
+        self.storage_overrides = storage_overrides or {}   # 覆盖 storage.yaml 中的存储策略
+        self.dedup_distance = dedup_distance                 # 近重复判定的最大汉明距离，0 关闭去重
+        self.last_save_time = None      # 上一次锁定时保存训练数据的耗时(秒)
+        self.sampler = sampler          # 主动学习采样：为None时每次锁定都保存
+        if not detect_only:
+            self.setup_data_directories()   # 创建数据保存目录
+
+    @property
+    def is_jumping(self):
+        """正在执行长按"""
+        return self.state_machine.state == PRESSING
+
+    @property
+    def jump_cycle_locked(self):
+        """跳跃参数已锁定（锁定到按压结束）"""
+        return self.state_machine.state in (LOCKED, PRESSING)
+
+    def press_duration(self, distance):
+        """距离对应的点按时长（限制在0.05-3秒）"""
+        return max(0.05, min(3.0, distance * self.params.get('jump_factor')))
+
+    # === 生命周期 ===
+
+    def set_capture_area(self, area):
+        """设置屏幕采集区域（mss格式 {"top", "left", "width", "height"}），点击位置为区域中心
+
+        进程模式下区域超过共享内存预分配的尺寸时抛出 ValueError，引擎状态保持不变。
+        """
+        if self.frame_source.is_live:
+            self.frame_source.set_area(area)
+        self.inference_gate.invalidate()   # 缓存的检测结果属于旧区域
+        self.capture_area = area
+        self.click_center_x = area['left'] + area['width'] // 2
+        self.click_center_y = area['top'] + area['height'] // 2
+
+    def start(self):
+        """启动检测线程"""
+        self.detection_channel.reopen()
+        if self.detection_thread and self.detection_thread.is_alive():
+            self.running = True
+            return
+        self.running = True
+        self.stats.reset()
+        self.detection_thread = threading.Thread(target=self.detection_loop, daemon=True)
+        self.detection_thread.start()
+
+    def stop(self):
+        """停止游戏和检测线程"""
+        self.stop_playing()
+        self.running = False
+        self.detection_channel.close()
+
+    def close(self):
+        """停止引擎并释放帧来源（工作进程、共享内存）、录制和按压线程"""
+        self.stop()
+        if self.detection_thread:
+            self.detection_thread.join(timeout=1.0)
+        self.frame_source.close()
+        if self.recorder:
+            self.recorder.close()
+        if self.data_writer:
+            self.data_writer.close()
+        self.press_timer.close()
+
+    def start_playing(self):
+        """开始AI游戏"""
+        if self.detect_only or self.is_playing:
+            return
+        self.is_playing = True
+        self.jump_count = 0
+        self.play_start_time = time.time()
+        self.settle_detector.reset()
+        self.detection_channel.reopen()
+        self.ui.set('game_status', "AI游戏运行中...")
+
+        self.game_thread = threading.Thread(target=self.ai_game_loop, daemon=True)
+        self.game_thread.start()
+
+    def stop_playing(self):
+        """停止AI游戏"""
+        if not self.is_playing:
+            return
+        self.is_playing = False
+        self.detection_channel.close()   # 唤醒正在等待检测结果的游戏线程，立即退出
+        self.ui.set('game_status', "AI游戏已停止")
+        self.ui.set('mouse_status', "待机")
+
+        # 重置跳跃状态
+        locked = self.jump_cycle_locked
+        self.state_machine.stop()
+        if locked:
+            self.unlock_jump_parameters()
+
+    # === 检测 ===
+
+    def capture_screen(self):
+        """使用mss进行屏幕捕获，返回环形缓冲区中的帧视图（下一轮采集可能覆盖）"""
+        if not self.capture_area or self.capturer is None:
+            return None
+
+        try:
+            return self.capturer.grab(self.capture_area)
+        except Exception as e:
+            print(f"截图错误: {e}")
+            return None
+
+    def detection_loop(self):
+        """检测循环（帧率由帧来源的时钟控制）"""
+        frame_count = 0
+        window_start = time.perf_counter()
+        while self.running:
+            try:
+                packet = self.frame_source.read()
+                if packet is None:
+                    if self.frame_source.exhausted:
+                        print(f"⏹ 帧来源已结束: {self.frame_source.describe()}")
+                        self.running = False
+                        break
+                    time.sleep(0.1)
+                    continue
+                frame, timestamp = packet[:2]
+
+                if self.recorder:
+                    self.recorder.write(frame, timestamp)
+
+                # 快速定位小人；结果可信时推理门控忽略小人区域（只有小人在动时不重新推理）
+                ignore = self.player_locator.prepare(frame) if self.player_locator is not None else None
+
+                if self.frame_source.detects:
+                    # 工作进程已经完成推理，共享内存中的检测结果按当前阈值筛选
+                    rows = packet[2]
+                    rows = rows[rows['conf'] > self.params.get('confidence_threshold')]
+                elif self.tracker is not None:
+                    # 跟踪上一次的检测框，按计划/场景变化/低置信度才运行YOLO（画面未变化时直接复用）
+                    rows = self.inference_gate.infer(frame, lambda: self.tracker.update(frame, self.detect_rows))
+                else:
+                    # YOLO检测（画面未变化时复用上一次结果）
+                    results = self.inference_gate.infer(frame, lambda: self.model(frame, verbose=False), ignore)
+                    # 一次性拷贝到主机并在NumPy中筛选（小人取脚底中心，方块取平台中心）
+                    rows = extract_detections(results[0], self.params.get('confidence_threshold'))
+
+                # 分析检测结果
+                detections = self.analyze_detections(frame, rows)
+                if self.frame_source.detects:
+                    detections['frame_seq'] = packet[3]   # 保存时用来确认共享内存中的帧没有被覆盖
+
+                # 场景稳定判断（运动能量 + 位置一致性）
+                if not self.detect_only:
+                    self.settle_detector.update(frame, detections['person_center'],
+                                                detections['target_block_center'], timestamp)
+
+                # 发布最新画面和检测结果（覆盖尚未消费的旧值）
+                self.image_channel.publish((frame, detections['overlay']), timestamp)
+                self.detection_channel.publish(detections, timestamp)
+                self.stats.frames += 1
+
+                # 端到端帧率统计
+                frame_count += 1
+                if frame_count % self.capture_report_interval == 0:
+                    now = time.perf_counter()
+                    fps = self.capture_report_interval / (now - window_start)
+                    window_start = now
+                    print(f"⏱️ 端到端 {fps:.1f} FPS - 来源: {self.frame_source.describe()}")
+                    if self.capturer is not None:
+                        print(f"📷 采集统计 - {self.capturer.stats.summary()}")
+                    if self.frame_source.detects:
+                        print(f"🧠 {self.frame_source.summary()}")
+                    else:
+                        print(f"🧠 {self.inference_gate.summary()}")
+                    if self.tracker is not None:
+                        print(f"🎯 {self.tracker.summary()}")
+                    if self.player_locator is not None:
+                        print(f"🟣 {self.player_locator.summary()}")
+                    if not self.detect_only:
+                        print(f"⏳ {self.decision_age.summary()}")
+
+            except Exception as e:
+                print(f"检测错误: {e}")
+                time.sleep(0.1)
+
+    def detect_rows(self, image):
+        """在整帧或ROI上运行YOLO，返回按当前阈值筛选的结构化数组（供跟踪器调用）"""
+        results = self.model(image, verbose=False)
+        return extract_detections(results[0], self.params.get('confidence_threshold'))
+
+    def analyze_detections(self, frame, detections):
+        """分析检测结果（DETECTION_DTYPE 结构化数组），找出小人和目标方块（叠加层只是描述，不在帧上绘制）"""
+        if self.player_locator is not None:
+            detections = self.player_locator.merge(frame, detections)
+        person_index, target_index = select_targets(detections)
+
+        # 选择最佳小人（置信度最高）；目标方块直接选择最上面的方块，不考虑小人位置
+        person_center = center(detections[person_index]) if person_index is not None else None
+        target_block_center = center(detections[target_index]) if target_index is not None else None
+
+        # 计算距离
+        distance = 0
+        if person_center and target_block_center:
+            distance = math.dist(person_center, target_block_center)
+
+        # 只有在不执行跳跃时才更新距离
+        if not self.is_jumping:
+            self.current_distance = distance
+
+        overlay = None
+        if self.overlay_builder is not None:
+            overlay = self.overlay_builder(frame, detections, person_index, target_index, distance)
+        previous_detections, self.last_detections = self.last_detections, detections
+
+        return {
+            'frame': frame,
+            'overlay': overlay,
+            'person_center': person_center,
+            'target_block_center': target_block_center,
+            'distance': distance,
+            'detections': detections,
+            'previous_detections': previous_detections,
+            'frame_seq': None,
+            'valid_detection': person_center is not None and target_block_center is not None
+        }
+
+    # === 决策 ===
+
+    def ai_game_loop(self):
+        """AI游戏主循环：检测结果和状态机定时器推进跳跃周期，不再定时轮询"""
+        machine = self.state_machine
+        # 只处理开始游戏之后产生的检测结果
+        latest = self.detection_channel.latest()
+        last_seq = latest.seq if latest else 0
+        machine.start()
+        params_version = -1
+        while self.is_playing:
+            try:
+                # 时序参数可以随时调整（只在参数版本变化时重新配置）
+                params = self.params.snapshot()
+                if params.version != params_version:
+                    params_version = params.version
+                    machine.configure(stable_wait=params.stable_wait,
+                                      jump_delay=params.jump_delay,
+                                      use_vision=params.vision_settle)
+
+                # 上一个候选帧等了两个完整周期还没有再次锁定：游戏已结束，按落地失败处理
+                if self.sampler is not None:
+                    timeout = max(5.0, 2 * (params.stable_wait + params.jump_delay))
+                    self.save_sampled_frames(self.sampler.expire(timeout))
+
+                # 阻塞到下一帧检测结果或当前状态的截止时刻
+                timeout = machine.time_until_deadline()
+                timeout = 0.5 if timeout is None else min(timeout, 0.5)
+                item = self.detection_channel.wait_newer(last_seq, timeout=timeout)
+                if item is None:
+                    machine.handle_timeout()
+                    continue
+                last_seq = item.seq
+                detection_data = item.value
+
+                # 拒绝过期的检测结果
+                frame_age = item.age()
+                if frame_age > self.max_detection_age:
+                    self.decision_age.reject()
+                    machine.handle_timeout()
+                    continue
+                self.decision_age.record(frame_age)
+
+                if detection_data['valid_detection']:
+                    distance = detection_data['distance']
+                    # 更新当前距离显示
+                    self.ui.set('distance_var', f"当前距离: {distance:.0f}px")
+
+                machine.handle_detection(detection_data, item.timestamp)
+
+            except Exception as e:
+                print(f"AI游戏循环错误: {e}")
+                time.sleep(0.5)
+        machine.stop()
+        if self.sampler is not None:
+            self.save_sampled_frames(self.sampler.flush())
+
+    def on_cycle_locked(self, detection_data, by_vision):
+        """状态机进入LOCKED后调用：锁定参数、保存训练数据、更新统计"""
+        distance = detection_data['distance']
+        if by_vision:
+            # 使用多帧一致的位置计算距离，避免单帧抖动
+            consensus = self.settle_detector.consensus()
+            if consensus:
+                distance = consensus[2]
+
+        if self.state_machine.last_durations:
+            save_info = f" 保存:{self.last_save_time * 1000:.1f}ms" if self.last_save_time is not None else ""
+            print(f"📐 最近一周期耗时 - {self.state_machine.summary()}{save_info}")
+        params = self.params.snapshot()
+        self.lock_jump_parameters(distance, params.jump_factor, by_vision)
+
+        # 自动保存训练数据（在画面稳定后）：直接使用锁定时的帧和检测结果
+        if params.auto_save_enabled:
+            save_start = time.perf_counter()
+            self.save_current_frame_data(detection_data)
+            self.last_save_time = time.perf_counter() - save_start
+
+        # 更新统计
+        self.jump_count += 1
+        self.stats.jumps += 1
+        jumps_per_minute = self.jump_count / max(time.time() - self.play_start_time, 1e-6) * 60
+        settle_duration = self.settle_detector.last_duration
+        mean_settle = self.settle_detector.mean_duration
+        self.ui.set('jump_count_var', f"跳跃次数: {self.jump_count}")
+        self.ui.set('jump_rate_var', f"跳跃速度: {jumps_per_minute:.1f} 次/分钟")
+        if by_vision:
+            self.ui.set('settle_time_var', f"稳定耗时: {settle_duration:.2f}s (平均 {mean_settle:.2f}s)")
+
+    def on_jump_state_changed(self, old_state, new_state, machine):
+        """状态切换时更新状态显示"""
+        if new_state == SETTLING:
+            if machine.use_vision:
+                status = f"等待画面稳定...（最长 {machine.stable_wait:.1f}s）"
+            else:
+                status = f"等待画面稳定... {machine.time_until_deadline():.1f}s"
+        elif new_state == MEASURING:
+            status = "等待检测小人和方块..."
+        elif new_state == LOCKED:
+            remaining = machine.time_until_deadline()
+            if machine.lock_by_vision or remaining == 0:
+                status = "画面已稳定，立即执行跳跃"
+            else:
+                status = f"参数已锁定，{remaining:.1f}秒后执行跳跃"
+        else:
+            return  # PRESSING/VERIFYING 保留"计划/实际"时长显示
+        self.ui.set('game_status', status)
+
+    def lock_jump_parameters(self, distance, factor, by_vision=False):
+        """锁定跳跃参数，开始跳跃周期"""
+        self.locked_distance = distance
+        self.locked_factor = factor
+        self.locked_duration = max(0.05, min(3.0, distance * factor))  # 限制范围
+
+        params = self.params.snapshot()
+        print(f"🔒 跳跃参数已锁定 - 距离:{distance:.0f}px × 因子:{factor:.3f} = 时长:{self.locked_duration:.3f}s")
+        if by_vision:
+            print(f"📅 时序安排: 画面已稳定（耗时:{self.settle_detector.last_duration:.2f}s），立即执行跳跃")
+        else:
+            print(f"📅 时序安排: 画面稳定等待:{params.stable_wait:.1f}s + 跳跃间隔:{params.jump_delay:.1f}s = 总计:{params.stable_wait + params.jump_delay:.1f}s")
+
+    def execute_locked_jump(self):
+        """执行使用锁定参数的跳跃"""
+        self.perform_jump(self.locked_duration, self.locked_distance, self.locked_factor)
+
+    def unlock_jump_parameters(self):
+        """解锁跳跃参数，结束跳跃周期"""
+        self.locked_distance = 0
+        self.locked_factor = 0
+        self.locked_duration = 0
+        print(f"🔓 跳跃周期结束，参数已解锁")
+
+    # === 输入 ===
+
+    def perform_jump(self, duration, locked_distance=None, locked_factor=None):
+        """执行跳跃操作"""
+        try:
+            # 更新状态显示锁定的参数
+            if self.frame_source.is_live:
+                info_text = f"({self.click_center_x}, {self.click_center_y}) - {duration:.3f}s"
+            else:
+                info_text = f"[回放] {duration:.3f}s"
+            if locked_distance and locked_factor:
+                info_text += f" [距离:{locked_distance:.0f}px × 因子:{locked_factor:.3f}]"
+
+            self.ui.set('mouse_status', "执行跳跃")
+            self.ui.set('last_click_info', info_text)
+
+            # 在游戏区域中心执行长按（按压线程中自旋计时）；回放模式下后端只记录事件
+            if self.frame_source.is_live:
+                x, y = self.click_center_x, self.click_center_y
+            else:
+                x, y = 0, 0
+            backend = self.input_backend
+            timing = self.press_timer.press(lambda: backend.down(x, y), backend.up, duration)
+            # 起跳后的第一帧变化可能还很小，不能复用起跳前的检测结果
+            self.inference_gate.invalidate()
+
+            # 实际按压时长（按下完成到抬起完成）
+            actual_duration = timing['actual']
+
+            # 更新状态显示实际时间对比
+            self.ui.set('mouse_status', "跳跃完成")
+            self.ui.set('game_status', f"计划:{duration:.3f}s 实际:{actual_duration:.3f}s")
+
+            # 输出详细调试信息
+            error_ms = abs(timing['error_ms'])
+            debug_info = (f"🎯 跳跃执行 - 计划:{duration:.3f}s, 实际:{actual_duration:.4f}s, 误差:{error_ms:.2f}ms "
+                          f"(注入 按下:{timing['down_ms']:.2f}ms 抬起:{timing['up_ms']:.2f}ms)")
+            if locked_distance and locked_factor:
+                debug_info += f" [锁定距离:{locked_distance:.0f}px × 因子:{locked_factor:.3f}]"
+            print(debug_info)
+
+            # 如果误差超过1ms，给出警告
+            if error_ms > 1:
+                print(f"⚠️  时间误差较大: {error_ms:.2f}ms")
+            else:
+                print(f"✅ 时间精度良好")
+
+            histogram = self.press_timer.histogram
+            if histogram.count % self.press_report_interval == 0:
+                print(f"📊 {histogram.summary()}")
+                print(histogram.render())
+
+        except Exception as e:
+            print(f"❌ 跳跃执行错误: {e}")
+            self.ui.set('mouse_status', "跳跃失败")
+        finally:
+            # 解锁跳跃参数，结束本次跳跃周期
+            self.unlock_jump_parameters()
+
+    # === 训练数据 ===
+
+    def setup_data_directories(self):
+        """创建数据保存目录"""
+        try:
+            # 按存储策略创建本次运行的图片、标注目录，后台写入器的已有数据数量来自持久化的计数文件，不再扫描目录
+            storage = StoragePolicy.from_config(self.data_root, **self.storage_overrides)
+            dedup = HashIndex(self.data_root, max_distance=self.dedup_distance) if self.dedup_distance else None
+            self.data_writer = TrainingDataWriter(self.data_root, capacity=self.save_queue, policy=self.save_policy,
+                                                  storage=storage, dedup=dedup,
+                                                  on_written=self.on_training_data_written)
+            self.images_dir = self.data_writer.images_dir
+            self.labels_dir = self.data_writer.labels_dir
+            directories = [self.data_root]
+            if storage.session:
+                directories += [self.data_root / "sessions", storage.root]
+            directories += [self.images_dir, self.labels_dir]
+
+            # 修改目录权限，确保用户laochou可以读写
+            import os
+
+            # 设置目录权限为755 (所有者读写执行，组和其他用户读执行)
+            mode = stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH
+            for directory in directories:
+                os.chmod(str(directory), mode)
+
+            # 如果需要，使用chown更改所有者为laochou
+            try:
+                import pwd
+                laochou_uid = pwd.getpwnam('laochou').pw_uid
+                laochou_gid = pwd.getpwnam('laochou').pw_gid
+
+                for directory in directories:
+                    os.chown(str(directory), laochou_uid, laochou_gid)
+                print(f"✅ 目录所有者已设置为用户laochou")
+            except (ImportError, KeyError, PermissionError) as e:
+                print(f"⚠️  无法更改目录所有者: {e}")
+                print(f"   请手动执行: sudo chown -R laochou:laochou {self.data_root}")
+
+            self.data_save_count = self.data_writer.count
+            self.ui.set('save_count_var', f"已保存: {self.data_save_count} 张图片")
+
+            print(f"✅ 数据目录已准备就绪:")
+            print(f"   图片目录: {self.images_dir}")
+            print(f"   标注目录: {self.labels_dir}")
+            print(f"   已有数据: {self.data_save_count} 张图片")
+            print(f"   存储策略: {storage.summary()}")
+            if dedup is not None:
+                print(f"   近重复去重: {dedup.summary()}")
+
+        except Exception as e:
+            print(f"❌ 创建数据目录失败: {e}")
+            self.params.set('auto_save_enabled', False)
+
+    def save_training_data(self, frame, detections, score=None, sidecar=None):
+        """保存训练数据 - 截图和YOLO标注（放进后台写入队列，编码和写文件不占用游戏线程）"""
+        if not self.params.get('auto_save_enabled'):
+            return
+
+        try:
+            # 确保目录和写入器存在
+            if self.data_writer is None:
+                self.setup_data_directories()
+                if self.data_writer is None:
+                    return
+
+            # 转换为YOLO格式 (class_id center_x center_y width height)，相对坐标
+            h, w = frame.shape[:2]
+            lines = []
+            for detection in detections:
+                x1, y1, x2, y2 = bbox(detection)
+                center_x = ((x1 + x2) / 2) / w
+                center_y = ((y1 + y2) / 2) / h
+                bbox_width = (x2 - x1) / w
+                bbox_height = (y2 - y1) / h
+                lines.append(f"{int(detection['cls'])} {center_x:.6f} {center_y:.6f} {bbox_width:.6f} {bbox_height:.6f}\n")
+
+            # 信息量：检测越没把握的画面越值得保留（按信息量淘汰时使用）；主动学习采样时使用它的分数
+            if score is None:
+                score = 1.0 - float(detections['conf'].min()) if len(detections) else 0.0
+            if not self.data_writer.submit(frame, lines, score, sidecar):
+                print(f"⚠️ 写入队列已满，丢弃本次训练数据 - {self.data_writer.summary()}")
+
+        except Exception as e:
+            print(f"❌ 保存训练数据失败: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def on_training_data_written(self, total, image_filename):
+        """后台写入线程写完一对图片/标注后调用"""
+        self.data_save_count = total
+        self.ui.set('save_count_var', f"已保存: {self.data_save_count} 张图片")
+        print(f"📊 自动保存训练数据: {image_filename} (本次: {self.data_writer.written}, 总计: {self.data_save_count})")
+
+    def save_current_frame_data(self, detection_data):
+        """保存锁定跳跃参数时的那一帧和它的检测结果
+
+        不再重新截图并在游戏线程上再推理一次：标注与计算这次跳跃的画面完全一致，锁定时的推理次数减半。
+        帧可能是采集环形缓冲区（或进程模式的共享内存）中的视图，锁定时立即复制一份。
+        共享内存的槽位可能在锁定之前就被工作进程覆盖，复制后再确认一次序号，
+        帧已被覆盖时放弃保存（图片可能是撕裂的，也和检测结果对不上）。
+        """
+        try:
+            detections = detection_data['detections']
+            frame = detection_data['frame'].copy()
+            seq = detection_data.get('frame_seq')
+            if seq is not None and not self.frame_source.frame_valid(seq):
+                print(f"⚠️ 帧 #{seq} 在保存前已被共享内存覆盖，跳过保存")
+                return
+
+            if self.sampler is not None:
+                # 候选帧等到下一次锁定（知道这一跳是否落稳）后才决定是否保存
+                self.save_sampled_frames(self.sampler.offer(
+                    frame, detections, detection_data.get('previous_detections'),
+                    self.params.get('confidence_threshold')))
+            # 只有在检测到有效对象时才保存
+            elif len(detections):
+                self.save_training_data(frame, detections)
+
+        except Exception as e:
+            print(f"❌ 保存当前帧数据失败: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def save_sampled_frames(self, selected):
+        """保存主动学习采样选中的候选帧（分数和各项信号写入 sidecar）"""
+        for frame, detections, score, sidecar in selected:
+            if len(detections):
+                self.save_training_data(frame, detections, score, sidecar)
+
+    # === 统计 ===
+
+    def report(self):
+        """一行吞吐报告（帧率和CPU为上次报告以来的窗口值）"""
+        fps, cpu_percent = self.stats.sample()
+        totals = self.stats.totals()
+        if self.frame_source.detects:
+            inference = self.frame_source.summary()
+        else:
+            inference = f"推理复用: {self.inference_gate.hit_rate:.0%}"
+        if self.tracker is not None and not self.frame_source.detects:
+            tracker = self.tracker
+            total = tracker.tracked_frames + tracker.detected_frames
+            inference += f" | 跟踪帧: {tracker.tracked_frames / max(total, 1):.0%}"
+        return (f"帧率: {fps:.1f} FPS | 跳跃: {totals['jumps']} 次 ({totals['jumps_per_minute']:.1f} 次/分钟) | "
+                f"CPU: {cpu_percent:.0f}% | {inference}")
+
+
+# === 命令行入口 ===
+
+def parse_region(text):
+    """把 "left,top,width,height" 解析为mss区域"""
+    left, top, width, height = (int(value) for value in text.split(","))
+    return {"top": top, "left": left, "width": width, "height": height}
+
+
+def add_engine_arguments(parser):
+    """引擎参数（无界面入口和各个界面客户端共用）"""
+    parser.add_argument("--source", default="screen",
+                        help="帧来源: screen、dir:图片目录、video:视频文件、session:录制会话")
+    parser.add_argument("--clock", default="realtime", choices=["realtime", "fast", "stepped"],
+                        help="回放时钟: realtime按原节奏 / fast尽可能快 / stepped手动单步（回车放一帧）")
+    parser.add_argument("--fps", type=float, default=20, help="屏幕采集或图片目录回放帧率")
+    parser.add_argument("--loop", action="store_true", help="回放结束后从头循环")
+    parser.add_argument("--region", type=parse_region, default=None,
+                        help="屏幕采集区域 left,top,width,height（界面中也可以用鼠标选择）")
+    parser.add_argument("--record", default=None, help="把读取到的帧录制到该会话目录")
+    parser.add_argument("--process-pipeline", action="store_true",
+                        help="采集和推理放到独立工作进程，通过共享内存环形缓冲区传递帧和检测结果")
+    parser.add_argument("--inference-server", default=None, metavar="ADDRESS",
+                        help="使用已运行的本地推理服务（如 127.0.0.1:8765 或 unix:/tmp/jump_jump.sock），本进程不加载模型")
+    parser.add_argument("--weights", default=None, help="模型权重，默认按 inference.yaml 和常见位置查找")
+    parser.add_argument("--backend", default=None, choices=BACKEND_NAMES,
+                        help="推理后端，默认使用 inference.yaml 中的配置")
+    parser.add_argument("--jump-factor", type=float, default=DEFAULT_PARAMS['jump_factor'],
+                        help="跳跃因子（点按时长 = 距离 × 因子）")
+    parser.add_argument("--stable-wait", type=float, default=DEFAULT_PARAMS['stable_wait'],
+                        help="画面稳定等待(秒)，视觉判断开启时为最长等待")
+    parser.add_argument("--jump-delay", type=float, default=DEFAULT_PARAMS['jump_delay'], help="跳跃间隔(秒)")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_PARAMS['confidence_threshold'],
+                        help="检测置信度阈值")
+    parser.add_argument("--no-vision-settle", action="store_true", help="关闭视觉稳定判断，按固定时间等待")
+    parser.add_argument("--no-auto-save", action="store_true", help="不自动保存训练数据")
+    parser.add_argument("--gate-threshold", type=int, default=8,
+                        help="推理跳过阈值：缩略图变化像素数不超过该值时复用上次检测结果")
+    parser.add_argument("--no-gate", action="store_true", help="关闭推理跳过，每帧都运行YOLO")
+    parser.add_argument("--track", action="store_true",
+                        help="帧间跟踪检测框，YOLO只按计划、场景变化或跟踪置信度低时运行")
+    parser.add_argument("--detect-interval", type=int, default=10, help="跟踪模式下强制重新检测的间隔帧数")
+    parser.add_argument("--track-min-score", type=float, default=0.6,
+                        help="模板匹配得分低于该值时重新检测")
+    parser.add_argument("--no-roi", action="store_true", help="跟踪置信度低时在全图而不是轨迹区域内重新检测")
+    parser.add_argument("--fast-player", action="store_true",
+                        help="用颜色分割快速定位小人，YOLO的小人检测只做定期校验和兜底")
+    parser.add_argument("--verify-interval", type=int, default=15, help="快速定位与YOLO结果比较的间隔帧数")
+    parser.add_argument("--save-queue", type=int, default=16, help="训练数据后台写入队列容量")
+    parser.add_argument("--save-policy", default="drop_oldest", choices=DROP_POLICIES,
+                        help="写入队列满时的处理: 丢弃新数据 / 丢弃最旧的待写数据 / 短暂阻塞")
+    parser.add_argument("--save-format", default=None, choices=IMAGE_FORMATS,
+                        help="训练图片格式（默认读取 assets/config/storage.yaml）")
+    parser.add_argument("--save-quality", type=int, default=None, help="JPEG/WebP 质量 (1-100)")
+    parser.add_argument("--disk-budget", type=float, default=None,
+                        help="auto_generated_data 的磁盘上限(MB)，超过后按 --eviction 淘汰（默认不限制；"
+                             "只淘汰写入记录中本策略写入的图片）")
+    parser.add_argument("--eviction", default=None, choices=EVICTION_ORDERS,
+                        help="超过磁盘上限时的淘汰顺序: 最旧优先 / 信息量最低优先")
+    parser.add_argument("--active-learning", action="store_true",
+                        help="按检测不确定性给锁定帧打分，只保存最有信息量的帧（分数写入 scores/*.json）")
+    parser.add_argument("--min-informative", type=float, default=0.35,
+                        help="主动学习模式下保存所需的最低分数 (0-1)")
+    parser.add_argument("--save-fraction", type=float, default=None,
+                        help="主动学习模式下只保存最近候选帧中分数最高的这一比例")
+    parser.add_argument("--dedup-distance", type=int, default=DEFAULT_DISTANCE,
+                        help="与已保存图片的dHash汉明距离不超过该值时不保存（0 关闭近重复去重）")
+    parser.add_argument("--input-backend", default="auto", choices=["auto"] + list(BACKENDS),
+                        help="鼠标输入后端，auto按 input_backends.py benchmark 的排名选择")
+    parser.add_argument("--dry-run", action="store_true", help="不操作鼠标，只记录按压（实时来源也适用）")
+    parser.add_argument("--press-priority", action="store_true",
+                        help="提升长按计时线程的优先级（Linux上需要CAP_SYS_NICE权限）")
+    parser.add_argument("--max-frame-age", type=float, default=0.3,
+                        help="决策时允许的最大帧龄(秒)，更旧的检测结果会被拒绝")
+    return parser
+
+
+def build_engine(args, model, **kwargs):
+    """按命令行参数创建引擎（模型由调用方加载，便于界面客户端显示错误；进程模式下模型在工作进程中加载）"""
+    if args.process_pipeline and args.clock == "stepped":
+        raise ValueError("--clock stepped 需要在本进程中单步放帧，不能与 --process-pipeline 同时使用")
+    if args.process_pipeline:
+        from shm_pipeline import ProcessFrameSource
+        source = ProcessFrameSource(args.source, clock=args.clock, fps=args.fps, loop=args.loop,
+                                    weights=args.weights, backend=args.backend,
+                                    gate_threshold=args.gate_threshold, gate_enabled=not args.no_gate)
+    else:
+        source = open_frame_source(args.source, clock=args.clock, fps=args.fps, loop=args.loop)
+        if args.clock == "stepped":
+            source.clock.listen()
+    if args.dry_run or not source.is_live or kwargs.get('detect_only'):
+        backend = MockBackend()
+    else:
+        backend = select_backend(args.input_backend)
+    gate = ChangeGate(threshold=args.gate_threshold)
+    gate.enabled = not args.no_gate
+    tracker = None
+    if args.track and not args.process_pipeline:
+        from object_tracker import DetectionTracker
+        tracker = DetectionTracker(detect_interval=args.detect_interval, min_score=args.track_min_score,
+                                   roi=not args.no_roi)
+    player_locator = None
+    if args.fast_player:
+        from player_locator import PlayerLocator
+        player_locator = PlayerLocator(verify_interval=args.verify_interval)
+    sampler = None
+    if args.active_learning:
+        from active_sampler import UncertaintySampler
+        sampler = UncertaintySampler(min_score=args.min_informative, save_fraction=args.save_fraction)
+    params = {
+        'jump_factor': args.jump_factor,
+        'jump_delay': args.jump_delay,
+        'stable_wait': args.stable_wait,
+        'confidence_threshold': args.confidence,
+        'vision_settle': not args.no_vision_settle,
+        'auto_save_enabled': not args.no_auto_save,
+    }
+    engine = JumpEngine(model, source, params=params, inference_gate=gate, input_backend=backend,
+                        press_timer=PressTimer(elevate_priority=args.press_priority),
+                        record_dir=args.record, max_detection_age=args.max_frame_age, tracker=tracker,
+                        player_locator=player_locator, save_queue=args.save_queue,
+                        save_policy=args.save_policy,
+                        storage_overrides={'format': args.save_format, 'quality': args.save_quality,
+                                           'budget_mb': args.disk_budget, 'eviction': args.eviction},
+                        dedup_distance=args.dedup_distance, sampler=sampler,
+                        **kwargs)
+    if args.region and source.is_live:
+        engine.set_capture_area(args.region)
+    return engine
+
+
+def print_summary(engine):
+    """运行结束时的统计表"""
+    from rich.console import Console
+    from rich.table import Table
+
+    totals = engine.stats.totals()
+    table = Table(title="🤖 无界面运行统计")
+    table.add_column("指标", style="cyan")
+    table.add_column("数值", style="green")
+    table.add_row("运行时间", f"{totals['elapsed']:.1f}s")
+    table.add_row("处理帧数", f"{totals['frames']}")
+    table.add_row("平均帧率", f"{totals['fps']:.1f} FPS")
+    table.add_row("跳跃次数", f"{totals['jumps']}")
+    table.add_row("跳跃速度", f"{totals['jumps_per_minute']:.1f} 次/分钟")
+    table.add_row("平均CPU占用", f"{totals['cpu_percent']:.0f}%")
+    if engine.frame_source.detects:
+        table.add_row("工作进程", engine.frame_source.summary())
+    else:
+        table.add_row("推理门控", engine.inference_gate.summary())
+    if engine.tracker is not None and not engine.frame_source.detects:
+        table.add_row("帧间跟踪", engine.tracker.summary())
+    if engine.player_locator is not None:
+        table.add_row("小人快速定位", engine.player_locator.summary())
+    if engine.sampler is not None and engine.sampler.candidates:
+        table.add_row("主动学习采样", engine.sampler.summary())
+    if engine.data_writer is not None and engine.data_writer.written + engine.data_writer.dropped:
+        table.add_row("训练数据写入", engine.data_writer.summary())
+        table.add_row("训练数据存储", engine.data_writer.storage.summary())
+    if hasattr(engine.model, 'metrics'):
+        table.add_row("推理服务", engine.model.summary())
+    if engine.decision_age.count:
+        table.add_row("决策帧龄", engine.decision_age.summary())
+    if engine.press_timer.histogram.count:
+        table.add_row("长按误差", engine.press_timer.histogram.summary())
+    Console().print(table)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="跳一跳终结者 - 无界面引擎")
+    add_engine_arguments(parser)
+    parser.add_argument("--detect-only", action="store_true", help="只运行检测，不执行跳跃（测量检测吞吐）")
+    parser.add_argument("--duration", type=float, default=0, help="运行时长(秒)，0表示直到Ctrl+C或来源结束")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="吞吐报告间隔(秒)")
+    args = parser.parse_args(argv)
+
+    source_is_screen = args.source == "screen"
+    if source_is_screen and not args.region:
+        parser.error("屏幕采集需要 --region left,top,width,height")
+    if args.process_pipeline and args.inference_server:
+        parser.error("--process-pipeline 在工作进程中加载模型，不能与 --inference-server 同时使用")
+    if args.process_pipeline and args.clock == "stepped":
+        parser.error("--clock stepped 需要在本进程中单步放帧，不能与 --process-pipeline 同时使用")
+
+    model = None
+    if args.inference_server:
+        from inference_server import InferenceClient
+        model = InferenceClient(args.inference_server)
+        print(f"✅ 已连接推理服务: {args.inference_server}")
+    elif not args.process_pipeline:
+        model, weights, backend = load_model(args.weights, args.backend)
+        print(f"✅ 成功加载模型: {weights} (推理后端: {backend})")
+    engine = build_engine(args, model, overlay_builder=None, detect_only=args.detect_only)
+    print(f"🚀 无界面运行 - 来源: {engine.frame_source.describe()}"
+          f"{'（只检测）' if args.detect_only else ''}")
+
+    engine.start()
+    engine.start_playing()
+    deadline = time.perf_counter() + args.duration if args.duration else None
+    next_report = time.perf_counter() + args.report_interval
+    try:
+        while engine.running:
+            now = time.perf_counter()
+            if deadline and now >= deadline:
+                break
+            if now >= next_report:
+                next_report = now + args.report_interval
+                print(f"📈 {engine.report()}")
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        print("\n⏹ 已中断")
+    finally:
+        engine.close()
+        print_summary(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+只保留最新值的线程间通道
+
+替代 queue.Queue(maxsize=3)：队列满时丢弃的是新数据，消费者可能拿到几帧之前的检测结果。
+这里每次发布都覆盖旧值，附带单调递增的序号和采集时间戳（time.perf_counter），
+消费者在条件变量上阻塞等待比自己上次看到的序号更新的值，并可以按帧龄拒绝过期数据。
+"""
+
+import threading
+import time
+
+
+class Stamped:
+    """带序号和采集时间戳的值"""
+
+    __slots__ = ('value', 'seq', 'timestamp')
+
+    def __init__(self, value, seq, timestamp):
+        self.value = value
+        self.seq = seq
+        self.timestamp = timestamp
+
+    def age(self, now=None):
+        """从采集到现在经过的秒数"""
+        return (now if now is not None else time.perf_counter()) - self.timestamp
+
+
+class LatestChannel:
+    """最新值优先的通道"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.item = None
+        self.seq = 0
+        self.closed = False
+        self.published = 0
+        self.overwritten = 0   # 尚未被消费就被新值覆盖的次数
+        self.consumed_seq = 0
+
+    def publish(self, value, timestamp=None):
+        """发布新值，返回其序号"""
+        with self.condition:
+            if self.item is not None and self.item.seq > self.consumed_seq:
+                self.overwritten += 1
+            self.seq += 1
+            self.item = Stamped(value, self.seq, timestamp if timestamp is not None else time.perf_counter())
+            self.published += 1
+            self.condition.notify_all()
+            return self.seq
+
+    def latest(self):
+        """非阻塞地取最新值（可能为None）"""
+        with self.condition:
+            return self.item
+
+    def wait_newer(self, after_seq=0, timeout=None):
+        """阻塞等待序号大于 after_seq 的值，超时或通道关闭时返回None"""
+        with self.condition:
+            if not self.condition.wait_for(
+                    lambda: self.closed or (self.item is not None and self.item.seq > after_seq), timeout):
+                return None
+            if self.closed:
+                return None
+            self.consumed_seq = max(self.consumed_seq, self.item.seq)
+            return self.item
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def reopen(self):
+        with self.condition:
+            self.closed = False
+
+
+class AgeStats:
+    """决策时刻的帧龄统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max_age = 0.0
+        self.last_age = 0.0
+        self.rejected = 0
+
+    def record(self, age):
+        self.count += 1
+        self.total += age
+        self.last_age = age
+        self.max_age = max(self.max_age, age)
+
+    def reject(self):
+        self.rejected += 1
+
+    @property
+    def mean_ms(self):
+        return self.total / self.count * 1000 if self.count else 0.0
+
+    def summary(self):
+        return (f"决策帧龄 最近:{self.last_age * 1000:.0f}ms 平均:{self.mean_ms:.0f}ms "
+                f"最大:{self.max_age * 1000:.0f}ms 过期拒绝:{self.rejected}")
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多实例编排：一个共享模型服务N个游戏窗口
+
+原来每个游戏窗口都要启动一个 JumpJumpAIPlayer 进程，每个进程各自加载一份YOLO模型（每份几百MB）。
+这里在一个进程里为每个采集区域创建一个 JumpEngine（各自的跳跃周期状态机、推理门控和统计），
+它们共用一个模型：
+    - BatchInferenceServer 把各实例同一时刻提交的帧合并成一个批次做一次前向推理，
+      后端不支持批量输入（如静态形状的导出模型）时自动退回逐帧推理
+    - PressScheduler 让所有实例的长按排队使用同一个鼠标，按压之间保留间隔，不同窗口的按压不会重叠
+    - 定期输出每个实例的每分钟跳跃次数、批次大小，以及相对N个独立进程节省的内存
+
+    python multi_instance.py --region 0,80,400,710 --region 420,80,400,710
+    python multi_instance.py --source dir:../datasets/auto/images --source dir:../datasets/manual/images --clock fast --duration 60
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+from jump_engine import DEFAULT_PARAMS, JumpEngine, load_model, parse_region
+from frame_source import open_frame_source
+from inference_gate import ChangeGate
+from input_backends import BACKENDS, MockBackend, select_backend
+from inference_backends import BACKEND_NAMES
+from press_timing import PressTimer
+
+
+def current_rss_mb():
+    """当前进程的常驻内存(MB)，无法获取时返回None"""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # macOS为字节，Linux为KB
+    except ImportError:
+        return None
+
+
+# === 批量推理 ===
+
+class BatchInferenceServer:
+    """收集各实例提交的帧，凑成一个批次调用一次模型"""
+
+    def __init__(self, model, max_batch=8, max_wait=0.008):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait          # 第一帧到达后最多等待其他实例的时间
+        self.batching = True              # 模型不支持批量输入时退回逐帧
+        self.condition = threading.Condition()
+        self.pending = []
+        self.thread = None
+        self.running = False
+
+        self.batches = 0
+        self.frames = 0
+        self.infer_time = 0.0
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.loop, name="batch-inference", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def client(self):
+        """给 JumpEngine 使用的模型代理"""
+        return BatchClient(self)
+
+    def infer(self, frame):
+        """提交一帧并等待结果，返回与 model(frame) 相同的结果列表"""
+        return [self.submit(frame)['result']]
+
+    def submit(self, frame):
+        """提交一帧并等待完成，返回请求记录（result、提交/开始/结束时间和所在批次大小）"""
+        request = {'frame': frame, 'event': threading.Event(), 'submitted': time.perf_counter()}
+        with self.condition:
+            self.pending.append(request)
+            self.condition.notify_all()
+        request['event'].wait()
+        if 'error' in request:
+            raise request['error']
+        return request
+
+    def loop(self):
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    break
+                # 第一帧到达后再等一小段时间，让其他实例的帧进入同一批次
+                deadline = time.perf_counter() + self.max_wait
+                while len(self.pending) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+            self.run_batch(batch)
+
+    def run_batch(self, batch):
+        frames = [request['frame'] for request in batch]
+        start = time.perf_counter()
+        try:
+            if self.batching and len(frames) > 1:
+                try:
+                    results = self.model(frames, verbose=False)
+                except Exception as e:
+                    print(f"⚠️ 模型不支持批量推理，改为逐帧: {e}")
+                    self.batching = False
+                    results = [self.model(frame, verbose=False)[0] for frame in frames]
+            else:
+                results = [self.model(frame, verbose=False)[0] for frame in frames]
+            for request, result in zip(batch, results):
+                request['result'] = result
+        except Exception as e:
+            for request in batch:
+                request['error'] = e
+        finished = time.perf_counter()
+        self.infer_time += finished - start
+        self.batches += 1
+        self.frames += len(frames)
+        for request in batch:
+            request['started'], request['finished'], request['batch'] = start, finished, len(batch)
+            request['event'].set()
+
+    @property
+    def mean_batch(self):
+        return self.frames / self.batches if self.batches else 0.0
+
+    def summary(self):
+        per_batch = self.infer_time / self.batches * 1000 if self.batches else 0.0
+        mode = "批量" if self.batching else "逐帧"
+        return f"推理批次 {self.batches} ({mode}) | 平均批大小 {self.mean_batch:.2f} | 每批 {per_batch:.1f}ms"
+
+
+class BatchClient:
+    """像 YOLO 模型一样调用，实际由 BatchInferenceServer 合批推理"""
+
+    def __init__(self, server):
+        self.server = server
+
+    def __call__(self, frame, verbose=False):
+        return self.server.infer(frame)
+
+
+# === 按压调度 ===
+
+class PressScheduler:
+    """所有实例共用一个鼠标：按申请顺序依次执行长按，两次按压之间至少间隔 min_gap 秒"""
+
+    def __init__(self, press_timer=None, min_gap=0.05):
+        self.timer = press_timer or PressTimer()
+        self.min_gap = min_gap
+        self.condition = threading.Condition()
+        self.next_ticket = 0
+        self.serving = 0
+        self.last_release = 0.0
+        self.waits = {}   # 实例名 → [排队次数, 总等待时间]
+
+    def view(self, name):
+        """给单个实例使用的计时器（接口与 PressTimer 相同）"""
+        return ScheduledPressTimer(self, name)
+
+    def press(self, name, down, up, duration):
+        requested = time.perf_counter()
+        with self.condition:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            while self.serving != ticket:
+                self.condition.wait()
+        try:
+            gap = self.last_release + self.min_gap - time.perf_counter()
+            if gap > 0:
+                time.sleep(gap)
+            count, total = self.waits.get(name, (0, 0.0))
+            self.waits[name] = (count + 1, total + time.perf_counter() - requested)
+            return self.timer.press(down, up, duration)
+        finally:
+            with self.condition:
+                self.last_release = time.perf_counter()
+                self.serving += 1
+                self.condition.notify_all()
+
+    def mean_wait_ms(self, name):
+        count, total = self.waits.get(name, (0, 0.0))
+        return total / count * 1000 if count else 0.0
+
+
+class ScheduledPressTimer:
+    def __init__(self, scheduler, name):
+        self.scheduler = scheduler
+        self.name = name
+
+    @property
+    def histogram(self):
+        return self.scheduler.timer.histogram
+
+    def press(self, down, up, duration):
+        return self.scheduler.press(self.name, down, up, duration)
+
+    def close(self):
+        pass  # 共享计时器由编排器关闭
+
+
+# === 编排器 ===
+
+class Orchestrator:
+    """为每个帧来源创建一个引擎，共用模型、输入后端和按压调度"""
+
+    def __init__(self, model, sources, params=None, input_backend=None, max_batch=8, batch_wait=0.008,
+                 press_gap=0.05, gate_threshold=8, data_root="auto_generated_data"):
+        self.server = BatchInferenceServer(model, max_batch=max_batch, max_wait=batch_wait)
+        self.scheduler = PressScheduler(min_gap=press_gap)
+        if input_backend is None:
+            input_backend = select_backend("auto") if any(s.is_live for s in sources) else MockBackend()
+        self.input_backend = input_backend
+
+        self.engines = []
+        for index, source in enumerate(sources):
+            name = f"实例{index + 1}"
+            engine = JumpEngine(self.server.client(), source, params=params,
+                                inference_gate=ChangeGate(threshold=gate_threshold),
+                                input_backend=input_backend, press_timer=self.scheduler.view(name),
+                                data_root=f"{data_root}/instance{index + 1}", overlay_builder=None,
+                                name=name)
+            self.engines.append(engine)
+
+    def set_regions(self, regions):
+        for engine, region in zip(self.engines, regions):
+            if engine.frame_source.is_live:
+                engine.set_capture_area(region)
+
+    def start(self, play=True):
+        self.server.start()
+        for engine in self.engines:
+            engine.start()
+            if play:
+                engine.start_playing()
+
+    @property
+    def running(self):
+        return any(engine.running for engine in self.engines)
+
+    def close(self):
+        for engine in self.engines:
+            engine.close()
+        self.server.stop()
+        self.scheduler.timer.close()
+
+    def report(self):
+        lines = []
+        for engine in self.engines:
+            lines.append(f"   {engine.name}: {engine.report()} | 按压排队 {self.scheduler.mean_wait_ms(engine.name):.0f}ms")
+        lines.append(f"   🧠 {self.server.summary()}")
+        return "\n".join(lines)
+
+
+def print_summary(orchestrator, memory):
+    """每个实例的统计和内存对比"""
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console()
+    table = Table(title=f"🤖 多实例运行统计（{len(orchestrator.engines)} 个实例，共享一个模型）")
+    for column in ("实例", "来源", "帧率", "跳跃次数", "跳跃速度", "按压排队"):
+        table.add_column(column)
+    for engine in orchestrator.engines:
+        totals = engine.stats.totals()
+        table.add_row(engine.name, engine.frame_source.describe(), f"{totals['fps']:.1f} FPS",
+                      f"{totals['jumps']}", f"{totals['jumps_per_minute']:.1f} 次/分钟",
+                      f"{orchestrator.scheduler.mean_wait_ms(engine.name):.0f}ms")
+    console.print(table)
+    console.print(f"🧠 {orchestrator.server.summary()}")
+    if orchestrator.scheduler.timer.histogram.count:
+        console.print(f"⏱️ {orchestrator.scheduler.timer.histogram.summary()}")
+
+    baseline, loaded, running = memory['baseline'], memory['loaded'], current_rss_mb()
+    if None in (baseline, loaded, running):
+        console.print("💾 当前平台无法读取进程内存，跳过内存对比")
+        return
+    count = len(orchestrator.engines)
+    # 独立进程时每个进程都要各自承担：解释器和依赖 + 模型 + 一个实例的运行开销
+    per_instance = max(running - loaded, 0.0) / count
+    separate = count * (loaded + per_instance)
+    console.print(f"💾 内存: 本进程 {running:.0f}MB（启动 {baseline:.0f}MB，加载模型后 {loaded:.0f}MB）"
+                  f" | {count} 个独立进程约 {separate:.0f}MB | 节省约 {separate - running:.0f}MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="跳一跳终结者 - 多实例编排（共享模型，批量推理）")
+    parser.add_argument("--region", type=parse_region, action="append", default=[],
+                        help="屏幕采集区域 left,top,width,height，每个游戏窗口一个")
+    parser.add_argument("--source", action="append", default=[],
+                        help="回放帧来源（dir:/video:/session:），每个实例一个，与 --region 二选一")
+    parser.add_argument("--clock", default="realtime", choices=["realtime", "fast"])
+    parser.add_argument("--fps", type=float, default=20, help="每个实例的采集或回放帧率")
+    parser.add_argument("--loop", action="store_true", help="回放结束后从头循环")
+    parser.add_argument("--weights", default=None, help="模型权重，默认按 inference.yaml 和常见位置查找")
+    parser.add_argument("--backend", default=None, choices=BACKEND_NAMES, help="推理后端")
+    parser.add_argument("--max-batch", type=int, default=8, help="每批最多帧数")
+    parser.add_argument("--batch-wait-ms", type=float, default=8, help="第一帧到达后等待其他实例的时间")
+    parser.add_argument("--press-gap-ms", type=float, default=50, help="不同窗口两次按压之间的最小间隔")
+    parser.add_argument("--jump-factor", type=float, default=DEFAULT_PARAMS['jump_factor'])
+    parser.add_argument("--stable-wait", type=float, default=DEFAULT_PARAMS['stable_wait'])
+    parser.add_argument("--jump-delay", type=float, default=DEFAULT_PARAMS['jump_delay'])
+    parser.add_argument("--confidence", type=float, default=DEFAULT_PARAMS['confidence_threshold'])
+    parser.add_argument("--no-vision-settle", action="store_true")
+    parser.add_argument("--no-auto-save", action="store_true")
+    parser.add_argument("--input-backend", default="auto", choices=["auto"] + list(BACKENDS))
+    parser.add_argument("--dry-run", action="store_true", help="不操作鼠标，只记录按压")
+    parser.add_argument("--detect-only", action="store_true", help="只运行检测，不执行跳跃")
+    parser.add_argument("--duration", type=float, default=0, help="运行时长(秒)，0表示直到Ctrl+C")
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    if args.region and args.source:
+        parser.error("--region 和 --source 不能同时使用")
+    if not args.region and not args.source:
+        parser.error("至少需要一个 --region 或 --source")
+
+    if args.region:
+        sources = [open_frame_source("screen", fps=args.fps) for _ in args.region]
+    else:
+        sources = [open_frame_source(spec, clock=args.clock, fps=args.fps, loop=args.loop) for spec in args.source]
+
+    memory = {'baseline': current_rss_mb()}
+    model, weights, backend = load_model(args.weights, args.backend)
+    memory['loaded'] = current_rss_mb()
+    print(f"✅ 成功加载共享模型: {weights} (推理后端: {backend})")
+
+    if args.dry_run or not args.region:
+        backend_obj = MockBackend()
+    else:
+        backend_obj = select_backend(args.input_backend)
+    params = {
+        'jump_factor': args.jump_factor,
+        'jump_delay': args.jump_delay,
+        'stable_wait': args.stable_wait,
+        'confidence_threshold': args.confidence,
+        'vision_settle': not args.no_vision_settle,
+        'auto_save_enabled': not args.no_auto_save,
+    }
+    orchestrator = Orchestrator(model, sources, params=params, input_backend=backend_obj,
+                                max_batch=args.max_batch, batch_wait=args.batch_wait_ms / 1000,
+                                press_gap=args.press_gap_ms / 1000)
+    orchestrator.set_regions(args.region)
+    print(f"🚀 启动 {len(sources)} 个实例")
+    orchestrator.start(play=not args.detect_only)
+
+    deadline = time.perf_counter() + args.duration if args.duration else None
+    next_report = time.perf_counter() + args.report_interval
+    try:
+        while orchestrator.running:
+            now = time.perf_counter()
+            if deadline and now >= deadline:
+                break
+            if now >= next_report:
+                next_report = now + args.report_interval
+                print(f"📈 多实例统计:\n{orchestrator.report()}")
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        print("\n⏹ 已中断")
+    finally:
+        print_summary(orchestrator, memory)
+        orchestrator.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+帧间目标跟踪：YOLO只按计划运行，其余帧跟踪上一次的检测结果
+
+两次跳跃之间小人和方块几乎不动，检测线程却每帧都从头检测一遍，方块中心也会随检测框抖动，
+导致"最上面的方块"在相邻帧之间来回跳。这里在相邻帧之间跟踪上一次的检测框：
+    - 每个框保存检测时的灰度模板，下一帧在"上次位置 + 速度预测"附近的搜索窗口内做模板匹配，
+      匹配得分就是跟踪置信度；检测框整体平移，中心点不会因为重新回归而抖动
+    - 重新检测时按IoU把新检测框和已有轨迹关联，保留轨迹的运动速度
+    - 以下情况才运行YOLO：没有轨迹、每隔 detect_interval 帧、画面整体大幅变化（镜头平移）、
+      某个框的匹配得分低于 min_score（小人起跳、目标被遮挡）
+    - 得分过低时只在所有轨迹外扩后的区域内推理（ROI），区域内找不回全部目标再退回全图
+    - 统计跟踪帧与检测帧的比例，以及按平均检测耗时估算节省的推理时间
+
+    python jump_engine.py --source dir:../datasets/auto/images --clock fast --detect-only --track
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from detection_postprocess import EMPTY
+from inference_backends import box_iou
+
+
+class DetectionTracker:
+    """模板匹配 + 速度预测的检测框跟踪器，按计划、场景变化或低置信度触发重新检测"""
+
+    def __init__(self, detect_interval=10, min_score=0.6, scene_fraction=0.05, roi=True, roi_margin=48,
+                 scale=0.5, search_margin=12, pixel_delta=16, thumb_size=(72, 128)):
+        self.detect_interval = detect_interval    # 连续跟踪的最大帧数，之后强制重新检测（发现新方块）
+        self.min_score = min_score                # 模板匹配得分低于该值时重新检测
+        self.scene_fraction = scene_fraction      # 缩略图中变化像素超过该比例视为场景变化（镜头平移）
+        self.roi = roi                            # 低置信度时只在轨迹区域内推理
+        self.roi_margin = roi_margin              # ROI相对所有轨迹外接框的外扩(px)
+        self.scale = scale                        # 在缩小的灰度图上做模板匹配
+        self.search_margin = search_margin        # 搜索窗口相对预测位置的外扩(缩小后的px)
+        self.pixel_delta = pixel_delta
+        self.thumb_size = thumb_size
+
+        self.small = np.empty((thumb_size[1], thumb_size[0], 3), dtype=np.uint8)
+        self.current = np.empty((thumb_size[1], thumb_size[0]), dtype=np.uint8)
+        self.reference = np.empty_like(self.current)
+        self.diff = np.empty_like(self.current)
+
+        self.rows = EMPTY            # 当前轨迹（DETECTION_DTYPE，全图坐标）
+        self.templates = []          # 每条轨迹的灰度模板（缩小后）
+        self.velocity = np.zeros((0, 2), dtype=np.float32)
+        self.since_detection = 0
+        self.force = True
+        self.last_score = 0.0
+        self.last_reason = ""
+
+        # 统计
+        self.tracked_frames = 0
+        self.detected_frames = 0
+        self.full_detections = 0
+        self.roi_detections = 0
+        self.roi_fallbacks = 0       # ROI内没有找回全部目标，又做了一次全图检测
+        self.detect_time = 0.0       # 全图检测总耗时
+        self.roi_time = 0.0
+        self.track_time = 0.0
+        self.reasons = {}
+
+    def request_detection(self):
+        """下一帧强制重新检测（例如参数变化）"""
+        self.force = True
+
+    def update(self, frame, detect):
+        """返回该帧的检测结果；detect(image) 在给定图像上运行YOLO并返回 DETECTION_DTYPE 结构化数组"""
+        start = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        cv2.resize(frame, self.thumb_size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.current)
+
+        reason = self.detection_reason()
+        if reason is None:
+            shifts, scores = self.match(gray)
+            self.last_score = float(scores.min()) if len(scores) else 0.0
+            if self.last_score >= self.min_score:
+                self.apply_shifts(shifts)
+                self.since_detection += 1
+                self.tracked_frames += 1
+                self.track_time += time.perf_counter() - start
+                return self.rows
+            reason = "低置信度"
+
+        rows = None
+        if reason == "低置信度" and self.roi:
+            rows = self.detect_roi(frame, detect)
+            self.roi_fallbacks += rows is None
+        if rows is None:
+            detect_start = time.perf_counter()
+            rows = detect(frame)
+            self.detect_time += time.perf_counter() - detect_start
+            self.full_detections += 1
+        self.reset_tracks(rows, gray)
+        self.detected_frames += 1
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        self.last_reason = reason
+        return self.rows
+
+    def detection_reason(self):
+        """需要重新检测时返回原因，否则返回None"""
+        if self.force:
+            return "强制"
+        if not len(self.rows):
+            return "无轨迹"
+        if self.since_detection >= self.detect_interval:
+            return "定期"
+        cv2.absdiff(self.current, self.reference, dst=self.diff)
+        cv2.threshold(self.diff, self.pixel_delta, 255, cv2.THRESH_BINARY, dst=self.diff)
+        if cv2.countNonZero(self.diff) > self.scene_fraction * self.diff.size:
+            return "场景变化"
+        return None
+
+    def match(self, gray):
+        """在预测位置附近做模板匹配，返回每条轨迹的位移(全图px)和匹配得分"""
+        shifts = np.zeros((len(self.rows), 2), dtype=np.float32)
+        scores = np.zeros(len(self.rows), dtype=np.float32)
+        height, width = gray.shape
+        for i, (row, template) in enumerate(zip(self.rows, self.templates)):
+            if template is None:
+                scores[i] = 1.0   # 框太小无法匹配，保持原位置
+                continue
+            th, tw = template.shape
+            px = row['x1'] * self.scale + self.velocity[i, 0] * self.scale
+            py = row['y1'] * self.scale + self.velocity[i, 1] * self.scale
+            x0 = int(max(px - self.search_margin, 0))
+            y0 = int(max(py - self.search_margin, 0))
+            x1 = int(min(px + tw + self.search_margin, width))
+            y1 = int(min(py + th + self.search_margin, height))
+            if x1 - x0 < tw or y1 - y0 < th:
+                continue      # 目标移出画面，得分为0
+            response = cv2.matchTemplate(gray[y0:y1, x0:x1], template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, location = cv2.minMaxLoc(response)
+            scores[i] = score
+            shifts[i] = ((x0 + location[0]) / self.scale - row['x1'], (y0 + location[1]) / self.scale - row['y1'])
+        return shifts, scores
+
+    def apply_shifts(self, shifts):
+        rows = self.rows.copy()
+        dx = np.round(shifts[:, 0]).astype(np.int32)
+        dy = np.round(shifts[:, 1]).astype(np.int32)
+        for field in ('x1', 'x2', 'cx'):
+            rows[field] += dx
+        for field in ('y1', 'y2', 'cy'):
+            rows[field] += dy
+        self.rows = rows
+        self.velocity = 0.5 * self.velocity + 0.5 * shifts
+
+    def detect_roi(self, frame, detect):
+        """只在所有轨迹外扩后的区域内推理；区域内找回的目标少于现有轨迹时返回None（退回全图）"""
+        height, width = frame.shape[:2]
+        x0 = max(int(self.rows['x1'].min()) - self.roi_margin, 0)
+        y0 = max(int(self.rows['y1'].min()) - self.roi_margin, 0)
+        x1 = min(int(self.rows['x2'].max()) + self.roi_margin, width)
+        y1 = min(int(self.rows['y2'].max()) + self.roi_margin, height)
+        if x1 <= x0 or y1 <= y0:
+            return None
+
+        start = time.perf_counter()
+        rows = detect(np.ascontiguousarray(frame[y0:y1, x0:x1]))
+        self.roi_time += time.perf_counter() - start
+        self.roi_detections += 1
+        if len(rows) < len(self.rows):
+            return None
+        rows = rows.copy()
+        for field in ('x1', 'x2', 'cx'):
+            rows[field] += x0
+        for field in ('y1', 'y2', 'cy'):
+            rows[field] += y0
+        return rows
+
+    def reset_tracks(self, rows, gray):
+        """用新的检测结果重建轨迹：按IoU关联旧轨迹以保留速度，重新截取模板"""
+        velocity = np.zeros((len(rows), 2), dtype=np.float32)
+        if len(rows) and len(self.rows):
+            iou = box_iou(self.box_array(rows), self.box_array(self.rows))
+            for i in range(len(rows)):
+                j = int(np.argmax(iou[i]))
+                if iou[i, j] > 0.3 and rows['cls'][i] == self.rows['cls'][j]:
+                    velocity[i] = ((rows['x1'][i] - self.rows['x1'][j]) * 0.5 + self.velocity[j, 0] * 0.5,
+                                   (rows['y1'][i] - self.rows['y1'][j]) * 0.5 + self.velocity[j, 1] * 0.5)
+
+        templates = []
+        for row in rows:
+            x1, y1 = int(row['x1'] * self.scale), int(row['y1'] * self.scale)
+            x2, y2 = int(row['x2'] * self.scale), int(row['y2'] * self.scale)
+            template = gray[max(y1, 0):y2, max(x1, 0):x2]
+            templates.append(template.copy() if min(template.shape) >= 4 else None)
+
+        self.rows = rows
+        self.templates = templates
+        self.velocity = velocity
+        self.since_detection = 0
+        self.force = False
+        self.current, self.reference = self.reference, self.current
+
+    @staticmethod
+    def box_array(rows):
+        return np.stack([rows['x1'], rows['y1'], rows['x2'], rows['y2']], axis=1).astype(np.float32)
+
+    # === 统计 ===
+
+    @property
+    def mean_detect_ms(self):
+        return self.detect_time / self.full_detections * 1000 if self.full_detections else 0.0
+
+    @property
+    def saved_seconds(self):
+        """与每帧都做全图检测相比省下的时间（按平均全图检测耗时估算，扣除跟踪和ROI推理的开销）"""
+        if not self.full_detections:
+            return 0.0
+        baseline = (self.tracked_frames + self.detected_frames) * self.detect_time / self.full_detections
+        return baseline - self.detect_time - self.roi_time - self.track_time
+
+    def reset_counters(self):
+        self.tracked_frames = self.detected_frames = 0
+        self.full_detections = self.roi_detections = self.roi_fallbacks = 0
+        self.detect_time = self.roi_time = self.track_time = 0.0
+        self.reasons = {}
+
+    def summary(self):
+        total = self.tracked_frames + self.detected_frames
+        ratio = self.tracked_frames / total if total else 0.0
+        reasons = ", ".join(f"{reason}{count}" for reason, count in self.reasons.items())
+        track_ms = self.track_time / self.tracked_frames * 1000 if self.tracked_frames else 0.0
+        return (f"跟踪 {self.tracked_frames}/{total} 帧 ({ratio:.0%}) | 检测: 全图 {self.full_detections} "
+                f"ROI {self.roi_detections} (退回全图 {self.roi_fallbacks}; {reasons}) | 检测 {self.mean_detect_ms:.1f}ms vs 跟踪 {track_ms:.1f}ms | "
+                f"节省推理约 {self.saved_seconds:.1f}s")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+检测结果叠加层
+
+检测线程不再复制整帧并用cv2绘制框和文字，而是发布一份轻量的叠加层描述
+（框、中心点、连线、标签，均为原始帧坐标）。界面线程只在画面可见时，
+按画布的缩放比例把它画成可复用的Tk画布图元，原始帧保持不变，可以直接用于保存。
+"""
+
+OVERLAY_TAG = "overlay"
+LABEL_TAG = "overlay_label"
+
+
+def new_overlay(width, height):
+    """空的叠加层描述，width/height 为原始帧尺寸"""
+    return {'size': (width, height), 'boxes': [], 'points': [], 'lines': []}
+
+
+def add_box(overlay, bbox, color, width=2, label=None, label_color=(255, 255, 255), label_bg=None):
+    """颜色均为BGR元组，与原来的cv2绘制参数保持一致"""
+    overlay['boxes'].append((bbox, color, width, label, label_color, label_bg))
+
+
+def add_point(overlay, center, radius, color, label=None):
+    overlay['points'].append((center, radius, color, label))
+
+
+def add_line(overlay, start, end, color, width=2, label=None):
+    overlay['lines'].append((start, end, color, width, label))
+
+
+def bgr_to_hex(color):
+    b, g, r = color
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+class CanvasOverlay:
+    """用一组复用的画布图元绘制叠加层，多余的图元隐藏而不是删除"""
+
+    def __init__(self, canvas, font=("Arial", 10, "bold")):
+        self.canvas = canvas
+        self.font = font
+        self.pools = {'rectangle': [], 'oval': [], 'line': [], 'text': []}
+        self.used = dict.fromkeys(self.pools, 0)
+
+    def item(self, kind):
+        pool = self.pools[kind]
+        index = self.used[kind]
+        if index == len(pool):
+            tags = (OVERLAY_TAG, LABEL_TAG) if kind == 'text' else (OVERLAY_TAG,)
+            if kind == 'text':
+                pool.append(self.canvas.create_text(0, 0, tags=tags))
+            else:
+                create = getattr(self.canvas, f"create_{kind}")
+                pool.append(create(0, 0, 0, 0, tags=tags))
+        self.used[kind] = index + 1
+        return pool[index]
+
+    def text(self, x, y, label, color, anchor="sw"):
+        item = self.item('text')
+        self.canvas.coords(item, x, y)
+        self.canvas.itemconfigure(item, text=label, fill=bgr_to_hex(color), anchor=anchor,
+                                  font=self.font, state="normal")
+        return item
+
+    def draw(self, overlay, scale, offset_x, offset_y):
+        """按 画布坐标 = 偏移 + 原始坐标 × 缩放 绘制"""
+        canvas = self.canvas
+        self.used = dict.fromkeys(self.pools, 0)
+
+        def to_canvas(x, y):
+            return offset_x + x * scale, offset_y + y * scale
+
+        for (x1, y1, x2, y2), color, width, label, label_color, label_bg in overlay['boxes']:
+            left, top = to_canvas(x1, y1)
+            right, bottom = to_canvas(x2, y2)
+            rect = self.item('rectangle')
+            canvas.coords(rect, left, top, right, bottom)
+            canvas.itemconfigure(rect, outline=bgr_to_hex(color), width=width, fill="", state="normal")
+            if label:
+                text = self.text(left + (4 if label_bg else 0), top - 3, label, label_color)
+                if label_bg:
+                    background = self.item('rectangle')
+                    canvas.coords(background, *canvas.bbox(text))
+                    canvas.itemconfigure(background, outline="", fill=bgr_to_hex(label_bg), state="normal")
+
+        for (x, y), radius, color, label in overlay['points']:
+            cx, cy = to_canvas(x, y)
+            oval = self.item('oval')
+            canvas.coords(oval, cx - radius, cy - radius, cx + radius, cy + radius)
+            canvas.itemconfigure(oval, fill=bgr_to_hex(color), outline="", state="normal")
+            if label:
+                self.text(cx, cy - radius - 2, label, (255, 255, 255), anchor="s")
+
+        for start, end, color, width, label in overlay['lines']:
+            sx, sy = to_canvas(*start)
+            ex, ey = to_canvas(*end)
+            line = self.item('line')
+            canvas.coords(line, sx, sy, ex, ey)
+            canvas.itemconfigure(line, fill=bgr_to_hex(color), width=width, state="normal")
+            if label:
+                self.text((sx + ex) / 2, (sy + ey) / 2, label, color)
+
+        # 隐藏本帧没有用到的图元
+        for kind, pool in self.pools.items():
+            for item in pool[self.used[kind]:]:
+                canvas.itemconfigure(item, state="hidden")
+
+        canvas.tag_raise(OVERLAY_TAG)
+        canvas.tag_raise(LABEL_TAG)
+
+    def clear(self):
+        for pool in self.pools.values():
+            for item in pool:
+                self.canvas.itemconfigure(item, state="hidden")
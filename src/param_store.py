@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+线程安全的参数快照
+
+检测线程和游戏线程原来直接调用 tk.Variable.get()：每次都要经过Tcl解释器，不是线程安全的，
+还会给每一帧增加延迟。现在参数保存在普通的Python对象里，界面控件变化时写入新版本，
+工作线程读取不可变的版本化快照（读取只是一次引用赋值，不需要加锁），也不再依赖Tk。
+工作线程修改参数时（例如创建数据目录失败后关闭自动保存）通过 watch 的回调通知界面，
+回调在写入的线程中执行，界面端应转交 UIState 在Tk线程中应用。
+"""
+
+import threading
+
+
+class ParamSnapshot:
+    """某一版本的全部参数（只读），通过属性访问参数值"""
+
+    __slots__ = ('version', 'values')
+
+    def __init__(self, version, values):
+        self.version = version
+        self.values = values
+
+    def __getattr__(self, name):
+        try:
+            return self.values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class ParamStore:
+    """参数存储：写入生成新版本快照，读取无锁"""
+
+    def __init__(self, **defaults):
+        self.lock = threading.Lock()
+        self.current = ParamSnapshot(0, dict(defaults))
+        self.listeners = []
+
+    def snapshot(self):
+        return self.current
+
+    def get(self, name):
+        return self.current.values[name]
+
+    def update(self, **changes):
+        with self.lock:
+            previous = self.current.values
+            values = dict(previous)
+            values.update(changes)
+            self.current = ParamSnapshot(self.current.version + 1, values)
+            version = self.current.version
+        for name, value in changes.items():
+            if previous.get(name) != value:
+                for listener in self.listeners:
+                    listener(name, value)
+        return version
+
+    def set(self, name, value):
+        return self.update(**{name: value})
+
+    def bind(self, name, variable, convert=None):
+        """把Tk变量绑定到参数：变量写入时（Tk线程）同步更新存储"""
+        def on_write(*args):
+            try:
+                value = variable.get()
+            except Exception:
+                return  # 输入框中的中间状态（如空字符串）无法解析，保留旧值
+            self.set(name, convert(value) if convert else value)
+
+        on_write()
+        variable.trace_add('write', on_write)
+
+    def watch(self, listener):
+        """参数值变化时调用 listener(名称, 新值)（在写入的线程中调用）"""
+        self.listeners.append(listener)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+无界面的检测管线基准测试
+
+从任意帧来源读帧并执行YOLO推理，统计端到端帧率，适合在没有显示器的Linux服务器上运行：
+    python pipeline_benchmark.py --source dir:../datasets/auto/images --clock fast
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+from frame_source import open_frame_source
+from inference_gate import ChangeGate
+from inference_backends import BACKEND_NAMES, load_detector
+
+console = Console()
+
+
+def run_benchmark(source, model, max_frames=None, warmup=3, gate=None):
+    """跑完帧来源（或达到max_frames），返回各阶段耗时统计"""
+    read_time = 0.0
+    infer_time = 0.0
+    frames = 0
+    start = None
+
+    while max_frames is None or frames < max_frames:
+        t0 = time.perf_counter()
+        packet = source.read()
+        if packet is None:
+            if source.exhausted:
+                break
+            continue
+        t1 = time.perf_counter()
+        frame = packet[0]
+        if gate is not None:
+            gate.infer(frame, lambda: model(frame, verbose=False))
+        else:
+            model(frame, verbose=False)
+        t2 = time.perf_counter()
+
+        # 预热帧不计入统计（模型首次推理较慢）
+        if warmup > 0:
+            warmup -= 1
+            continue
+        if start is None:
+            start = t0
+        read_time += t1 - t0
+        infer_time += t2 - t1
+        frames += 1
+
+    elapsed = time.perf_counter() - start if start else 0.0
+    return {
+        'frames': frames,
+        'elapsed': elapsed,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        'read_ms': read_time / frames * 1000 if frames else 0.0,
+        'infer_ms': infer_time / frames * 1000 if frames else 0.0,
+    }
+
+
+def main():
+    project_root = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description="检测管线基准测试（无需显示器）")
+    parser.add_argument("--source", default=str(project_root / "datasets" / "auto" / "images"),
+                        help="帧来源: dir:图片目录、video:视频文件、session:录制会话、screen")
+    parser.add_argument("--clock", default="fast", choices=["realtime", "fast"])
+    parser.add_argument("--fps", type=float, default=20)
+    parser.add_argument("--model", default=str(project_root / "assets" / "models" / "epoch92.pt"))
+    parser.add_argument("--frames", type=int, default=None, help="最多测试的帧数")
+    parser.add_argument("--gate-threshold", type=int, default=None,
+                        help="启用推理跳过门控并设置阈值（变化像素数），默认每帧推理")
+    parser.add_argument("--backend", default="pytorch", choices=BACKEND_NAMES,
+                        help="推理后端（onnx/openvino 首次使用时自动导出）")
+    args = parser.parse_args()
+
+    source = open_frame_source(args.source, clock=args.clock, fps=args.fps)
+    console.print(f"[cyan]📂 帧来源: {source.describe()} (时钟: {args.clock})[/cyan]")
+    model = load_detector(args.model, args.backend)
+    console.print(f"[green]✅ 成功加载模型: {args.model} (推理后端: {args.backend})[/green]")
+
+    gate = ChangeGate(threshold=args.gate_threshold) if args.gate_threshold is not None else None
+    stats = run_benchmark(source, model, args.frames, gate=gate)
+    source.close()
+
+    table = Table(title="检测管线基准测试", box=box.ROUNDED)
+    table.add_column("指标", style="cyan")
+    table.add_column("数值", style="green", justify="right")
+    table.add_row("帧数", str(stats['frames']))
+    table.add_row("总耗时", f"{stats['elapsed']:.2f}s")
+    table.add_row("端到端帧率", f"{stats['fps']:.1f} FPS")
+    table.add_row("读帧耗时", f"{stats['read_ms']:.2f}ms")
+    table.add_row("推理耗时", f"{stats['infer_ms']:.2f}ms")
+    if gate is not None:
+        table.add_row("推理复用", f"{gate.hits}/{gate.hits + gate.misses} ({gate.hit_rate:.0%})")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
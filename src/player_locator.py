@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+小人的传统视觉快速定位（YOLO作为定期校验和兜底）
+
+小人是固定的深紫色棋子，每帧都用YOLOv8s找它太浪费。这里用颜色分割找棋子身体：
+    - BGR颜色范围内的最大轮廓就是棋子身体（头部是单独的小轮廓），底边即脚底，
+      检测框按数据集中身体与标注框的比例外扩
+    - YOLO校验通过后截取小人模板，之后每次快速定位都在候选位置附近做一次小窗口模板匹配，
+      得分过低（颜色相近的干扰物）时不采用快速结果
+    - 每隔 verify_interval 帧与YOLO的小人检测比较脚底位置，偏差超过容差时暂停快速路径，
+      改用YOLO结果 cooldown 帧；没有候选时同样退回YOLO
+    - 大画面先最近邻缩小到 max_width 再分割（不混合颜色），目标耗时小于1ms
+省下的是YOLO：推理前先定位（prepare），快速结果可信时把小人框交给推理门控，门控比较画面
+变化时忽略小人前后所在的区域。只有小人在动（跳跃过程中）时直接复用上一次的方块检测，
+小人用快速结果，不再为了小人重新跑YOLO；校验帧不忽略，保证校验用的是新的YOLO结果。
+限制：--track 和 --process-pipeline 模式下YOLO由跟踪器或工作进程调度，快速定位只替换
+小人的结果，不减少推理。
+
+直接运行为精度测试，遍历 datasets/*/labels，统计脚底位置与标注框的误差和耗时:
+    python player_locator.py
+    python player_locator.py --datasets ../datasets --limit 200
+    python jump_engine.py --source dir:../datasets/auto/images --clock fast --fast-player
+"""
+
+import math
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from detection_postprocess import DETECTION_DTYPE, PERSON, select_targets
+
+BODY_LOWER = (75, 40, 40)       # 棋子身体的BGR范围（由 datasets 中标注框底部像素统计得到）
+BODY_UPPER = (115, 75, 75)
+BOX_HEIGHT_RATIO = 1.64         # 标注框高度 / 身体轮廓高度（含头部）
+BOX_WIDTH_RATIO = 1.09          # 标注框宽度 / 身体轮廓宽度
+
+
+class PlayerLocator:
+    """颜色分割 + 模板校验的小人定位器"""
+
+    def __init__(self, lower=BODY_LOWER, upper=BODY_UPPER, max_width=400, min_area=0.0008,
+                 verify_interval=15, tolerance=6.0, min_score=0.5, cooldown=30):
+        self.lower = np.array(lower, dtype=np.uint8)
+        self.upper = np.array(upper, dtype=np.uint8)
+        self.max_width = max_width              # 宽度超过该值时先缩小再分割
+        self.min_area = min_area                # 身体轮廓占画面面积的最小比例
+        self.verify_interval = verify_interval  # 每N帧与YOLO结果比较一次
+        self.tolerance = tolerance              # 脚底位置允许的偏差(px)
+        self.min_score = min_score              # 模板匹配得分下限
+        self.cooldown = cooldown                # 校验失败后改用YOLO的帧数
+
+        self.template = None                    # YOLO校验通过时截取的小人灰度模板（工作尺度）
+        self.distrust = 0
+        self.frames = 0
+        self.row = None                         # 本帧的快速定位结果（prepare 中得到）
+
+        # 统计
+        self.fast_frames = 0          # 使用快速定位结果的帧数
+        self.fallbacks = 0            # 没有候选或正在冷却，使用YOLO结果
+        self.rejected = 0             # 候选被模板匹配否决
+        self.verifications = 0
+        self.mismatches = 0
+        self.verify_error = 0.0
+        self.locate_time = 0.0
+        self.locate_calls = 0
+        self.last_error = 0.0
+
+    def working_image(self, frame):
+        """返回 (工作图像, 缩放比例)；大画面用最近邻缩小，保持颜色不被混合"""
+        width = frame.shape[1]
+        if width <= self.max_width:
+            return frame, 1.0
+        scale = self.max_width / width
+        return cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST), scale
+
+    def locate(self, frame):
+        """返回小人的 DETECTION_DTYPE 行（全图坐标），找不到或被模板否决时返回None"""
+        start = time.perf_counter()
+        try:
+            return self._locate(frame)
+        finally:
+            self.locate_time += time.perf_counter() - start
+            self.locate_calls += 1
+
+    def _locate(self, frame):
+        image, scale = self.working_image(frame)
+        mask = cv2.inRange(image, self.lower, self.upper)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+        body = max(contours, key=cv2.contourArea)
+        x, y, w, h = cv2.boundingRect(body)
+        if w * h < self.min_area * mask.size or not 1.2 <= h / max(w, 1) <= 3.5:
+            return None   # 太小或形状不像棋子身体
+
+        # 身体轮廓 → 整个棋子的检测框（脚底为身体底边）
+        foot_x, bottom = x + w / 2, y + h
+        box_w, box_h = w * BOX_WIDTH_RATIO, h * BOX_HEIGHT_RATIO
+        x1, y1, x2 = foot_x - box_w / 2, bottom - box_h, foot_x + box_w / 2
+
+        score = 1.0
+        if self.template is not None:
+            score = self.template_score(image, x1, y1)
+            if score < self.min_score:
+                self.rejected += 1
+                return None
+
+        x1, y1, x2, y2 = (int(round(v / scale)) for v in (x1, y1, x2, bottom))
+        row = np.zeros(1, dtype=DETECTION_DTYPE)[0]
+        row['cls'] = PERSON
+        row['conf'] = score
+        row['x1'], row['y1'], row['x2'], row['y2'] = x1, y1, x2, y2
+        row['cx'], row['cy'] = (x1 + x2) // 2, y2 - 3   # 与 extract_detections 的小人坐标规则一致
+        return row
+
+    def template_score(self, image, x1, y1, margin=4):
+        """在候选框左上角附近的小窗口内匹配YOLO校验时截取的模板"""
+        th, tw = self.template.shape
+        height, width = image.shape[:2]
+        left, top = max(int(x1) - margin, 0), max(int(y1) - margin, 0)
+        right, bottom = min(int(x1) + tw + margin, width), min(int(y1) + th + margin, height)
+        if right - left < tw or bottom - top < th:
+            return 0.0
+        window = cv2.cvtColor(image[top:bottom, left:right], cv2.COLOR_BGR2GRAY)
+        return float(cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED).max())
+
+    def capture_template(self, frame, row):
+        image, scale = self.working_image(frame)
+        x1, y1 = int(row['x1'] * scale), int(row['y1'] * scale)
+        x2, y2 = int(row['x2'] * scale), int(row['y2'] * scale)
+        crop = image[max(y1, 0):y2, max(x1, 0):x2]
+        if min(crop.shape[:2]) >= 8:
+            self.template = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+
+    @property
+    def verify_due(self):
+        return self.template is None or self.frames % self.verify_interval == 0
+
+    def prepare(self, frame):
+        """推理前调用：定位小人，返回推理门控可以忽略的小人框 (x1, y1, x2, y2)
+
+        冷却中、找不到小人或本帧需要YOLO校验时返回None（这一帧的推理要包含小人）。
+        """
+        self.frames += 1
+        self.row = None
+        if self.distrust > 0:
+            self.distrust -= 1
+            return None
+        self.row = self.locate(frame)
+        if self.row is None or self.verify_due:
+            return None
+        return tuple(int(self.row[key]) for key in ('x1', 'y1', 'x2', 'y2'))
+
+    def merge(self, frame, detections):
+        """用 prepare 得到的快速定位结果替换检测结果中的小人；校验帧与YOLO的小人比较，失败或找不到时保留YOLO结果"""
+        row = self.row
+        if row is None:
+            self.fallbacks += 1
+            return detections
+
+        person_index, _ = select_targets(detections)
+        yolo_person = detections[person_index] if person_index is not None else None
+        if yolo_person is not None and self.verify_due:
+            self.last_error = math.dist((row['cx'], row['cy']), (yolo_person['cx'], yolo_person['cy']))
+            self.verifications += 1
+            self.verify_error += self.last_error
+            if self.last_error > self.tolerance:
+                self.mismatches += 1
+                self.distrust = self.cooldown
+                self.fallbacks += 1
+                return detections
+            self.capture_template(frame, yolo_person)
+
+        self.fast_frames += 1
+        others = detections[detections['cls'] != PERSON]
+        merged = np.empty(len(others) + 1, dtype=DETECTION_DTYPE)
+        merged[0] = row
+        merged[1:] = others
+        return merged
+
+    # === 统计 ===
+
+    @property
+    def mean_ms(self):
+        return self.locate_time / self.locate_calls * 1000 if self.locate_calls else 0.0
+
+    def summary(self):
+        mean_error = self.verify_error / self.verifications if self.verifications else 0.0
+        return (f"快速定位 {self.fast_frames}/{self.frames} 帧 | {self.mean_ms:.2f}ms/帧 | "
+                f"退回YOLO {self.fallbacks} (模板否决 {self.rejected}) | "
+                f"校验 {self.verifications} 次 平均偏差 {mean_error:.1f}px 不一致 {self.mismatches}")
+
+
+# === 精度测试 ===
+
+def read_person_boxes(label_path, width, height):
+    """YOLO格式标注中的小人框 (x1, y1, x2, y2)，像素坐标"""
+    boxes = []
+    for line in label_path.read_text(encoding="utf-8").splitlines():
+        parts = line.split()
+        if len(parts) != 5 or int(parts[0]) != PERSON:
+            continue
+        x, y, w, h = (float(value) for value in parts[1:])
+        boxes.append(((x - w / 2) * width, (y - h / 2) * height, (x + w / 2) * width, (y + h / 2) * height))
+    return boxes
+
+
+def find_image(label_path):
+    images_dir = label_path.parent.parent / "images"
+    for suffix in (".jpg", ".png", ".jpeg"):
+        path = images_dir / (label_path.stem + suffix)
+        if path.exists():
+            return path
+    return None
+
+
+def evaluate(dataset_dir, locator, limit=None):
+    """在一个数据集目录上运行快速定位，返回脚底误差和耗时统计"""
+    errors, times = [], []
+    persons = missed = false_positives = negatives = 0
+    labels = sorted((dataset_dir / "labels").glob("*.txt"))[:limit]
+    for label_path in labels:
+        image_path = find_image(label_path)
+        image = cv2.imread(str(image_path)) if image_path else None
+        if image is None:
+            continue
+        height, width = image.shape[:2]
+        boxes = read_person_boxes(label_path, width, height)
+
+        start = time.perf_counter()
+        row = locator.locate(image)
+        times.append(time.perf_counter() - start)
+
+        if not boxes:
+            negatives += 1
+            false_positives += row is not None
+            continue
+        persons += 1
+        if row is None:
+            missed += 1
+            continue
+        # 标注的脚底点与 extract_detections 规则相同：底边中点向上3px
+        x1, y1, x2, y2 = boxes[0]
+        errors.append(math.dist((row['cx'], row['cy']), ((x1 + x2) / 2, y2 - 3)))
+
+    errors = np.array(errors) if errors else np.zeros(1)
+    times = np.array(times) * 1000 if times else np.zeros(1)
+    return {
+        'name': dataset_dir.name,
+        'images': len(labels),
+        'persons': persons,
+        'missed': missed,
+        'negatives': negatives,
+        'false_positives': false_positives,
+        'median': float(np.median(errors)),
+        'p95': float(np.percentile(errors, 95)),
+        'max': float(errors.max()),
+        'within': float(np.mean(errors <= 5)),
+        'mean_ms': float(times.mean()),
+        'p99_ms': float(np.percentile(times, 99)),
+    }
+
+
+def main():
+    import argparse
+    from rich.console import Console
+    from rich.table import Table
+    from rich import box
+
+    project_root = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description="小人快速定位精度测试（对比 datasets/*/labels 中的标注框）")
+    parser.add_argument("--datasets", default=str(project_root / "datasets"), help="包含 */images 和 */labels 的目录")
+    parser.add_argument("--limit", type=int, default=None, help="每个数据集最多测试的图片数")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)   # 与检测线程中的实际情况一致
+    datasets = sorted(path for path in Path(args.datasets).glob("*") if (path / "labels").is_dir())
+    if not datasets:
+        print(f"❌ 没有找到数据集: {args.datasets}/*/labels")
+        return
+
+    table = Table(title="🎯 小人快速定位精度（脚底点误差）", box=box.ROUNDED)
+    for column in ("数据集", "图片", "有小人", "漏检", "误检", "误差中位数", "P95", "最大", "≤5px", "耗时", "P99耗时"):
+        table.add_column(column)
+    for dataset_dir in datasets:
+        r = evaluate(dataset_dir, PlayerLocator(), args.limit)
+        table.add_row(r['name'], str(r['images']), str(r['persons']), str(r['missed']),
+                      f"{r['false_positives']}/{r['negatives']}", f"{r['median']:.1f}px", f"{r['p95']:.1f}px",
+                      f"{r['max']:.1f}px", f"{r['within']:.0%}", f"{r['mean_ms']:.2f}ms", f"{r['p99_ms']:.2f}ms")
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+高精度长按计时
+
+点按时长通过 jump_factor 与跳跃距离线性对应，按压误差会直接变成落点误差。
+time.sleep 的唤醒时间受系统调度影响，推理线程抢占CPU和GIL时误差可达十几毫秒。这里：
+    - 在专用线程中执行按压，可选提升线程优先级
+    - 先粗略 sleep 到截止时刻前的一小段时间，再用 perf_counter 自旋到截止时刻
+    - 按压期间临时缩短GIL切换间隔，避免自旋线程被其他线程长时间挡住
+    - 测量抬起操作本身的注入耗时并提前发出，补偿注入开销
+    - 记录计划时长与实际时长的误差直方图
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class TimingHistogram:
+    """计划时长 vs 实际时长的误差直方图（单位ms）"""
+
+    def __init__(self, bin_ms=0.25, limit_ms=5.0, history=1000):
+        self.bin_ms = bin_ms
+        self.limit_ms = limit_ms
+        self.bins = int(round(2 * limit_ms / bin_ms))
+        self.counts = [0] * self.bins
+        self.underflow = 0
+        self.overflow = 0
+        self.errors = deque(maxlen=history)   # 最近的误差样本
+        self.count = 0
+
+    def record(self, planned, actual):
+        error_ms = (actual - planned) * 1000
+        self.errors.append(error_ms)
+        self.count += 1
+        index = int((error_ms + self.limit_ms) // self.bin_ms)
+        if index < 0:
+            self.underflow += 1
+        elif index >= self.bins:
+            self.overflow += 1
+        else:
+            self.counts[index] += 1
+        return error_ms
+
+    def percentile_abs(self, q):
+        return float(np.percentile(np.abs(self.errors), q)) if self.errors else 0.0
+
+    def summary(self):
+        if not self.errors:
+            return "按压误差: 暂无数据"
+        errors = np.asarray(self.errors)
+        return (f"按压误差 n={self.count} 平均:{errors.mean():+.3f}ms 标准差:{errors.std():.3f}ms "
+                f"P99:{self.percentile_abs(99):.3f}ms 最大:{np.abs(errors).max():.3f}ms")
+
+    def render(self, width=30):
+        """文本直方图，只显示非空的区间"""
+        peak = max(self.counts + [self.underflow, self.overflow, 1])
+        lines = []
+        if self.underflow:
+            lines.append(f"   <{-self.limit_ms:+.2f}ms │{'█' * max(1, self.underflow * width // peak)} {self.underflow}")
+        for i, count in enumerate(self.counts):
+            if count:
+                low = -self.limit_ms + i * self.bin_ms
+                lines.append(f"{low:+6.2f}~{low + self.bin_ms:+6.2f}ms │{'█' * max(1, count * width // peak)} {count}")
+        if self.overflow:
+            lines.append(f"   >{self.limit_ms:+.2f}ms │{'█' * max(1, self.overflow * width // peak)} {self.overflow}")
+        return "\n".join(lines)
+
+
+def elevate_current_thread():
+    """尽量提升当前线程的调度优先级，失败时返回False"""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            THREAD_PRIORITY_TIME_CRITICAL = 15
+            return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_TIME_CRITICAL))
+        if sys.platform.startswith("linux"):
+            # Linux 上 setpriority 可以作用于单个线程（负值需要 CAP_SYS_NICE 权限）
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -10)
+            return True
+        print(f"⚠️ 当前平台不支持提升按压线程优先级: {sys.platform}")
+    except (OSError, AttributeError) as e:
+        print(f"⚠️ 无法提升按压线程优先级: {e}")
+    return False
+
+
+class PressTimer:
+    """在专用线程中执行精确长按"""
+
+    def __init__(self, spin_window=None, elevate_priority=False, compensate=True,
+                 switch_interval=0.0005, smoothing=0.2):
+        # Windows 默认计时器精度约15ms，需要更长的自旋窗口
+        self.spin_window = spin_window if spin_window is not None else (
+            0.016 if sys.platform == "win32" else 0.002)
+        self.elevate_priority = elevate_priority
+        self.compensate = compensate
+        self.switch_interval = switch_interval
+        self.smoothing = smoothing
+
+        self.down_latency = 0.0   # 按下操作的注入耗时（指数平均）
+        self.up_latency = 0.0     # 抬起操作的注入耗时（指数平均），用于提前释放
+        self.histogram = TimingHistogram()
+        self.elevated = False
+
+        self.requests = queue.Queue()
+        self.thread = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self.worker, name="press-timer", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        if self.thread and self.thread.is_alive():
+            self.requests.put(None)
+            self.thread.join(timeout=1.0)
+
+    def worker(self):
+        if self.elevate_priority:
+            self.elevated = elevate_current_thread()
+            if self.elevated:
+                print("⚡ 按压线程已提升优先级")
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            down, up, duration, done = request
+            try:
+                done['result'] = self.hold(down, up, duration)
+            except Exception as e:
+                done['error'] = e
+            done['event'].set()
+
+    def press(self, down, up, duration):
+        """在按压线程中执行 down → 保持duration秒 → up，阻塞直到完成并返回计时结果
+
+        down/up 为None时只模拟计时（回放模式）。
+        """
+        self.start()
+        done = {'event': threading.Event()}
+        self.requests.put((down, up, duration, done))
+        done['event'].wait()
+        if 'error' in done:
+            raise done['error']
+        return done['result']
+
+    def wait_until(self, deadline):
+        """粗略sleep + 自旋等待到deadline"""
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spin_window:
+            time.sleep(remaining - self.spin_window)
+        while time.perf_counter() < deadline:
+            pass
+
+    def hold(self, down, up, duration):
+        previous_interval = sys.getswitchinterval()
+        sys.setswitchinterval(self.switch_interval)
+        try:
+            t0 = time.perf_counter()
+            if down:
+                down()
+            t1 = time.perf_counter()   # 按下事件在down()返回前已经发出，以此作为按压起点
+
+            release_at = t1 + duration - (self.up_latency if self.compensate else 0.0)
+            self.wait_until(release_at)
+
+            t2 = time.perf_counter()
+            if up:
+                up()
+            t3 = time.perf_counter()
+        finally:
+            sys.setswitchinterval(previous_interval)
+
+        self.down_latency += self.smoothing * ((t1 - t0) - self.down_latency)
+        self.up_latency += self.smoothing * ((t3 - t2) - self.up_latency)
+
+        actual = t3 - t1
+        error_ms = self.histogram.record(duration, actual)
+        return {
+            'planned': duration,
+            'actual': actual,
+            'error_ms': error_ms,
+            'down_ms': (t1 - t0) * 1000,
+            'up_ms': (t3 - t2) * 1000,
+        }
+
+
+def benchmark(samples=50, durations=(0.05, 0.2, 0.5)):
+    """比较 time.sleep 与 PressTimer 的计时误差（不操作鼠标）"""
+    naive = TimingHistogram()
+    for i in range(samples):
+        duration = durations[i % len(durations)]
+        start = time.perf_counter()
+        time.sleep(duration)
+        naive.record(duration, time.perf_counter() - start)
+
+    timer = PressTimer()
+    for i in range(samples):
+        timer.press(None, None, durations[i % len(durations)])
+    timer.close()
+
+    print(f"time.sleep  : {naive.summary()}")
+    print(f"PressTimer  : {timer.histogram.summary()}")
+    print(timer.histogram.render())
+
+
+if __name__ == "__main__":
+    benchmark()
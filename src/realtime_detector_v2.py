@@ -1,34 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import cv2
-import numpy as np
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
 import time
-from PIL import Image, ImageTk
-from ultralytics import YOLO
-from pathlib import Path
-import queue
 import sys
 
-try:
-    import mss
-    MSS_AVAILABLE = True
-except ImportError:
-    MSS_AVAILABLE = False
-    print("⚠️ mss库未安装，尝试安装...")
-    import subprocess
-    try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "mss"])
-        import mss
-        MSS_AVAILABLE = True
-        print("✅ mss库安装成功")
-    except Exception as e:
-        print(f"❌ 无法安装mss库: {e}")
-        print("请手动安装: pip install mss")
-        sys.exit(1)
+from jump_engine import add_engine_arguments, build_engine, load_model
+from detection_postprocess import bbox
+from overlay_renderer import add_box, new_overlay
+from display_renderer import FrameDisplay
+from ui_state import UIRefresher
 
 try:
     import pynput.mouse
@@ -47,26 +30,22 @@ except ImportError:
         print("请手动安装: pip install pynput")
 
 class RealtimeDetectorV2:
-    def __init__(self):
+    """只检测不游戏的引擎客户端：显示全部检测框"""
+    
+    def __init__(self, engine, display_fps=30):
         self.root = tk.Tk()
         self.root.title("跳一跳实时检测器 V2.0")
         self.root.geometry("900x700")
         
-        # 初始化mss截图工具
-        self.sct = mss.mss()
-        
-        # 加载训练好的模型
-        self.load_model()
+        # 引擎以只检测模式运行，叠加层由本界面生成（显示所有检测框）
+        self.engine = engine
+        self.engine.overlay_builder = self.draw_detections
         
         # 界面变量
-        self.capture_area = None
         self.is_detecting = False
-        self.detection_thread = None
         self.fps_counter = 0
         self.fps_time = time.time()
-        
-        # 图像队列用于线程通信
-        self.image_queue = queue.Queue(maxsize=5)
+        self.display_fps = display_fps  # 界面显示帧率上限（与检测帧率无关）
         
         # 鼠标选择相关
         self.mouse_listener = None
@@ -78,30 +57,19 @@ class RealtimeDetectorV2:
         self.class_colors = {0: (255, 0, 0), 1: (0, 0, 255)}  # BGR格式
         
         self.setup_ui()
-        
-    def load_model(self):
-        """加载训练好的YOLO模型"""
-        runs_dir = Path("runs")
-        best_model = None
-        
-        for run_dir in runs_dir.glob("jump_jump_nano_*"):
-            if run_dir.is_dir():
-                model_path = run_dir / "weights" / "best.pt"
-                if model_path.exists():
-                    best_model = model_path
-                    break
-        
-        if best_model:
-            try:
-                self.model = YOLO(str(best_model))
-                print(f"✅ 成功加载模型: {best_model}")
-            except Exception as e:
-                print(f"❌ 加载模型失败: {e}")
-                messagebox.showerror("错误", f"无法加载YOLO模型: {e}")
-                sys.exit(1)
-        else:
-            messagebox.showerror("错误", "未找到训练好的模型文件！\n请先训练模型。")
-            sys.exit(1)
+        # 检测线程写入引擎的界面状态快照
+        self.ui_refresher = UIRefresher(self.root, engine.ui, self)
+        self.ui_refresher.start()
+        
+        # 回放来源不需要设置区域
+        if not engine.frame_source.is_live:
+            self.area_var.set(f"检测来源: {engine.frame_source.describe()}")
+            self.status_var.set("回放来源已就绪")
+            self.start_btn.config(state="normal")
+    
+    @property
+    def capture_area(self):
+        return self.engine.capture_area
     
     def setup_ui(self):
         """设置用户界面"""
@@ -172,6 +140,7 @@ class RealtimeDetectorV2:
         
         self.canvas = tk.Canvas(canvas_frame, bg="black", width=700, height=450)
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.display = FrameDisplay(self.canvas, max_fps=self.display_fps)
         
         # 统计信息
         stats_frame = ttk.LabelFrame(self.root, text="检测统计", padding="10")
@@ -275,12 +244,12 @@ class RealtimeDetectorV2:
             bottom = max(y1, y2)
             
             # mss需要的格式: {"top": y, "left": x, "width": w, "height": h}
-            self.capture_area = {
+            self.engine.set_capture_area({
                 "top": top,
                 "left": left,
                 "width": right - left,
                 "height": bottom - top
-            }
+            })
             
             self.status_var.set(f"区域已设置: {left},{top} → {right},{bottom}")
             self.area_var.set(f"检测区域: {self.capture_area['width']}x{self.capture_area['height']}")
@@ -295,42 +264,26 @@ class RealtimeDetectorV2:
             messagebox.showwarning("警告", "请先设置检测区域！")
             return
         
-        try:
-            # 使用mss进行截图
-            screenshot = self.sct.grab(self.capture_area)
-            
-            # 转换为numpy数组
-            img = np.array(screenshot)
-            img_bgr = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-            
-            # 显示在画布上
-            self.display_image(img_bgr)
-            self.status_var.set("测试截图成功！")
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"截图失败: {e}")
-    
-    def capture_screen_mss(self):
-        """使用mss进行高效屏幕捕获"""
-        if not self.capture_area:
-            return None
-            
-        try:
-            # 使用mss进行截图 - 这个方法不会触发权限请求
-            screenshot = self.sct.grab(self.capture_area)
-            
-            # 转换为OpenCV格式
-            img = np.array(screenshot)
-            img_bgr = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-            
-            return img_bgr
-        except Exception as e:
-            print(f"mss截图错误: {e}")
-            return None
+        # 使用引擎的mss采集器截图
+        frame = self.engine.capture_screen()
+        if frame is None and self.engine.frame_source.detects:
+            # 进程模式在工作进程中采集，主进程没有采集器：取检测线程发布的最新画面
+            item = self.engine.image_channel.latest()
+            if item is None:
+                messagebox.showwarning("提示", "进程模式下由工作进程截图，请先开始检测再测试截图")
+                return
+            frame = item.value[0].copy()   # 共享内存中的视图，复制后再显示
+        if frame is None:
+            messagebox.showerror("错误", "截图失败")
+            return
+        
+        # 显示在画布上
+        self.display_image(frame)
+        self.status_var.set("测试截图成功！")
     
     def start_detection(self):
         """开始检测"""
-        if not self.capture_area:
+        if self.engine.frame_source.is_live and not self.capture_area:
             messagebox.showwarning("警告", "请先设置检测区域！")
             return
         
@@ -339,9 +292,8 @@ class RealtimeDetectorV2:
         self.stop_btn.config(state="normal")
         self.status_var.set("检测中...")
         
-        # 启动检测线程
-        self.detection_thread = threading.Thread(target=self.detection_loop, daemon=True)
-        self.detection_thread.start()
+        # 启动引擎检测线程
+        self.engine.start()
         
         # 启动显示更新
         self.update_display()
@@ -349,99 +301,30 @@ class RealtimeDetectorV2:
     def stop_detection(self):
         """停止检测"""
         self.is_detecting = False
+        self.engine.stop()
         self.start_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
         self.status_var.set("检测已停止")
     
-    def detection_loop(self):
-        """检测循环"""
-        while self.is_detecting:
-            try:
-                # 捕获屏幕
-                frame = self.capture_screen_mss()
-                if frame is None:
-                    time.sleep(0.1)
-                    continue
-                
-                # YOLO检测
-                results = self.model(frame, verbose=False)
-                
-                # 绘制检测结果
-                annotated_frame = self.draw_detections(frame, results[0])
-                
-                # 将结果放入队列
-                if not self.image_queue.full():
-                    try:
-                        self.image_queue.put_nowait(annotated_frame)
-                    except queue.Full:
-                        pass
-                
-                # 控制帧率
-                time.sleep(0.033)  # 约30FPS
-                
-            except Exception as e:
-                print(f"检测错误: {e}")
-                time.sleep(0.1)
-    
-    def draw_detections(self, frame, result):
-        """在图像上绘制检测结果"""
-        annotated_frame = frame.copy()
-        detection_count = 0
-        
-        if result.boxes is not None:
-            for box in result.boxes:
-                # 获取边界框坐标
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                
-                # 获取类别和置信度
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                
-                if conf > 0.5:  # 置信度阈值
-                    detection_count += 1
-                    
-                    # 绘制边界框
-                    color = self.class_colors.get(cls, (0, 255, 0))
-                    cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 3)
-                    
-                    # 绘制标签
-                    label = f"{self.class_names.get(cls, 'Unknown')}: {conf:.2f}"
-                    label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)[0]
-                    cv2.rectangle(annotated_frame, (x1, y1 - label_size[1] - 15), 
-                                (x1 + label_size[0] + 10, y1), color, -1)
-                    cv2.putText(annotated_frame, label, (x1 + 5, y1 - 8), 
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    def draw_detections(self, frame, detections, person_index, target_index, distance):
+        """生成全部检测结果的叠加层描述（引擎检测线程中调用，不在帧上绘制）"""
+        overlay = new_overlay(frame.shape[1], frame.shape[0])
+        
+        for detection in detections:
+            cls = int(detection['cls'])
+            color = self.class_colors.get(cls, (0, 255, 0))
+            label = f"{self.class_names.get(cls, 'Unknown')}: {detection['conf']:.2f}"
+            add_box(overlay, bbox(detection), color, 3, label, label_bg=color)
         
         # 更新检测统计
-        self.root.after(0, lambda: self.detection_var.set(f"检测对象: {detection_count}"))
+        self.engine.ui.set('detection_var', f"检测对象: {len(detections)}")
         
-        return annotated_frame
+        return overlay
     
-    def display_image(self, frame):
-        """在画布上显示图像"""
+    def display_image(self, frame, overlay=None):
+        """在画布上显示图像（强制绘制，用于测试截图）"""
         try:
-            # 调整图像大小以适应画布
-            canvas_width = self.canvas.winfo_width()
-            canvas_height = self.canvas.winfo_height()
-            
-            if canvas_width > 1 and canvas_height > 1:
-                h, w = frame.shape[:2]
-                scale = min(canvas_width / w, canvas_height / h)
-                new_w, new_h = int(w * scale), int(h * scale)
-                
-                frame_resized = cv2.resize(frame, (new_w, new_h))
-                
-                # 转换为PIL图像
-                frame_rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(frame_rgb)
-                photo = ImageTk.PhotoImage(pil_image)
-                
-                # 更新画布
-                self.canvas.delete("all")
-                self.canvas.create_image(canvas_width//2, canvas_height//2, 
-                                       image=photo, anchor=tk.CENTER)
-                self.canvas.image = photo  # 保持引用
-                
+            self.display.render(frame, None, overlay)
         except Exception as e:
             print(f"显示图像错误: {e}")
     
@@ -450,38 +333,95 @@ class RealtimeDetectorV2:
         if not self.is_detecting:
             return
         
+        # 帧来源已结束
+        if not self.engine.running:
+            self.stop_detection()
+            return
+        
         try:
-            # 从队列获取最新图像
-            if not self.image_queue.empty():
-                frame = self.image_queue.get_nowait()
+            # 获取最新图像（同一帧不重复绘制，显示帧率单独限制）
+            item = self.engine.image_channel.latest()
+            if item is not None:
+                frame, overlay = item.value
+                if self.display.render(frame, item.seq, overlay):
+                    self.fps_counter += 1
                 
                 # 计算FPS
-                self.fps_counter += 1
                 current_time = time.time()
                 if current_time - self.fps_time >= 1.0:
                     fps = self.fps_counter / (current_time - self.fps_time)
-                    self.fps_var.set(f"FPS: {fps:.1f}")
+                    capture_info = ""
+                    if self.engine.capturer is not None:
+                        stats = self.engine.capturer.stats
+                        capture_info = (f"采集: {stats.last_latency * 1000:.1f}ms "
+                                        f"分配/帧: {stats.allocations_per_frame:.3f} | ")
+                    gate = self.engine.inference_gate
+                    tracker = self.engine.tracker
+                    tracking_info = ""
+                    if tracker is not None:
+                        tracking_info = f"跟踪帧: {tracker.tracked_frames}/{tracker.tracked_frames + tracker.detected_frames} | "
+                    self.fps_var.set(f"FPS: {fps:.1f} | {capture_info}"
+                                     f"推理复用: {gate.hits}/{gate.hits + gate.misses} | {tracking_info}"
+                                     f"画面延迟: {item.age() * 1000:.0f}ms | "
+                                     f"Tk绘制: {self.display.ms_per_frame:.1f}ms/帧 | "
+                                     f"{self.ui_refresher.summary()}")
                     self.fps_counter = 0
                     self.fps_time = current_time
-                
-                # 显示图像
-                self.display_image(frame)
         
-        except queue.Empty:
-            pass
         except Exception as e:
             print(f"显示更新错误: {e}")
         
         # 继续更新
         if self.is_detecting:
-            self.root.after(30, self.update_display)  # 约33FPS
+            self.root.after(self.display.interval_ms, self.update_display)
     
     def run(self):
         """运行程序"""
         self.root.mainloop()
+        self.engine.close()
+
+def load_detector_model(weights=None, backend=None):
+    """加载训练好的YOLO模型（推理后端由 assets/config/inference.yaml 选择），失败时弹窗退出"""
+    try:
+        model, best_model, backend = load_model(weights, backend)
+        print(f"✅ 成功加载模型: {best_model} (推理后端: {backend})")
+        return model
+    except FileNotFoundError:
+        messagebox.showerror("错误", "未找到训练好的模型文件！\n请先训练模型。")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ 加载模型失败: {e}")
+        messagebox.showerror("错误", f"无法加载YOLO模型: {e}")
+        sys.exit(1)
+
+def connect_detector_server(address):
+    """连接本地推理服务（模型由 inference_server.py 持有），失败时弹窗退出"""
+    from inference_server import InferenceClient
+    try:
+        model = InferenceClient(address)
+        print(f"✅ 已连接推理服务: {address}")
+        return model
+    except (OSError, ValueError) as e:
+        print(f"❌ 连接推理服务失败: {e}")
+        messagebox.showerror("错误", f"无法连接推理服务 {address}: {e}\n请先运行 python inference_server.py")
+        sys.exit(1)
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="跳一跳实时检测器 V2.0")
+    add_engine_arguments(parser)
+    parser.add_argument("--display-fps", type=float, default=30, help="界面显示帧率上限")
+    parser.set_defaults(fps=30, confidence=0.5)  # 约30FPS采集，显示置信度0.5以上的全部检测框
+    args = parser.parse_args()
+    
     print("🚀 启动跳一跳实时检测器 V2.0...")
     print("📋 使用mss库进行高性能屏幕捕获")
-    detector = RealtimeDetectorV2()
-    detector.run()
\ No newline at end of file
+    if args.process_pipeline:
+        model = None
+    elif args.inference_server:
+        model = connect_detector_server(args.inference_server)
+    else:
+        model = load_detector_model(args.weights, args.backend)
+    engine = build_engine(args, model, detect_only=True)
+    detector = RealtimeDetectorV2(engine, display_fps=args.display_fps)
+    detector.run()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+基于画面的"场景已稳定"判断
+
+跳跃之后镜头平移、小人落地的动画时长并不固定，固定等待 stable_wait + jump_delay 会浪费大量时间。
+这里用相邻帧缩略图的运动能量判断画面是否静止，再要求最近几帧检测到的小人和目标方块位置一致，
+两者同时满足就认为场景已经稳定，可以立即锁定跳跃参数。
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class SettleDetector:
+    """运动能量 + 多帧位置一致性的场景稳定检测器"""
+
+    def __init__(self, motion_threshold=6, still_frames=3, consensus_frames=3,
+                 position_tolerance=4.0, min_settle_time=0.3, pixel_delta=16, thumb_size=(72, 128)):
+        self.motion_threshold = motion_threshold      # 相邻帧缩略图允许变化的像素数
+        self.still_frames = still_frames              # 连续静止帧数
+        self.consensus_frames = consensus_frames      # 位置一致性要求的检测帧数
+        self.position_tolerance = position_tolerance  # 位置一致性容差(px)
+        self.min_settle_time = min_settle_time        # 跳跃后至少等待的时间，避开起跳瞬间
+        self.pixel_delta = pixel_delta
+        self.thumb_size = thumb_size
+
+        self.small = np.empty((thumb_size[1], thumb_size[0], 3), dtype=np.uint8)
+        self.current = np.empty((thumb_size[1], thumb_size[0]), dtype=np.uint8)
+        self.previous = np.empty_like(self.current)
+        self.diff = np.empty_like(self.current)
+
+        self.lock = threading.Lock()
+        self.positions = deque(maxlen=consensus_frames)
+        self.durations = deque(maxlen=100)            # 最近的稳定耗时记录
+        self.reset()
+
+    def reset(self, now=None):
+        """跳跃结束时调用，开始新一轮稳定判断"""
+        with self.lock:
+            self.reset_time = now if now is not None else time.perf_counter()
+            self.has_previous = False
+            self.still_count = 0
+            self.positions.clear()
+            self.settled = False
+            self.settle_time = None
+            self.last_motion = 0
+            self.motion_seen = False   # 跳跃后是否出现过画面运动（用于确认按压生效）
+
+    def update(self, frame, person_center, target_center, timestamp):
+        """检测线程每帧调用，timestamp 为该帧的采集时间"""
+        cv2.resize(frame, self.thumb_size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.current)
+
+        with self.lock:
+            # 跳跃之前采集的帧不参与判断
+            if timestamp < self.reset_time:
+                return self.settled
+
+            if self.has_previous:
+                cv2.absdiff(self.current, self.previous, dst=self.diff)
+                cv2.threshold(self.diff, self.pixel_delta, 255, cv2.THRESH_BINARY, dst=self.diff)
+                self.last_motion = cv2.countNonZero(self.diff)
+                if self.last_motion <= self.motion_threshold:
+                    self.still_count += 1
+                else:
+                    self.still_count = 0
+                    self.motion_seen = True
+            self.current, self.previous = self.previous, self.current
+            self.has_previous = True
+
+            if person_center is not None and target_center is not None:
+                self.positions.append((person_center, target_center))
+            else:
+                self.positions.clear()
+
+            if not self.settled and self.is_stable(timestamp):
+                self.settled = True
+                self.settle_time = timestamp
+                duration = timestamp - self.reset_time
+                self.durations.append(duration)
+                print(f"🧘 画面已稳定 - 耗时:{duration:.2f}s (运动像素:{self.last_motion})")
+            return self.settled
+
+    def is_stable(self, timestamp):
+        """运动能量和位置一致性同时满足"""
+        if timestamp - self.reset_time < self.min_settle_time:
+            return False
+        if self.still_count < self.still_frames:
+            return False
+        if len(self.positions) < self.consensus_frames:
+            return False
+
+        first_person, first_target = self.positions[0]
+        for person, target in self.positions:
+            if (math.dist(person, first_person) > self.position_tolerance or
+                    math.dist(target, first_target) > self.position_tolerance):
+                return False
+        return True
+
+    def is_settled(self):
+        with self.lock:
+            return self.settled
+
+    def consensus(self):
+        """返回一致帧的平均小人位置、目标位置和距离；尚未稳定时返回None"""
+        with self.lock:
+            if not self.settled or not self.positions:
+                return None
+            count = len(self.positions)
+            person = (sum(p[0][0] for p in self.positions) / count,
+                      sum(p[0][1] for p in self.positions) / count)
+            target = (sum(p[1][0] for p in self.positions) / count,
+                      sum(p[1][1] for p in self.positions) / count)
+            return person, target, math.dist(person, target)
+
+    @property
+    def last_duration(self):
+        return self.durations[-1] if self.durations else None
+
+    @property
+    def mean_duration(self):
+        return sum(self.durations) / len(self.durations) if self.durations else None
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多进程检测管线（共享内存传帧）
+
+采集、YOLO推理、Tk主循环和长按计时原来都在同一个进程里，共享一个GIL：推理的Python部分
+（前后处理、ultralytics调度）一忙起来，画面刷新和长按计时线程的唤醒都会被推迟。
+进程模式下采集和推理在独立的工作进程中运行，每帧的画面和检测结果写入
+multiprocessing.shared_memory 环形缓冲区；界面和游戏控制器所在的主进程直接在共享内存上
+建立 NumPy 视图读取（零拷贝），只需要保存的帧才复制。
+
+    - 写入方只有工作进程一个。每个槽位先把序号置为-1（写入中），写完数据再写入新序号，
+      读取方在取视图前后各检查一次序号，槽位被覆盖时放弃该帧（与 frame_capture 的环形缓冲区一样，
+      槽位数决定了视图在被覆盖前可以使用多久）。需要保存的帧复制之后再用 frame_valid(序号)
+      确认复制期间槽位没有被覆盖，否则放弃保存
+    - 帧超过预分配的最大尺寸时工作进程报错退出（设置过大的采集区域时主进程直接报错），
+      不会悄悄丢帧让引擎一直等待
+    - 时间戳使用 time.perf_counter()，在同一台机器的不同进程之间可以直接比较，帧龄统计不变
+    - 检测结果按最低置信度写入，主进程再按界面上的当前阈值筛选
+
+基准测试（对比线程模式和进程模式的GIL争用、帧龄和长按误差）:
+    python shm_pipeline.py --source dir:../datasets/auto/images --seconds 20
+    python shm_pipeline.py --source dir:../datasets/auto/images --synthetic-ms 40   # 不需要模型，模拟持有GIL的推理
+"""
+
+import argparse
+import multiprocessing as mp
+import queue
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from multiprocessing import shared_memory
+
+from detection_postprocess import DETECTION_DTYPE, extract_detections
+from frame_source import FrameSource, open_frame_source
+from inference_gate import ChangeGate
+
+HEADER_DTYPE = np.dtype([('seq', '<i8'), ('timestamp', '<f8'), ('height', '<i4'),
+                         ('width', '<i4'), ('count', '<i4'), ('reserved', '<i4')])
+
+# 控制字段（头部缓冲区末尾的 int64 数组）
+LATEST, STATE, GATE_HITS, GATE_MISSES, OVERSIZE = range(5)
+CONTROL_FIELDS = 5
+
+# 工作进程状态
+STARTING, RUNNING, FINISHED, FAILED = range(4)
+
+MIN_CONFIDENCE = 0.25   # 工作进程写入的最低置信度，主进程再按当前阈值筛选
+
+
+def attach_block(name):
+    """连接已有的共享内存块（只有创建方负责 unlink）
+
+    Python 3.13 之前没有 track 参数；spawn 启动的子进程与主进程共用同一个 resource_tracker，
+    重复登记同一个名字没有影响，由主进程 unlink 时注销。
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrame:
+    """共享内存中的一帧（frame/detections 为视图，槽位被覆盖前有效）"""
+
+    __slots__ = ('seq', 'timestamp', 'frame', 'detections')
+
+    def __init__(self, seq, timestamp, frame, detections):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+        self.detections = detections
+
+    def age(self, now=None):
+        return (now if now is not None else time.perf_counter()) - self.timestamp
+
+
+class SharedFrameRing:
+    """共享内存中的帧和检测结果环形缓冲区（一个写入进程，任意多个读取方）"""
+
+    def __init__(self, slots=4, max_height=1920, max_width=1080, max_detections=64, names=None):
+        self.slots = slots
+        self.max_height = max_height
+        self.max_width = max_width
+        self.max_detections = max_detections
+        self.slot_bytes = max_height * max_width * 3
+
+        self.owner = names is None
+        sizes = (slots * self.slot_bytes,
+                 slots * max_detections * DETECTION_DTYPE.itemsize,
+                 slots * HEADER_DTYPE.itemsize + CONTROL_FIELDS * 8)
+        if self.owner:
+            self.blocks = [shared_memory.SharedMemory(create=True, size=size) for size in sizes]
+        else:
+            self.blocks = [attach_block(name) for name in names]
+
+        frame_block, detection_block, header_block = self.blocks
+        self.detections = np.ndarray((slots, max_detections), DETECTION_DTYPE, buffer=detection_block.buf)
+        self.header = np.ndarray((slots,), HEADER_DTYPE, buffer=header_block.buf)
+        self.control = np.ndarray((CONTROL_FIELDS,), np.int64, buffer=header_block.buf,
+                                  offset=slots * HEADER_DTYPE.itemsize)
+        if self.owner:
+            self.header['seq'] = -1
+            self.control[:] = 0
+
+    def spec(self):
+        """在工作进程中重新连接所需的参数（可以pickle）"""
+        return {'slots': self.slots, 'max_height': self.max_height, 'max_width': self.max_width,
+                'max_detections': self.max_detections, 'names': [block.name for block in self.blocks]}
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(**spec)
+
+    def frame_view(self, slot, height, width):
+        """槽位中按实际尺寸紧密排列的帧视图（连续内存）"""
+        return np.ndarray((height, width, 3), np.uint8, buffer=self.blocks[0].buf,
+                          offset=slot * self.slot_bytes)
+
+    def write(self, frame, timestamp, detections):
+        """写入一帧和它的检测结果，返回序号；帧超过预分配尺寸时丢弃并返回None"""
+        height, width = frame.shape[:2]
+        if height > self.max_height or width > self.max_width:
+            self.control[OVERSIZE] += 1
+            return None
+        seq = int(self.control[LATEST]) + 1
+        slot = seq % self.slots
+        header = self.header
+
+        header['seq'][slot] = -1  # 写入中，读取方放弃该槽位
+        self.frame_view(slot, height, width)[...] = frame[:, :, :3]
+        count = min(len(detections), self.max_detections)
+        self.detections[slot, :count] = detections[:count]
+        header['timestamp'][slot] = timestamp
+        header['height'][slot] = height
+        header['width'][slot] = width
+        header['count'][slot] = count
+        header['seq'][slot] = seq
+        self.control[LATEST] = seq
+        return seq
+
+    def latest_seq(self):
+        return int(self.control[LATEST])
+
+    def valid(self, seq):
+        """该序号的槽位是否还没有被覆盖"""
+        return self.header['seq'][seq % self.slots] == seq
+
+    def view(self, seq):
+        """返回该序号的零拷贝视图，槽位已被覆盖或正在写入时返回None"""
+        slot = seq % self.slots
+        header = self.header
+        if header['seq'][slot] != seq:
+            return None
+        timestamp = float(header['timestamp'][slot])
+        height, width, count = int(header['height'][slot]), int(header['width'][slot]), int(header['count'][slot])
+        item = SharedFrame(seq, timestamp, self.frame_view(slot, height, width), self.detections[slot, :count])
+        if header['seq'][slot] != seq:  # 读取头信息期间被覆盖
+            return None
+        return item
+
+    def wait_newer(self, after_seq, timeout=None, poll=0.0005):
+        """等待比 after_seq 更新的帧（跳过中间帧，只取最新），超时或写入方结束时返回None"""
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        while True:
+            seq = self.latest_seq()
+            if seq > after_seq:
+                item = self.view(seq)
+                if item is not None:
+                    return item
+            elif self.control[STATE] in (FINISHED, FAILED):
+                return None
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def close(self):
+        self.detections = self.header = self.control = None
+        for block in self.blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass  # 还有视图在使用（如界面正在显示的帧），进程退出时释放
+
+    def unlink(self):
+        if self.owner:
+            for block in self.blocks:
+                block.unlink()
+
+
+# === 工作进程 ===
+
+class SyntheticDetector:
+    """基准测试用的模拟推理：在纯Python循环中持有GIL指定的毫秒数，不检测任何目标"""
+
+    def __init__(self, milliseconds):
+        self.seconds = milliseconds / 1000
+
+    def __call__(self, frame, verbose=False):
+        deadline = time.perf_counter() + self.seconds
+        while time.perf_counter() < deadline:
+            pass
+        return [SimpleNamespace(boxes=None)]
+
+
+def create_detector(weights=None, backend=None, synthetic_ms=None):
+    if synthetic_ms:
+        return SyntheticDetector(synthetic_ms)
+    from jump_engine import load_model
+    model, weights, backend = load_model(weights, backend)
+    print(f"✅ 工作进程加载模型: {weights} (推理后端: {backend})")
+    return model
+
+
+def worker_main(ring_spec, source_spec, clock, fps, loop, weights, backend, synthetic_ms,
+                gate_threshold, gate_enabled, area_queue, stop_event):
+    """工作进程：采集 → 推理（带变化门控）→ 写入共享内存"""
+    ring = SharedFrameRing.attach(ring_spec)
+    source = None
+    try:
+        source = open_frame_source(source_spec, clock=clock, fps=fps, loop=loop)
+        model = create_detector(weights, backend, synthetic_ms)
+        gate = ChangeGate(threshold=gate_threshold)
+        gate.enabled = gate_enabled
+        ring.control[STATE] = RUNNING
+
+        while not stop_event.is_set():
+            # 主进程设置的新采集区域
+            if source.is_live:
+                try:
+                    while True:
+                        source.set_area(area_queue.get_nowait())
+                except queue.Empty:
+                    pass
+
+            packet = source.read()
+            if packet is None:
+                if source.exhausted:
+                    print(f"⏹ 帧来源已结束: {source.describe()}")
+                    break
+                time.sleep(0.05)
+                continue
+            frame, timestamp = packet
+
+            results = gate.infer(frame, lambda: model(frame, verbose=False))
+            if ring.write(frame, timestamp, extract_detections(results[0], MIN_CONFIDENCE)) is None:
+                # 例如高分屏下采集到的物理像素超过了预分配尺寸：报错退出，而不是一直丢帧
+                height, width = frame.shape[:2]
+                raise ValueError(f"帧尺寸 {width}x{height} 超过共享内存预分配的 "
+                                 f"{ring.max_width}x{ring.max_height}，请缩小采集区域")
+            ring.control[GATE_HITS] = gate.hits
+            ring.control[GATE_MISSES] = gate.misses
+        ring.control[STATE] = FINISHED
+    except Exception as e:
+        print(f"❌ 工作进程错误: {e}")
+        ring.control[STATE] = FAILED
+    finally:
+        if source is not None:
+            source.close()
+        ring.close()
+
+
+class ProcessFrameSource(FrameSource):
+    """在工作进程中采集并推理的帧来源，read() 返回共享内存视图 (frame, timestamp, detections, seq)"""
+
+    detects = True
+
+    def __init__(self, spec, clock="realtime", fps=20, loop=False, weights=None, backend=None,
+                 gate_threshold=8, gate_enabled=True, synthetic_ms=None, slots=4,
+                 max_height=1920, max_width=1080):
+        super().__init__()
+        self.spec = spec
+        self.is_live = spec == "screen"
+        self.area = None
+        self.last_seq = 0
+        self.ring = SharedFrameRing(slots=slots, max_height=max_height, max_width=max_width)
+
+        # spawn 启动：不继承主进程的线程和Tk/CUDA状态，各平台行为一致
+        context = mp.get_context("spawn")
+        self.area_queue = context.Queue()
+        self.stop_event = context.Event()
+        self.process = context.Process(
+            target=worker_main, name="capture-inference", daemon=True,
+            args=(self.ring.spec(), spec, clock, fps, loop, weights, backend, synthetic_ms,
+                  gate_threshold, gate_enabled, self.area_queue, self.stop_event))
+        self.process.start()
+
+    def set_area(self, area):
+        if area['width'] > self.ring.max_width or area['height'] > self.ring.max_height:
+            raise ValueError(f"采集区域 {area['width']}x{area['height']} 超过共享内存预分配的 "
+                             f"{self.ring.max_width}x{self.ring.max_height}")
+        self.area = area
+        self.area_queue.put(area)
+
+    def read(self, timeout=0.5):
+        item = self.ring.wait_newer(self.last_seq, timeout=timeout)
+        if item is None:
+            if self.ring.control[STATE] in (FINISHED, FAILED) or not self.process.is_alive():
+                self.exhausted = True
+            return None
+        self.last_seq = item.seq
+        self.frames_read += 1
+        return item.frame, item.timestamp, item.detections, item.seq
+
+    def frame_valid(self, seq):
+        """该序号的帧视图是否仍然有效（复制帧之后调用，确认复制期间槽位没有被工作进程覆盖）"""
+        return self.ring.control is not None and self.ring.valid(seq)
+
+    def summary(self):
+        control = self.ring.control
+        hits, misses = int(control[GATE_HITS]), int(control[GATE_MISSES])
+        text = f"工作进程 写入:{self.ring.latest_seq()} 帧 推理复用:{hits}/{hits + misses}"
+        if control[OVERSIZE]:
+            text += f" 超尺寸丢弃:{int(control[OVERSIZE])}"
+        return text
+
+    def describe(self):
+        if self.is_live:
+            area = f" {self.area['width']}x{self.area['height']}" if self.area else "(未设置区域)"
+            return f"工作进程 屏幕采集{area}"
+        return f"工作进程 {self.spec}"
+
+    def close(self):
+        if self.ring.control is None:
+            return
+        self.stop_event.set()
+        self.process.join(timeout=3.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
+        self.ring.unlink()
+
+
+# === 基准测试 ===
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+def measure(engine, seconds, press_interval=0.25, press_duration=0.1):
+    """在引擎运行时测量：GIL争用（1ms睡眠的唤醒延迟）、决策时的帧龄、长按计时误差"""
+    from input_backends import MockBackend
+
+    wakeups, ages, press_errors = [], [], []
+    stop = time.perf_counter() + seconds
+
+    def probe():
+        # 其他线程持有GIL时，睡眠结束后要等到拿回GIL才能继续
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            time.sleep(0.001)
+            wakeups.append((time.perf_counter() - start - 0.001) * 1000)
+
+    def consumer():
+        last_seq = 0
+        while time.perf_counter() < stop:
+            item = engine.detection_channel.wait_newer(last_seq, timeout=0.5)
+            if item is not None:
+                last_seq = item.seq
+                ages.append(item.age() * 1000)
+
+    def presser():
+        backend = MockBackend()
+        while time.perf_counter() < stop:
+            timing = engine.press_timer.press(lambda: backend.down(0, 0), backend.up, press_duration)
+            press_errors.append(abs(timing['error_ms']))
+            time.sleep(press_interval)
+
+    engine.start()
+    # 等待第一帧（工作进程需要先加载模型）
+    engine.detection_channel.wait_newer(0, timeout=60)
+    engine.stats.reset()
+    threads = [threading.Thread(target=target, daemon=True) for target in (probe, consumer, presser)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    totals = engine.stats.totals()
+    engine.close()
+
+    return {
+        'fps': totals['fps'],
+        'cpu_percent': totals['cpu_percent'],
+        'wakeup_p50': percentile(wakeups, 50),
+        'wakeup_p99': percentile(wakeups, 99),
+        'wakeup_max': max(wakeups, default=0.0),
+        'age_p50': percentile(ages, 50),
+        'age_p99': percentile(ages, 99),
+        'press_mean': float(np.mean(press_errors)) if press_errors else 0.0,
+        'press_p99': percentile(press_errors, 99),
+    }
+
+
+def main():
+    from rich.console import Console
+    from rich.table import Table
+    from rich import box
+
+    from jump_engine import JumpEngine, build_jump_overlay
+
+    parser = argparse.ArgumentParser(description="线程模式与进程模式（共享内存）检测管线对比")
+    parser.add_argument("--source", default="dir:../datasets/auto/images",
+                        help="帧来源: dir:图片目录、video:视频文件、session:录制会话")
+    parser.add_argument("--fps", type=float, default=20)
+    parser.add_argument("--seconds", type=float, default=20, help="每种模式的测量时长")
+    parser.add_argument("--weights", default=None)
+    parser.add_argument("--backend", default=None)
+    parser.add_argument("--synthetic-ms", type=float, default=None,
+                        help="不加载模型，用持有GIL的模拟推理（毫秒）代替")
+    parser.add_argument("--no-gate", action="store_true", help="关闭推理跳过，每帧都推理")
+    args = parser.parse_args()
+
+    console = Console()
+    results = {}
+
+    console.print("🧵 线程模式：采集和推理在主进程的检测线程中")
+    source = open_frame_source(args.source, clock="realtime", fps=args.fps, loop=True)
+    gate = ChangeGate()
+    gate.enabled = not args.no_gate
+    engine = JumpEngine(create_detector(args.weights, args.backend, args.synthetic_ms), source,
+                        inference_gate=gate, overlay_builder=build_jump_overlay, detect_only=True)
+    results['线程'] = measure(engine, args.seconds)
+
+    console.print("🧩 进程模式：采集和推理在工作进程中，共享内存传帧")
+    source = ProcessFrameSource(args.source, clock="realtime", fps=args.fps, loop=True,
+                                weights=args.weights, backend=args.backend,
+                                gate_enabled=not args.no_gate, synthetic_ms=args.synthetic_ms)
+    engine = JumpEngine(None, source, overlay_builder=build_jump_overlay, detect_only=True)
+    results['进程'] = measure(engine, args.seconds)
+
+    table = Table(title=f"检测管线对比（{args.source}，每种模式 {args.seconds:.0f}s）", box=box.ROUNDED)
+    table.add_column("模式", style="cyan")
+    table.add_column("检测帧率", justify="right")
+    table.add_column("主进程CPU", justify="right")
+    table.add_column("GIL唤醒延迟 P50/P99/最大", justify="right")
+    table.add_column("帧龄 P50/P99", justify="right")
+    table.add_column("长按误差 平均/P99", justify="right")
+    for mode, r in results.items():
+        table.add_row(mode, f"{r['fps']:.1f} FPS", f"{r['cpu_percent']:.0f}%",
+                      f"{r['wakeup_p50']:.2f} / {r['wakeup_p99']:.2f} / {r['wakeup_max']:.1f} ms",
+                      f"{r['age_p50']:.1f} / {r['age_p99']:.1f} ms",
+                      f"{r['press_mean']:.3f} / {r['press_p99']:.3f} ms")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+自动保存训练数据的存储策略
+
+自动保存每跳都写一张OpenCV默认质量的全分辨率JPEG加一个标注文件，长时间运行时
+auto_generated_data/ 会无限增长。这里在后台写入器和磁盘之间加一层策略（配置见 assets/config/storage.yaml）：
+    - 编码：JPEG质量、WebP，或把长边缩小到训练分辨率（标注是相对坐标，不需要改）
+    - 磁盘上限：超过 budget_mb 后按最旧优先或信息量最低优先淘汰图片/标注对，
+      淘汰到上限的95%，避免每写一张就删一张。只淘汰本策略写入的图片：启用前已有的图片
+      （可能在标注工具中手动修正过）不计入上限也不删除，除非设置 evict_legacy: true
+    - 每次运行一个 sessions/<开始时间>/ 子目录，方便按会话清理和回看
+缩放、磁盘上限和会话目录默认关闭（与原来的行为一致），需要在配置中显式开启。
+    - 写入记录保存在数据目录的 storage_index.jsonl 中（大小、时间、信息量），启动和淘汰都不扫描目录
+    - 统计每小时写入量，以及与默认编码相比节省的空间（定期抽样编码一次默认JPEG估算）
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import yaml
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CONFIG_PATH = PROJECT_ROOT / "assets" / "config" / "storage.yaml"
+INDEX_FILE = "storage_index.jsonl"
+IMAGE_FORMATS = ("jpg", "webp", "png")
+EVICTION_ORDERS = ("oldest", "least_informative")
+IMAGE_SUFFIXES = tuple(f".{name}" for name in IMAGE_FORMATS) + (".jpeg",)
+
+DEFAULT_STORAGE = {
+    'format': "jpg",
+    'quality': 90,
+    'max_side': None,
+    'budget_mb': None,
+    'eviction': "oldest",
+    'evict_legacy': False,
+    'session_dirs': False,
+}
+
+
+def atomic_write(path, data):
+    """写入临时文件后重命名，读者不会看到写了一半的文件"""
+    path = Path(path)
+    temporary = path.with_name(f".{path.name}.tmp")
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def load_storage_config(path=CONFIG_PATH):
+    """读取存储策略配置，文件不存在时使用默认值"""
+    config = dict(DEFAULT_STORAGE)
+    path = Path(path)
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update(yaml.safe_load(f) or {})
+    if config['format'] not in IMAGE_FORMATS:
+        raise ValueError(f"未知的图片格式: {config['format']}（可选: {', '.join(IMAGE_FORMATS)}）")
+    if config['eviction'] not in EVICTION_ORDERS:
+        raise ValueError(f"未知的淘汰顺序: {config['eviction']}（可选: {', '.join(EVICTION_ORDERS)}）")
+    return config
+
+
+def data_directories(data_root):
+    """数据目录下所有的 (名称, 图片目录, 标注目录)：旧的平铺目录和每个会话子目录"""
+    data_root = Path(data_root)
+    directories = []
+    if (data_root / "images").is_dir():
+        directories.append((data_root.name, data_root / "images", data_root / "labels"))
+    sessions = data_root / "sessions"
+    if sessions.is_dir():
+        for session in sorted(path for path in sessions.iterdir() if (path / "images").is_dir()):
+            directories.append((session.name, session / "images", session / "labels"))
+    return directories
+
+
+class StoragePolicy:
+    """编码、会话目录、磁盘上限和淘汰（由后台写入线程调用）"""
+
+    def __init__(self, data_root, image_format="jpg", quality=90, max_side=None, budget_mb=None,
+                 eviction="oldest", evict_legacy=False, session_dirs=False, baseline_every=10):
+        self.data_root = Path(data_root)
+        self.image_format = image_format
+        self.quality = quality
+        self.max_side = max_side
+        self.budget = budget_mb * 1024 * 1024 if budget_mb else None
+        self.eviction = eviction
+        self.evict_legacy = evict_legacy          # 是否也淘汰启用写入记录之前已有的图片
+        self.session_dirs = session_dirs
+        self.baseline_every = baseline_every    # 每N张抽样编码一次默认JPEG，估算节省的空间
+
+        self.session = datetime.now().strftime("%Y%m%d_%H%M%S") if session_dirs else None
+        self.entries = []
+        self.total_bytes = 0
+        self.managed_bytes = 0           # 计入磁盘上限的大小（不淘汰旧图片时不含旧图片）
+        self.on_evicted = None           # 淘汰一对文件后的回调 (写入记录)，例如同步近重复索引
+
+        # 统计
+        self.started = time.perf_counter()
+        self.written_bytes = 0
+        self.written = 0
+        self.sampled_bytes = 0           # 抽样帧的实际大小
+        self.sampled_baseline = 0        # 抽样帧按默认方式编码的大小
+        self.evicted = 0
+        self.evicted_bytes = 0
+
+    @classmethod
+    def from_config(cls, data_root, config=None, **overrides):
+        config = dict(config or load_storage_config())
+        config.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(data_root, image_format=config['format'], quality=config['quality'],
+                   max_side=config['max_side'], budget_mb=config['budget_mb'],
+                   eviction=config['eviction'], evict_legacy=config['evict_legacy'],
+                   session_dirs=config['session_dirs'])
+
+    # === 目录 ===
+
+    @property
+    def root(self):
+        """本次运行写入的目录"""
+        return self.data_root / "sessions" / self.session if self.session else self.data_root
+
+    def prepare(self):
+        """创建本次运行的图片和标注目录并读取写入记录，返回 (图片目录, 标注目录)"""
+        images_dir, labels_dir = self.root / "images", self.root / "labels"
+        images_dir.mkdir(parents=True, exist_ok=True)
+        labels_dir.mkdir(parents=True, exist_ok=True)
+        self.load_index()
+        return images_dir, labels_dir
+
+    def load_index(self):
+        index_path = self.data_root / INDEX_FILE
+        if index_path.exists():
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self.entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            # 没有写入记录的旧数据目录：只扫描这一次
+            self.entries = []
+            for _, images_dir, labels_dir in data_directories(self.data_root):
+                for image_path in images_dir.iterdir():
+                    if image_path.suffix.lower() in IMAGE_SUFFIXES:
+                        stat = image_path.stat()
+                        self.entries.append({
+                            'image': str(image_path.relative_to(self.data_root)),
+                            'label': str((labels_dir / f"{image_path.stem}.txt").relative_to(self.data_root)),
+                            'bytes': stat.st_size,
+                            'time': stat.st_mtime,
+                            'score': 0.5,   # 信息量未知
+                            'legacy': True,  # 不是本策略写入的
+                        })
+            self.entries.sort(key=lambda entry: entry['time'])
+            self.rewrite_index()
+        self.total_bytes = sum(entry['bytes'] for entry in self.entries)
+        self.managed_bytes = sum(entry['bytes'] for entry in self.entries if self.evictable(entry))
+
+    def evictable(self, entry):
+        return self.evict_legacy or not entry.get('legacy')
+
+    def rewrite_index(self):
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in self.entries)
+        atomic_write(self.data_root / INDEX_FILE, data.encode('utf-8'))
+
+    # === 编码 ===
+
+    def encode(self, frame):
+        """按策略编码一帧，返回 (编码后的字节, 文件后缀)"""
+        original = frame
+        if self.max_side:
+            height, width = frame.shape[:2]
+            scale = self.max_side / max(height, width)
+            if scale < 1:
+                frame = cv2.resize(frame, (round(width * scale), round(height * scale)),
+                                   interpolation=cv2.INTER_AREA)
+
+        if self.image_format == "webp":
+            params = [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        elif self.image_format == "jpg":
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        else:
+            params = []
+        success, encoded = cv2.imencode(f".{self.image_format}", frame, params)
+        if not success:
+            raise RuntimeError(f"图片编码失败 ({self.image_format})")
+        data = encoded.tobytes()
+
+        if self.written % self.baseline_every == 0:
+            success, baseline = cv2.imencode(".jpg", original)   # 原来的方式：全分辨率、默认质量
+            if success:
+                self.sampled_bytes += len(data)
+                self.sampled_baseline += len(baseline)
+        return data, f".{self.image_format}"
+
+    # === 记录和淘汰 ===
+
+    def record(self, image_path, label_path, nbytes, score=0.5, sidecar_path=None):
+        """写入一对文件后调用：追加写入记录，超过磁盘上限时淘汰"""
+        entry = {
+            'image': str(Path(image_path).relative_to(self.data_root)),
+            'label': str(Path(label_path).relative_to(self.data_root)),
+            'bytes': nbytes,
+            'time': time.time(),
+            'score': round(float(score), 4),
+        }
+        if sidecar_path is not None:
+            entry['sidecar'] = str(Path(sidecar_path).relative_to(self.data_root))
+        self.entries.append(entry)
+        self.total_bytes += nbytes
+        self.managed_bytes += nbytes
+        self.written += 1
+        self.written_bytes += nbytes
+        with open(self.data_root / INDEX_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        if self.budget and self.managed_bytes > self.budget:
+            self.evict(int(self.budget * 0.95))
+
+    def evict(self, target_bytes):
+        """按淘汰顺序删除图片/标注对，直到计入上限的大小不超过 target_bytes（旧图片只在 evict_legacy 时淘汰）"""
+        if self.eviction == "least_informative":
+            order = sorted(range(len(self.entries)), key=lambda i: (self.entries[i]['score'], self.entries[i]['time']))
+        else:
+            order = range(len(self.entries))   # 记录按写入时间排列
+
+        removed = set()
+        for i in order:
+            if self.managed_bytes <= target_bytes:
+                break
+            entry = self.entries[i]
+            if entry['image'] == self.entries[-1]['image'] or not self.evictable(entry):
+                continue   # 不淘汰刚写入的这一张和旧图片
+            # 先删图片：其他程序按图片找标注，不会看到没有标注的图片
+            for key in ('image', 'label', 'sidecar'):
+                if key not in entry:
+                    continue
+                try:
+                    os.remove(self.data_root / entry[key])
+                except FileNotFoundError:
+                    pass
+            removed.add(i)
+            if self.on_evicted:
+                self.on_evicted(entry)
+            self.total_bytes -= entry['bytes']
+            self.managed_bytes -= entry['bytes']
+            self.evicted += 1
+            self.evicted_bytes += entry['bytes']
+
+        if removed:
+            self.entries = [entry for i, entry in enumerate(self.entries) if i not in removed]
+            self.rewrite_index()
+            print(f"🧹 超过磁盘上限，淘汰 {len(removed)} 张图片（{self.eviction}）- {self.summary()}")
+
+    # === 统计 ===
+
+    @property
+    def bytes_per_hour(self):
+        hours = (time.perf_counter() - self.started) / 3600
+        return self.written_bytes / hours if hours > 0 else 0.0
+
+    @property
+    def saved_bytes(self):
+        """与全分辨率默认质量JPEG相比，本次运行编码省下的空间（按抽样比例估算）"""
+        if not self.sampled_baseline:
+            return 0.0
+        ratio = self.sampled_bytes / self.sampled_baseline
+        return self.written_bytes / ratio - self.written_bytes if ratio > 0 else 0.0
+
+    def summary(self):
+        mb = 1024 * 1024
+        budget = f"{self.budget / mb:g}MB" if self.budget else "不限"
+        saving = 1 - self.sampled_bytes / self.sampled_baseline if self.sampled_baseline else 0.0
+        return (f"写入 {self.written} 张 {self.written_bytes / mb:.1f}MB ({self.bytes_per_hour / mb:.1f}MB/小时) | "
+                f"编码 {self.image_format} q{self.quality} 节省约 {self.saved_bytes / mb:.1f}MB ({saving:.0%}) | "
+                f"淘汰 {self.evicted} 张 {self.evicted_bytes / mb:.1f}MB | 占用 {self.managed_bytes / mb:.1f}MB / {budget}"
+                f"{'' if self.managed_bytes == self.total_bytes else f' (另有旧图片 {(self.total_bytes - self.managed_bytes) / mb:.1f}MB 不淘汰)'}")
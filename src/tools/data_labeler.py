@@ -27,6 +27,14 @@ class DataLabeler:
                 "labels": os.path.join(project_root, "auto_generated_data", "labels")
             }
         }
+        # 自动保存的会话子目录（只列出最近5个，避免数据源列表过长）
+        sessions_dir = os.path.join(project_root, "auto_generated_data", "sessions")
+        if os.path.isdir(sessions_dir):
+            for session in sorted(os.listdir(sessions_dir))[-5:]:
+                self.data_sources[f"自动生成数据 {session}"] = {
+                    "images": os.path.join(sessions_dir, session, "images"),
+                    "labels": os.path.join(sessions_dir, session, "labels")
+                }
         
         # 默认使用手动采集数据
         self.current_source = "手动采集数据"
@@ -85,7 +93,7 @@ class DataLabeler:
             return
             
         self.image_files = [f for f in os.listdir(self.images_path) 
-                           if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+                           if f.lower().endswith(('.jpg', '.jpeg', '.png', '.webp'))]
         self.image_files.sort()
         
         if not self.image_files:
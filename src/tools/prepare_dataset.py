@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import os
+import sys
 import shutil
 import random
 from pathlib import Path
@@ -9,10 +10,16 @@ from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.table import Table
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from image_dedup import DEFAULT_DISTANCE, HashIndex, find_duplicates
+
 console = Console()
 
-def prepare_yolo_dataset():
-    """准备YOLO训练数据集 - 合并手动和自动数据"""
+def prepare_yolo_dataset(dedup_distance=DEFAULT_DISTANCE, keep_duplicates=False):
+    """准备YOLO训练数据集 - 合并手动和自动数据
+
+    dedup_distance: 近重复判定的最大dHash汉明距离（0 不去重）；keep_duplicates 时只标记不跳过
+    """
     console.print("[bold green]🚀 准备YOLO训练数据集 - 合并多个数据源[/bold green]")
     
     # 项目路径
@@ -22,13 +29,24 @@ def prepare_yolo_dataset():
     data_sources = {
         "手动采集数据": {
             "images": project_root / "data" / "images",
-            "labels": project_root / "data" / "labels"
+            "labels": project_root / "data" / "labels",
+            "root": project_root / "data"
         },
         "自动生成数据": {
             "images": project_root / "auto_generated_data" / "images",
-            "labels": project_root / "auto_generated_data" / "labels"
+            "labels": project_root / "auto_generated_data" / "labels",
+            "root": project_root / "auto_generated_data"
         }
     }
+    # 自动保存按会话写入 auto_generated_data/sessions/<开始时间>/ 子目录
+    sessions_dir = project_root / "auto_generated_data" / "sessions"
+    if sessions_dir.is_dir():
+        for session_dir in sorted(sessions_dir.iterdir()):
+            data_sources[f"自动生成数据_{session_dir.name}"] = {
+                "images": session_dir / "images",
+                "labels": session_dir / "labels",
+                "root": project_root / "auto_generated_data"   # 与自动保存共用近重复索引
+            }
     
     # YOLO数据集目录
     yolo_dir = project_root / "yolo_dataset"
@@ -54,20 +72,21 @@ def prepare_yolo_dataset():
             continue
         
         # 获取此数据源的已标注图片列表
-        label_files = list(labels_dir.glob("*.txt"))
+        label_files = sorted(labels_dir.glob("*.txt"))
         source_image_files = []
         
         for label_file in label_files:
             # 查找对应的图片文件
             image_name = label_file.stem
-            for ext in ['.jpg', '.jpeg', '.png']:
+            for ext in ['.jpg', '.jpeg', '.png', '.webp']:
                 image_path = images_dir / f"{image_name}{ext}"
-                if image_path.exists() and image_path.suffix.lower() in ['.jpg', '.jpeg', '.png']:
+                if image_path.exists() and image_path.suffix.lower() in ['.jpg', '.jpeg', '.png', '.webp']:
                     # 存储图片路径和对应的标注路径
                     source_image_files.append({
                         'image_path': image_path,
                         'label_path': label_file,
-                        'source': source_name
+                        'source': source_name,
+                        'root': paths["root"]
                     })
                     break
         
@@ -76,6 +95,35 @@ def prepare_yolo_dataset():
     
     console.print(f"[bold cyan]📊 总计: 找到{len(all_image_files)}对图片-标注数据[/bold cyan]")
     
+    # 近重复去重（哈希保存在各数据根目录的 dhash_index.tsv 中，再次运行只计算新增图片）
+    duplicate_count = 0
+    if dedup_distance and all_image_files:
+        console.print("[yellow]🔁 计算感知哈希，查找近重复图片...[/yellow]")
+        indexes = {}
+        hashes = []
+        for i, file_info in enumerate(all_image_files):
+            root = file_info['root']
+            if root not in indexes:
+                indexes[root] = HashIndex(root, max_distance=dedup_distance)
+            value = indexes[root].hash_file(file_info['image_path'], flush=False)
+            if value is not None:
+                hashes.append((i, value))
+        for index in indexes.values():
+            index.flush()
+        
+        duplicates = find_duplicates(hashes, dedup_distance)
+        duplicate_count = len(duplicates)
+        if duplicates:
+            report_path = yolo_dir / "near_duplicates.txt"
+            with open(report_path, 'w', encoding='utf-8') as f:
+                for i, (distance, kept) in sorted(duplicates.items()):
+                    f.write(f"{all_image_files[i]['image_path']}\t{all_image_files[kept]['image_path']}\t{distance}\n")
+            action = "仅标记" if keep_duplicates else "跳过"
+            console.print(f"[cyan]🔁 近重复图片: {duplicate_count}张（距离 ≤{dedup_distance}，{action}），"
+                          f"列表见 {report_path}[/cyan]")
+            if not keep_duplicates:
+                all_image_files = [file_info for i, file_info in enumerate(all_image_files) if i not in duplicates]
+    
     if len(all_image_files) < 2:
         console.print("[red]❌ 数据量不足，至少需要2对图片-标注数据[/red]")
         return False
@@ -145,6 +193,8 @@ def prepare_yolo_dataset():
     table.add_row("训练集", str(train_img_count), str(train_label_count))
     table.add_row("验证集", str(val_img_count), str(val_label_count))
     table.add_row("总计", str(train_img_count + val_img_count), str(train_label_count + val_label_count))
+    if duplicate_count:
+        table.add_row("近重复" + ("(已标记)" if keep_duplicates else "(已跳过)"), str(duplicate_count), "-")
     
     console.print(table)
     console.print("[bold green]✅ YOLO数据集准备完成！[/bold green]")
@@ -152,4 +202,10 @@ def prepare_yolo_dataset():
     return True
 
 if __name__ == "__main__":
-    prepare_yolo_dataset()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="合并手动和自动数据，准备YOLO训练数据集")
+    parser.add_argument("--dedup-distance", type=int, default=DEFAULT_DISTANCE,
+                        help="dHash汉明距离不超过该值的图片视为近重复（0 不去重）")
+    parser.add_argument("--keep-duplicates", action="store_true", help="近重复图片只写入列表，仍然复制到数据集")
+    args = parser.parse_args()
+    prepare_yolo_dataset(args.dedup_distance, args.keep_duplicates)
\ No newline at end of file
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+合并后的界面状态更新
+
+工作线程原来每帧、每个事件都调用 root.after(0, ...)，大量回调涌入Tcl事件队列，与画面绘制争抢主循环。
+现在工作线程只把最新值写入线程安全的快照（同一个键只保留最后一次写入），
+Tk线程按固定频率在一个回调里把变化的值一次性应用到界面变量上。
+"""
+
+import threading
+import time
+
+
+class UIState:
+    """工作线程可以随意写入的界面状态快照"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.pending = {}   # 上次应用之后发生变化的值
+        self.writes = 0     # 写入次数（原来每次写入都是一次 root.after）
+
+    def set(self, key, value):
+        """设置界面变量的值，key 为界面变量的属性名"""
+        with self.lock:
+            self.writes += 1
+            if self.values.get(key) != value:
+                self.values[key] = value
+                self.pending[key] = value
+
+    def take(self):
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+            return pending
+
+
+class UIRefresher:
+    """在Tk线程中按固定频率应用 UIState 快照"""
+
+    def __init__(self, root, state, owner, rate=10, on_refresh=None):
+        self.root = root
+        self.state = state
+        self.owner = owner              # 界面变量所在的对象，按属性名查找（没有的变量忽略）
+        self.interval_ms = int(1000 / rate)
+        self.on_refresh = on_refresh    # 每次刷新时额外执行（如统计信息）
+        self.running = False
+
+        self.callbacks = 0
+        self.window_start = time.perf_counter()
+        self.window_writes = 0
+        self.window_callbacks = 0
+        self.writes_per_second = 0.0
+        self.callbacks_per_second = 0.0
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.root.after(self.interval_ms, self.refresh)
+
+    def stop(self):
+        self.running = False
+
+    def refresh(self):
+        if not self.running:
+            return
+        try:
+            for key, value in self.state.take().items():
+                variable = getattr(self.owner, key, None)
+                if variable is not None:
+                    variable.set(value)
+            if self.on_refresh:
+                self.on_refresh()
+        except Exception as e:
+            print(f"界面刷新错误: {e}")
+
+        self.callbacks += 1
+        now = time.perf_counter()
+        if now - self.window_start >= 1.0:
+            elapsed = now - self.window_start
+            writes = self.state.writes
+            self.writes_per_second = (writes - self.window_writes) / elapsed
+            self.callbacks_per_second = (self.callbacks - self.window_callbacks) / elapsed
+            self.window_writes = writes
+            self.window_callbacks = self.callbacks
+            self.window_start = now
+
+        self.root.after(self.interval_ms, self.refresh)
+
+    def summary(self):
+        return (f"界面事件: 写入 {self.writes_per_second:.0f}/s → "
+                f"Tk回调 {self.callbacks_per_second:.0f}/s")